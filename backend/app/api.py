@@ -1,14 +1,31 @@
 # backend/app/api.py
-from fastapi import FastAPI, HTTPException
+import os
+import re
+import time
+from .utils import startup  # first, so the import time below covers everything else
+from fastapi import FastAPI, Header, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
-from .utils.config import ALLOW_ORIGINS, DATA_DIR
+from .utils.config import ALLOW_ORIGINS, DATA_DIR, KNOWLEDGE_BUNDLE_PATH, WARMUP_ON_STARTUP
 from .utils.db import get_engine, ensure_tables
+from .utils.sql_guard import guard_stats
+from .utils.admission import Overloaded
+from .utils.metrics import METRICS_CONTENT_TYPE, begin_request, current_request, end_request, render_metrics, server_timing
+from .utils import profiler
+from .utils.config import PROFILE_ADMIN_TOKEN
+from .utils.tenancy import UnknownTenant, resolve_tenant, scoped_session, tenant_path, tenant_stats, use_tenant
+from .utils.usage import session_usage, usage_summary
 from .utils.logging import get_logger, setup_logging
 from .models.types import ChatIn, IngestIn, ResetIn, SetKeyReq
 from .services.ingestion import ingest_directory
-from .services.pipeline import answer
+from .services.bundle import activate_bundle
+from .services.redaction import BatchStats, redact_stream_async, shutdown_redaction_pool
+from .services.pipeline import answer, coalescing_stats
 from .services.pipeline_modules import setup
+from .services.warmup import start_warm_up
+
+startup.record("import app.api", time.perf_counter() - startup.STARTED)
 
 # Configure logging
 setup_logging()
@@ -19,9 +36,24 @@ app = FastAPI(title="TCM Clinic Chatbot API")
 @app.on_event("startup")
 def _auto_ingest_on_startup():
     # Don't ingest until API key is set; embedding needs the key.
-    engine = get_engine()
-    ensure_tables(engine)
-    logger.info("API started. Waiting for /set-api-key to ingest data.")
+    with startup.phase("startup: ensure tables"):
+        engine = get_engine()
+        ensure_tables(engine)
+    if WARMUP_ON_STARTUP:
+        start_warm_up()
+    if KNOWLEDGE_BUNDLE_PATH and os.path.isfile(KNOWLEDGE_BUNDLE_PATH):
+        try:
+            with startup.phase("startup: activate bundle"):
+                activate_bundle(engine, KNOWLEDGE_BUNDLE_PATH)
+            logger.info("API started from knowledge bundle. Waiting for /set-api-key to answer queries.")
+            return
+        except Exception as e:
+            logger.error("Could not load knowledge bundle %s: %s", KNOWLEDGE_BUNDLE_PATH, e, exc_info=True)
+    logger.info("API started in %.2fs. Waiting for /set-api-key to ingest data.", time.perf_counter() - startup.STARTED)
+
+@app.on_event("shutdown")
+def _stop_workers():
+    shutdown_redaction_pool()
         
 app.add_middleware(
     CORSMiddleware,
@@ -31,38 +63,143 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Accept a caller's X-Request-ID when it is a plain token, so logs can be joined across services
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+@app.middleware("http")
+async def _stage_timings(request: Request, call_next):
+    # Stage spans recorded anywhere in the request (incl. worker threads) land on this context
+    if request.url.path != "/chat":
+        return await call_next(request)
+    request_id = request.headers.get("x-request-id", "")
+    ctx = begin_request(request_id if _REQUEST_ID_RE.match(request_id) else None)
+    try:
+        response = await call_next(request)
+    finally:
+        end_request(ctx)
+    timing = server_timing(ctx)
+    response.headers["Server-Timing"] = timing
+    response.headers["X-Request-ID"] = ctx.request_id
+    # One structured record per request; LOG_FORMAT=json emits the extras as fields
+    logger.info("Chat timings (route=%s): %s", ctx.route, timing,
+                extra={"timings_ms": {k: round(v * 1000, 1) for k, v in ctx.totals().items()},
+                       "tokens": ctx.usage_totals()})
+    return response
+
+@app.get("/metrics")
+def metrics():
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/startup")
+def startup_timings():
+    """Cold-start breakdown: import time, startup steps and background warm-up."""
+    return startup.startup_report()
+
+@app.get("/usage")
+def usage(session_id: str | None = None, tenant_id: str | None = None, x_admin_token: str | None = Header(None)):
+    """Estimated LLM token usage and spend: rolling budget window, plus one session's totals if given (admin only)."""
+    out = usage_summary()
+    if session_id:
+        _require_admin(x_admin_token)
+        out["session"] = {"session_id": session_id, **session_usage(scoped_session(session_id, _tenant(tenant_id)))}
+    return out
+
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {"ok": True, "sql_guard": guard_stats(), "coalescing": coalescing_stats(), "tenants": tenant_stats()}
+
+def _tenant(tenant_id: str | None, create: bool = False) -> str:
+    try:
+        return resolve_tenant(tenant_id, create=create)
+    except UnknownTenant:
+        raise HTTPException(status_code=404, detail="Unknown clinic")
 
 @app.post("/chat")
-def chat(req: ChatIn):
-    logger.info(f"Chat request received for session_id: {req.session_id}")
+def chat(req: ChatIn, response: Response, x_profile: str | None = Header(None)):
+    logger.info("Chat request received for session_id: %s", req.session_id)
     if not setup.api_is_ready():
         logger.warning("Chat request received but API not ready.")
         raise HTTPException(status_code=401, detail="OpenAI API key not set or invalid")
-    resp = answer(req.message, session_id=req.session_id or "default")
+    tenant = _tenant(req.tenant_id)
+    ctx = current_request()
+    try:
+        with use_tenant(tenant), profiler.capture("chat", ctx.request_id if ctx else None, profiler.authorized(x_profile)) as profile:
+            if profile is not None:
+                response.headers["X-Profile-ID"] = profile.id
+            resp = answer(req.message, session_id=req.session_id or "default")
+    except Overloaded as e:
+        logger.warning("Chat request rejected: %s", e)
+        raise HTTPException(status_code=429, detail="Too many requests right now. Please retry shortly.",
+                            headers={"Retry-After": str(e.retry_after)})
     logger.info("Chat response sent.")
     return {"reply": resp}
 
 @app.post("/ingest")
-def ingest(req: IngestIn):
-    dir_path = req.dir_path or DATA_DIR
+def ingest(req: IngestIn, response: Response, x_profile: str | None = Header(None)):
+    tenant = _tenant(req.tenant_id, create=True)
+    dir_path = req.dir_path or tenant_path(DATA_DIR, tenant)
     logger.info(f"Ingestion request received for directory: {dir_path}")
-    engine = get_engine()
-    ensure_tables(engine)
     try:
-        count = ingest_directory(engine, dir_path)
+        with use_tenant(tenant), profiler.capture("ingest", requested=profiler.authorized(x_profile)) as profile:
+            engine = get_engine()
+            ensure_tables(engine)
+            if profile is not None:
+                response.headers["X-Profile-ID"] = profile.id
+            count = ingest_directory(engine, dir_path, bundle_path=tenant_path(KNOWLEDGE_BUNDLE_PATH), emit_bundle=req.emit_bundle)
         logger.info(f"Ingestion completed. Processed {count} files.")
     except Exception as e:
         logger.error(f"Ingestion failed: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {e}")
     return {"processed_files": count, "dir": dir_path}
 
+def _require_admin(token: str | None):
+    if not PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler.authorized(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@app.get("/admin/profiles")
+def profiles(x_admin_token: str | None = Header(None)):
+    _require_admin(x_admin_token)
+    return {"profiles": profiler.list_profiles()}
+
+@app.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+def profile_stacks(profile_id: str, x_admin_token: str | None = Header(None)):
+    """Collapsed stacks (`frame;frame count` per line) for flamegraph.pl, speedscope or inferno."""
+    _require_admin(x_admin_token)
+    stacks = profiler.collapsed_stacks(profile_id)
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Unknown profile id")
+    return PlainTextResponse(stacks, headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'})
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """
+    Streams output while the request body is still being read. Under ASGI < 2.4 the base
+    class watches `receive` for disconnects, which would swallow the remaining body chunks;
+    here a disconnect surfaces as a failed send instead.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+@app.post("/redact/batch")
+async def redact_batch(request: Request, field: str = Query("text", pattern=r"^[A-Za-z0-9_]{1,64}$"),
+                       x_admin_token: str | None = Header(None)):
+    """
+    Stream JSONL in, JSONL out: each record redacted with the chat PII rules plus per-category
+    counts, in input order; the last line is {"summary": {...}} with totals and records/sec.
+    Admin only: a batch occupies the whole redaction process pool, on the host that serves /chat.
+    """
+    _require_admin(x_admin_token)
+    logger.info("Batch redaction request received.")
+    stats = BatchStats()
+    return _DuplexStreamingResponse(redact_stream_async(request.stream(), stats, field=field), media_type="application/x-ndjson")
+
 @app.post("/reset-session")
 def reset_session(req: ResetIn):
     logger.info(f"Reset session request received for session_id: {req.session_id}")
-    setup.clear_session(req.session_id or "default")
+    setup.clear_session(scoped_session(req.session_id or "default", _tenant(req.tenant_id)))
     logger.info("Session reset completed.")
     return {"ok": True}
 
@@ -0,0 +1,81 @@
+# backend/app/models/migrations.py
+"""
+Minimal versioned migrations. `create_all` only creates missing tables, so changes to
+existing databases go here as numbered steps; applied versions are recorded in
+`schema_migrations`. Each step runs in its own transaction and must be idempotent
+(`IF NOT EXISTS` / checkfirst), so a database built by a newer `create_all` is fine too.
+"""
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, TIMESTAMP, select
+from sqlalchemy.engine import Connection, Engine
+
+from .schema import metadata
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Kept out of `metadata` so bundles and hydration never see it
+_migrations_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _migrations_meta,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100)),
+    Column("applied_at", TIMESTAMP(timezone=True)),
+)
+
+def _declared_indexes(conn: Connection):
+    """Secondary indexes declared in schema.py (FK join columns, services.name, pricing.category)."""
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+# Trigram indexes serve the ILIKE '%...%' filters SQL_PROMPT asks for; the lower() expression
+# indexes serve the LOWER(col) LIKE fallback in direct_sql_pricing_consultation.
+_TRGM_INDEXES = [
+    ("ix_services_name_trgm", "services", "name gin_trgm_ops"),
+    ("ix_pricing_category_trgm", "pricing", "category gin_trgm_ops"),
+    ("ix_pricing_item_trgm", "pricing", "item gin_trgm_ops"),
+    ("ix_pricing_lower_category_trgm", "pricing", "lower(category) gin_trgm_ops"),
+    ("ix_pricing_lower_item_trgm", "pricing", "lower(item) gin_trgm_ops"),
+    ("ix_pricing_lower_type_trgm", "pricing", "lower(type) gin_trgm_ops"),
+]
+
+def _trigram_indexes(conn: Connection):
+    if conn.dialect.name != "postgresql":
+        return
+    conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, expr in _TRGM_INDEXES:
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({expr})")
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "declared secondary indexes", _declared_indexes),
+    (2, "postgres trigram indexes for ILIKE", _trigram_indexes),
+]
+
+def applied_versions(engine: Engine) -> set:
+    _migrations_meta.create_all(engine)
+    with engine.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations in order; stops at the first failure. Returns versions applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with engine.begin() as conn:
+                step(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.now(timezone.utc),
+                ))
+        except Exception as e:
+            # Later steps may depend on this one; retry everything on the next start
+            logger.error("Migration %s (%s) failed: %s", version, name, e)
+            break
+        applied.append(version)
+        logger.info("Applied migration %s: %s", version, name)
+    return applied
@@ -1,9 +1,12 @@
 # backend/app/models/schema.py
-from sqlalchemy import MetaData, Table, Column, String, Integer, ForeignKey, Text, TIMESTAMP, text as sa_text
+from sqlalchemy import MetaData, Table, Column, Index, String, Integer, ForeignKey, Text, TIMESTAMP, text as sa_text
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 metadata = MetaData()
 
+# Secondary indexes are declared per table below so create_all builds them on new databases;
+# existing databases get them (plus Postgres-only trigram indexes) from models/migrations.py.
+
 clinic_info = Table(
     "clinic_info", metadata,
     Column("id", PG_UUID(as_uuid=True), primary_key=True, server_default=sa_text("gen_random_uuid()")),
@@ -27,12 +30,14 @@ clinic_hours = Table(
     Column("day", String(10)),  # e.g., "Monday"
     Column("open_time", String(8)),  # e.g., "09:00:00"
     Column("close_time", String(8)),
+    Index("ix_clinic_hours_clinic_id", "clinic_id"),
 )
 
 clinic_languages = Table(
     "clinic_languages", metadata,
     Column("clinic_id", PG_UUID(as_uuid=True), ForeignKey("clinic_info.id")),
     Column("language", String(50)),
+    Index("ix_clinic_languages_clinic_id", "clinic_id"),
 )
 
 clinic_socials = Table(
@@ -40,6 +45,7 @@ clinic_socials = Table(
     Column("clinic_id", PG_UUID(as_uuid=True), ForeignKey("clinic_info.id")),
     Column("platform", String(50)),  # e.g., "facebook"
     Column("url", String(255)),
+    Index("ix_clinic_socials_clinic_id", "clinic_id"),
 )
 
 team_members = Table(
@@ -59,18 +65,22 @@ team_specialties = Table(
     "team_specialties", metadata,
     Column("practitioner_id", PG_UUID(as_uuid=True), ForeignKey("team_members.id")),
     Column("specialty", String(100)),
+    Index("ix_team_specialties_practitioner_id", "practitioner_id"),
 )
 
 team_languages = Table(
     "team_languages", metadata,
     Column("practitioner_id", PG_UUID(as_uuid=True), ForeignKey("team_members.id")),
     Column("language", String(50)),
+    Index("ix_team_languages_practitioner_id", "practitioner_id"),
 )
 
 team_services = Table(
     "team_services", metadata,
     Column("practitioner_id", PG_UUID(as_uuid=True), ForeignKey("team_members.id")),
     Column("service_id", PG_UUID(as_uuid=True), ForeignKey("services.id")),
+    Index("ix_team_services_practitioner_id", "practitioner_id"),
+    Index("ix_team_services_service_id", "service_id"),
 )
 
 services = Table(
@@ -80,12 +90,14 @@ services = Table(
     Column("subtitle", String(255)),
     Column("subtitle_zh", String(255)),
     Column("updatedAt", TIMESTAMP(timezone=True), server_default=sa_text("CURRENT_TIMESTAMP")),
+    Index("ix_services_name", "name"),
 )
 
 service_specialties = Table(
     "service_specialties", metadata,
     Column("service_id", PG_UUID(as_uuid=True), ForeignKey("services.id")),
     Column("specialty", String(100)),
+    Index("ix_service_specialties_service_id", "service_id"),
 )
 
 pricing = Table(
@@ -98,6 +110,8 @@ pricing = Table(
     Column("max", Integer),
     Column("service_id", PG_UUID(as_uuid=True), ForeignKey("services.id")),
     Column("updatedAt", TIMESTAMP(timezone=True), server_default=sa_text("CURRENT_TIMESTAMP")),
+    Index("ix_pricing_service_id", "service_id"),
+    Index("ix_pricing_category", "category"),
 )
 
 faqs = Table(
@@ -1,25 +1,35 @@
 # backend/app/models/types.py
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from typing import List, Literal, Optional
+
+from ..utils.tenancy import TENANT_ID_PATTERN
 
 class ChatIn(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000, description="User message for the chatbot")
     session_id: Optional[str] = Field("default", pattern=r"^[a-zA-Z0-9_-]{1,64}$", description="Unique session ID for chat history")
+    tenant_id: Optional[str] = Field(None, pattern=TENANT_ID_PATTERN, description="Clinic to answer for (default: DEFAULT_TENANT)")
 
 class IngestIn(BaseModel):
     dir_path: Optional[str] = Field(None, pattern=r"^(/?[a-zA-Z0-9_.-]+/?)*$", description="Directory path for data ingestion")
+    emit_bundle: bool = Field(False, description="Also write a knowledge bundle to KNOWLEDGE_BUNDLE_PATH")
+    tenant_id: Optional[str] = Field(None, pattern=TENANT_ID_PATTERN, description="Clinic the data belongs to (default: DEFAULT_TENANT)")
 
 class ResetIn(BaseModel):
     session_id: Optional[str] = Field("default", pattern=r"^[a-zA-Z0-9_-]{1,64}$", description="Session ID to reset chat history")
+    tenant_id: Optional[str] = Field(None, pattern=TENANT_ID_PATTERN, description="Clinic of the session")
     
 class IntentOut(BaseModel):
     intent: Literal["patient_care", "general_info", "internal_ops"]
     confidence: float
 
+DOC_TYPES = ("practitioner", "service", "faq", "clinic", "pricing")
+
 class RouteOutput:
-    def __init__(self, route: str, confidence: float):
+    def __init__(self, route: str, confidence: float, types: Optional[List[str]] = None):
         self.route = route
         self.confidence = confidence
+        # Ordered retrieval plan over chunk `type` metadata, most relevant first
+        self.types = [t for t in (types or []) if t in DOC_TYPES]
 
 class SetKeyReq(BaseModel):
     api_key: str = Field(..., pattern=r"^sk-[^\s]{20,}$", description="OpenAI API Key")
\ No newline at end of file
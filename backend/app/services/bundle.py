@@ -0,0 +1,229 @@
+# backend/app/services/bundle.py
+"""
+Self-contained knowledge bundle: structured SQL records, chunk texts, chunk metadata
+and the embedding matrix in one versioned file.
+
+Layout (little-endian):
+    magic b"CLNBNDL1" | u32 format version | u32 header length | header JSON (utf-8)
+    | zero padding to a 64-byte boundary | float32 matrix, row-major, L2-normalized
+
+The header records `matrix_offset`, so loading is one `mmap` plus a JSON parse;
+the matrix is used in place through `np.frombuffer` (no copy, no re-embedding).
+"""
+import json
+import mmap
+import os
+import struct
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import TIMESTAMP
+
+from ..models.schema import metadata
+from ..utils import db, lexical, vectorstore
+from ..utils.config import KNOWLEDGE_BUNDLE_PATH, OPENAI_EMBED_MODEL
+from ..utils.lexical import BM25Index, replace_lexical_index
+from ..utils.numpy_store import NumpyVectorStore
+from ..utils.tenancy import tenant_path
+from ..utils.vectorstore import export_vectors, use_preloaded_store
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+MAGIC = b"CLNBNDL1"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 64
+
+@dataclass
+class KnowledgeBundle:
+    header: Dict[str, Any]
+    ids: List[str]
+    texts: List[str]
+    columns: Dict[str, List[Any]]
+    matrix: np.ndarray
+    records: Dict[str, List[Dict[str, Any]]]
+    _mm: Any = None
+
+def _jsonable(v: Any) -> Any:
+    if isinstance(v, UUID):
+        return str(v)
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    return v
+
+def _dump_records(engine: Engine) -> Dict[str, List[Dict[str, Any]]]:
+    records = {}
+    with engine.connect() as conn:
+        for table in metadata.sorted_tables:
+            rows = conn.execute(select(table)).mappings().all()
+            records[table.name] = [{k: _jsonable(v) for k, v in r.items()} for r in rows]
+    return records
+
+def write_bundle(engine: Engine, path: str) -> Dict[str, Any]:
+    """Snapshot SQL tables + vector store into `path` (atomically replaced)."""
+    ids, texts, columns, matrix = export_vectors()
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    n, dim = (matrix.shape if matrix.ndim == 2 else (0, 0))
+    header = {
+        "version": FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "embed_model": OPENAI_EMBED_MODEL,
+        "count": int(n),
+        "dim": int(dim),
+        "ids": ids,
+        "texts": texts,
+        "columns": {k: [_jsonable(v) for v in col] for k, col in columns.items()},
+        "records": _dump_records(engine),
+        "matrix_offset": 0,
+    }
+    # The offset depends on the header length, which depends on the offset: iterate until stable.
+    while True:
+        blob = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        offset = -(-(_PREFIX.size + len(blob)) // _ALIGN) * _ALIGN
+        if offset == header["matrix_offset"]:
+            break
+        header["matrix_offset"] = offset
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(blob)))
+        f.write(blob)
+        f.write(b"\0" * (offset - _PREFIX.size - len(blob)))
+        f.write(matrix.tobytes(order="C"))
+    os.replace(tmp, path)
+    logger.info("Wrote knowledge bundle %s: %s chunks x %s dims, %s records",
+                path, n, dim, sum(len(v) for v in header['records'].values()))
+    return {"path": path, "chunks": int(n), "dim": int(dim)}
+
+def discard_bundle(path: str) -> bool:
+    """Remove the bundle at `path`, e.g. after an ingest that did not write one, so startup cannot serve stale data."""
+    removed = False
+    for stale in (path, f"{path}.tmp"):
+        if os.path.isfile(stale):
+            os.remove(stale)
+            removed = True
+    if removed:
+        logger.info("Removed knowledge bundle %s; it no longer matches the ingested data", path)
+    return removed
+
+def load_bundle(path: str) -> KnowledgeBundle:
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, header_len = _PREFIX.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a knowledge bundle")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle version {version} (expected {FORMAT_VERSION})")
+    header = json.loads(mm[_PREFIX.size:_PREFIX.size + header_len].decode("utf-8"))
+    n, dim = header["count"], header["dim"]
+    if n * dim:
+        matrix = np.frombuffer(mm, dtype=np.float32, count=n * dim, offset=header["matrix_offset"]).reshape(n, dim)
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+    return KnowledgeBundle(
+        header=header,
+        ids=header.pop("ids"),
+        texts=header.pop("texts"),
+        columns=header.pop("columns"),
+        matrix=matrix,
+        records=header.pop("records"),
+        _mm=mm,
+    )
+
+def _coerce(table, row: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for col in table.columns:
+        v = row.get(col.name)
+        if v is not None and isinstance(col.type, PG_UUID):
+            v = UUID(str(v))
+        elif v is not None and isinstance(col.type, TIMESTAMP):
+            v = datetime.fromisoformat(str(v))
+        out[col.name] = v
+    return out
+
+def _hydrate_sql(engine: Engine, records: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Fill empty tables from the bundle (fresh SQLite on a new instance); populated tables are left alone."""
+    inserted = 0
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            rows = records.get(table.name) or []
+            if not rows or conn.execute(select(func.count()).select_from(table)).scalar():
+                continue
+            conn.execute(table.insert(), [_coerce(table, r) for r in rows])
+            inserted += len(rows)
+    return inserted
+
+def _store_from(bundle: KnowledgeBundle) -> NumpyVectorStore:
+    # The matrix is a view into the mapping (np.frombuffer keeps it alive)
+    return NumpyVectorStore.from_arrays(None, bundle.ids, bundle.texts, bundle.columns, bundle.matrix)
+
+def _index_from(bundle: KnowledgeBundle) -> BM25Index:
+    metas = [{k: col[i] for k, col in bundle.columns.items() if col[i] is not None} for i in range(len(bundle.ids))]
+    index = BM25Index()
+    index.upsert(bundle.ids, bundle.texts, metas)
+    return index
+
+def _check_model(bundle: KnowledgeBundle, path: str):
+    if bundle.header.get("embed_model") != OPENAI_EMBED_MODEL:
+        logger.warning("Bundle %s embedded with %s, but OPENAI_EMBED_MODEL is %s; re-ingest to rebuild it.",
+                       path, bundle.header.get("embed_model"), OPENAI_EMBED_MODEL)
+
+def activate_bundle(engine: Engine, path: str) -> Dict[str, Any]:
+    """Map a bundle and serve retrieval (vectors + BM25) from it; hydrate empty SQL tables."""
+    t0 = time.perf_counter()
+    bundle = load_bundle(path)
+    _check_model(bundle, path)
+    use_preloaded_store(_store_from(bundle))
+    replace_lexical_index(_index_from(bundle))
+    inserted = _hydrate_sql(engine, bundle.records)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+    logger.info("Knowledge bundle %s active: %s chunks, %s SQL rows hydrated in %.1f ms", path, len(bundle.ids), inserted, elapsed_ms)
+    return {"chunks": len(bundle.ids), "sql_rows": inserted, "ms": round(elapsed_ms, 1)}
+
+# ----- tenants loaded after startup, or again after idle eviction -----
+def _tenant_bundle(tenant: str) -> Optional[KnowledgeBundle]:
+    path = tenant_path(KNOWLEDGE_BUNDLE_PATH, tenant)
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        bundle = load_bundle(path)
+    except Exception as e:
+        logger.warning("Ignoring knowledge bundle %s: %s", path, e)
+        return None
+    _check_model(bundle, path)
+    return bundle
+
+def _tenant_store(tenant: str) -> Optional[NumpyVectorStore]:
+    bundle = _tenant_bundle(tenant)
+    return _store_from(bundle) if bundle is not None else None
+
+def _tenant_index(tenant: str) -> Optional[BM25Index]:
+    bundle = _tenant_bundle(tenant)
+    return _index_from(bundle) if bundle is not None else None
+
+def _tenant_hydrate(engine: Engine, tenant: str):
+    bundle = _tenant_bundle(tenant)
+    if bundle is None:
+        return
+    try:
+        db.ensure_tables(engine)
+        inserted = _hydrate_sql(engine, bundle.records)
+    except Exception as e:
+        # The engine is still usable; SQL answers just won't see the bundled records
+        logger.warning("Could not hydrate SQL tables for tenant %s from its knowledge bundle: %s", tenant, e)
+        return
+    if inserted:
+        logger.info("Hydrated %d SQL rows for tenant %s from its knowledge bundle", inserted, tenant)
+
+vectorstore.bundle_loader = _tenant_store
+lexical.bundle_loader = _tenant_index
+db.bundle_hydrator = _tenant_hydrate
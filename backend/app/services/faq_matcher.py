@@ -0,0 +1,113 @@
+# backend/app/services/faq_matcher.py
+"""
+Direct FAQ answers. At ingest the curated `faqs` rows are indexed: each question is
+embedded once and its terms (question + `keywords`, via the BM25 tokenizer) are kept.
+At query time a question that nearly matches one FAQ gets the stored answer in the
+target language and skips routing, SQL, retrieval and generation.
+
+Score = FAQ_MATCH_EMBED_WEIGHT * cosine + (1 - weight) * keyword overlap. The query is
+only embedded when some FAQ already has FAQ_MIN_KEYWORD_OVERLAP, so most chats cost no
+extra embedding call. Persisted next to the vector index as `{FAQ_INDEX_PATH}.npy/.json`
+(per clinic, see utils/tenancy.py).
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from ..models.schema import faqs
+from ..utils.config import (
+    FAQ_INDEX_PATH, FAQ_MATCH_EMBED_WEIGHT, FAQ_MATCH_MARGIN, FAQ_MATCH_THRESHOLD, FAQ_MIN_KEYWORD_OVERLAP,
+)
+from ..utils.lexical import tokenize
+from ..utils.tenancy import TenantCache, tenant_path
+from ..utils.numpy_store import normalize_rows
+from ..utils.vectorstore import get_embeddings
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+class FaqMatcher:
+    def __init__(self, rows: List[Dict[str, Any]], matrix: np.ndarray):
+        self.rows = rows
+        self.matrix = matrix
+        self._terms = [set(tokenize(f"{r['question'] or ''} {r['keywords'] or ''}")) for r in rows]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, engine: Engine) -> "FaqMatcher":
+        with engine.connect() as conn:
+            result = conn.execute(select(faqs.c.id, faqs.c.question, faqs.c.answer, faqs.c.answer_zh, faqs.c.keywords))
+            rows = [{**r._mapping, "id": str(r.id)} for r in result if r.question and r.answer]
+        if not rows:
+            return cls([], np.zeros((0, 0), dtype=np.float32))
+        vectors = get_embeddings().embed_documents([r["question"] for r in rows])
+        return cls(rows, normalize_rows(vectors))
+
+    def keyword_overlap(self, terms: set) -> np.ndarray:
+        """Share of the shorter side's terms found in the other (1.0 = one contains the other)."""
+        return np.array([
+            len(terms & ft) / min(len(terms), len(ft)) if terms and ft else 0.0 for ft in self._terms
+        ], dtype=np.float32)
+
+    def match(self, question: str, lang: str) -> Optional[Tuple[str, float, Dict[str, Any]]]:
+        """(answer in the target language, score, faq row) for a confident match, else None."""
+        if not self.rows:
+            return None
+        overlap = self.keyword_overlap(set(tokenize(question)))
+        if overlap.max() < FAQ_MIN_KEYWORD_OVERLAP:
+            return None
+        query = normalize_rows([get_embeddings().embed_query(question)])[0]
+        scores = FAQ_MATCH_EMBED_WEIGHT * (self.matrix @ query) + (1 - FAQ_MATCH_EMBED_WEIGHT) * overlap
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else 0.0
+        if best < FAQ_MATCH_THRESHOLD or best - runner_up < FAQ_MATCH_MARGIN:
+            return None
+        row = self.rows[int(order[0])]
+        answer = row["answer_zh"] if lang.startswith("zh") and row.get("answer_zh") else row["answer"]
+        return answer, best, row
+
+    # ----- persistence -----
+    def save(self, path: str = FAQ_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.npy.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        with open(f"{path}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "rows": self.rows}, f, ensure_ascii=False)
+        os.replace(f"{path}.npy.tmp", f"{path}.npy")
+        os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    @classmethod
+    def load(cls, path: str = FAQ_INDEX_PATH) -> "FaqMatcher":
+        empty = cls([], np.zeros((0, 0), dtype=np.float32))
+        if not (os.path.isfile(f"{path}.npy") and os.path.isfile(f"{path}.json")):
+            return empty
+        try:
+            with open(f"{path}.json", "r", encoding="utf-8") as f:
+                rows = json.load(f)["rows"]
+            matrix = np.load(f"{path}.npy")
+            if matrix.shape[0] != len(rows):
+                raise ValueError("matrix/rows length mismatch")
+            return cls(rows, matrix)
+        except Exception as e:
+            logger.warning("Could not load FAQ index from %s: %s", path, e)
+            return empty
+
+_matchers: TenantCache[FaqMatcher] = TenantCache("faq", lambda tenant: FaqMatcher.load(tenant_path(FAQ_INDEX_PATH, tenant)))
+
+def get_faq_matcher() -> FaqMatcher:
+    """The current tenant's matcher."""
+    return _matchers.get()
+
+def rebuild_faq_matcher(engine: Engine) -> int:
+    """Re-index the faqs table (called after ingestion); returns the number of FAQs indexed."""
+    matcher = FaqMatcher.build(engine)
+    matcher.save(tenant_path(FAQ_INDEX_PATH))
+    _matchers.put(matcher)
+    return len(matcher)
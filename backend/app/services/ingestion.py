@@ -8,6 +8,9 @@ from .ingestion_modules.faqs import ingest_faqs
 from .ingestion_modules.pricing import ingest_pricing
 from .ingestion_modules.services import ingest_services
 from .ingestion_modules.team_members import ingest_team_members
+from .faq_matcher import rebuild_faq_matcher
+from ..utils.lexical import save_lexical_index
+from ..utils.vectorstore import drop_preloaded_store, persist_store
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -52,13 +55,20 @@ def infer_schema_from_payload(payload: Any) -> str:
             return "faqs"
     raise ValueError("Cannot infer schema from payload; add a 'schema' key.")
 
-def ingest_directory(engine: Engine, dir_path: str) -> int:
+def ingest_directory(engine: Engine, dir_path: str, bundle_path: str | None = None, emit_bundle: bool = False) -> int:
+    """
+    Load every known JSON file into SQL + the retrieval indexes.
+    With `emit_bundle`, also write a knowledge bundle (see services/bundle.py) to `bundle_path` for
+    fast cold starts; otherwise a bundle already there is removed, since it no longer matches the data.
+    """
     from ..utils.db import ensure_tables
     ensure_tables(engine)
 
     files = load_json_files(dir_path)
     if not files:
         return 0
+    # A bundle loaded at startup has no backing store: write to the configured backend instead
+    drop_preloaded_store()
     
     lc_index = {name.lower(): name for name in files.keys()}
     success_count = 0
@@ -76,4 +86,28 @@ def ingest_directory(engine: Engine, dir_path: str) -> int:
             success_count += 1
         except Exception as e:
             logger.error(f"{fname}: {e}", exc_info=True)
+
+    if success_count:
+        try:
+            persist_store()
+            save_lexical_index()
+        except Exception as e:
+            logger.warning("Could not persist retrieval indexes: %s", e)
+        try:
+            logger.info("FAQ matcher indexed %s FAQs", rebuild_faq_matcher(engine))
+        except Exception as e:
+            logger.warning("Could not build FAQ matcher: %s", e)
+        if bundle_path:
+            from .bundle import discard_bundle, write_bundle
+            try:
+                if emit_bundle:
+                    write_bundle(engine, bundle_path)
+                else:
+                    discard_bundle(bundle_path)
+            except Exception as e:
+                logger.error("Could not write knowledge bundle %s: %s", bundle_path, e, exc_info=True)
+                try:
+                    discard_bundle(bundle_path)
+                except OSError as e:
+                    logger.warning("Could not remove stale knowledge bundle %s: %s", bundle_path, e)
     return success_count
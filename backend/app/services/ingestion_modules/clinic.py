@@ -4,7 +4,6 @@ from typing import Any, Dict
 
 from .utils import _zh_day_name, chroma_upsert, delete_children, iso_now, to_list, to_uuid, upsert
 from ...models.schema import (clinic_info, clinic_hours, clinic_languages, clinic_socials)
-from ...utils.vectorstore import get_store
 
 def ingest_clinic_info(conn, payload: Dict[str, Any]):
     data = payload["data"] if "data" in payload else payload
@@ -83,10 +82,6 @@ def ingest_clinic_info(conn, payload: Dict[str, Any]):
         f"更新時間：{row['updatedAt']}",
     ])
     base = f"clinic::{data['id']}"
-    try:
-        get_store().delete(ids=[base])
-    except Exception:
-        pass
     docs = [
         (f"{base}::hours::en", hours_text_en, {"type":"clinic","field":"hours","lang":"en","id":data["id"]}),
         (f"{base}::hours::zh", hours_text_zh, {"type":"clinic","field":"hours","lang":"zh","id":data["id"]}),
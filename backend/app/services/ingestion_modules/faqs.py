@@ -19,13 +19,20 @@ def ingest_faqs(conn, payload: Dict[str, Any]):
             "updatedAt": q.get("updatedAt") or iso_now(),
         }
         upsert(conn, faqs, row, pk="id")
-        text = "\\n".join([
+        meta = {"type":"faq","id":q["id"],"category":row["category"]}
+        text_en = "\\n".join([
             f"FAQ: {row['question']}",
             f"Category: {row['category']}",
             f"Keywords: {row['keywords']}",
             f"Answer: {q.get('answer')}",
-            f"回答 (ZH): {q.get('answer_zh')}",
             f"Updated: {row['updatedAt']}",
         ])
-        docs.append((f"faq::{q['id']}", text, {"type":"faq","id":q["id"],"category":row["category"]}))
+        docs.append((f"faq::{q['id']}::en", text_en, {**meta, "lang":"en"}))
+        if q.get("answer_zh"):
+            text_zh = "\\n".join([
+                f"常見問題：{row['question']}",
+                f"關鍵字：{row['keywords']}",
+                f"回答：{q.get('answer_zh')}",
+            ])
+            docs.append((f"faq::{q['id']}::zh", text_zh, {**meta, "lang":"zh"}))
     chroma_upsert(docs)
\ No newline at end of file
@@ -30,5 +30,5 @@ def ingest_pricing(conn, payload: Dict[str, Any]):
             f"Service ID: {service_id}",
             f"Updated: {row['updatedAt']}",
         ])
-        docs.append((f"pricing::{p['id']}", text, {"type":"pricing","id":p["id"],"category":row["category"],"service_id":service_id}))
+        docs.append((f"pricing::{p['id']}", text, {"type":"pricing","id":p["id"],"category":row["category"],"service_id":service_id,"lang":"any"}))
     chroma_upsert(docs)
\ No newline at end of file
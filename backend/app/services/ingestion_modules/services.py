@@ -22,16 +22,24 @@ def ingest_services(conn, payload: Dict[str, Any]):
         delete_children(conn, service_specialties, "service_id", service_uuid)
         for spec in to_list(s.get("relatedSpecialties")):
             conn.execute(service_specialties.insert().values(service_id=service_uuid, specialty=spec))
-        text = "\\n".join([
+        meta = {"type":"service","id":s["id"],"name":s.get("name")}
+        specialties = ', '.join(to_list(s.get('relatedSpecialties')))
+        text_en = "\\n".join([
             f"Service: {s.get('name')} ({s['id']})",
             f"Subtitle: {s.get('subtitle')}",
-            f"副標題 (ZH): {s.get('subtitle_zh')}",
             f"Short: {s.get('shortDescription')}",
-            f"簡述 (ZH): {s.get('shortDescription_zh')}",
             f"Long: {s.get('longDescription')}",
-            f"詳細 (ZH): {s.get('longDescription_zh')}",
-            f"Specialties: {', '.join(to_list(s.get('relatedSpecialties')))}",
+            f"Specialties: {specialties}",
             f"Updated: {row['updatedAt']}",
         ])
-        docs.append((f"service::{s['id']}", text, {"type":"service","id":s["id"],"name":s.get("name")}))
+        docs.append((f"service::{s['id']}::en", text_en, {**meta, "lang":"en"}))
+        if any(s.get(f) for f in ("subtitle_zh", "shortDescription_zh", "longDescription_zh")):
+            text_zh = "\\n".join([
+                f"服務：{s.get('name')}",
+                f"副標題：{s.get('subtitle_zh')}",
+                f"簡述：{s.get('shortDescription_zh')}",
+                f"詳細：{s.get('longDescription_zh')}",
+                f"相關專長：{specialties}",
+            ])
+            docs.append((f"service::{s['id']}::zh", text_zh, {**meta, "lang":"zh"}))
     chroma_upsert(docs)
\ No newline at end of file
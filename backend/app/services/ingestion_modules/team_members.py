@@ -32,18 +32,32 @@ def ingest_team_members(conn, payload: Dict[str, Any]):
         delete_children(conn, team_services, "practitioner_id", pr_uuid)
         for svc in to_list(p.get("servicesOffered")):
             conn.execute(team_services.insert().values(practitioner_id=pr_uuid, service_id=to_uuid(svc, "service")))
-        text = "\\n".join([
-            f"Practitioner: {p.get('fullName') or ((p.get('firstName') or '') + ' ' + (p.get('lastName') or '')).strip()}",
+        meta = {"type":"practitioner","id":p["id"],"title":p.get("title")}
+        name = p.get('fullName') or ((p.get('firstName') or '') + ' ' + (p.get('lastName') or '')).strip()
+        specialties = ', '.join(to_list(p.get('specialties')))
+        languages = ', '.join(to_list(p.get('languages')))
+        services_offered = ', '.join(to_list(p.get('servicesOffered')))
+        text_en = "\\n".join([
+            f"Practitioner: {name}",
             f"Title: {p.get('title')}",
             f"Prefix: {p.get('prefix')}",
-            f"Specialties: {', '.join(to_list(p.get('specialties')))}",
-            f"Languages: {', '.join(to_list(p.get('languages')))}",
-            f"Services: {', '.join(to_list(p.get('servicesOffered')))}",
+            f"Specialties: {specialties}",
+            f"Languages: {languages}",
+            f"Services: {services_offered}",
             f"Bio: {p.get('bio')}",
-            f"簡介 (ZH): {p.get('bio_zh')}",
             f"Summary: {p.get('briefBio')}",
-            f"摘要 (ZH): {p.get('briefBio_zh')}",
             f"Updated: {row['updatedAt']}",
         ])
-        docs.append((f"practitioner::{p['id']}", text, {"type":"practitioner","id":p["id"],"title":p.get("title")}))
+        docs.append((f"practitioner::{p['id']}::en", text_en, {**meta, "lang":"en"}))
+        if p.get("bio_zh") or p.get("briefBio_zh"):
+            text_zh = "\\n".join([
+                f"醫師：{name}",
+                f"職稱：{p.get('title')}",
+                f"專長：{specialties}",
+                f"語言：{languages}",
+                f"服務：{services_offered}",
+                f"簡介：{p.get('bio_zh')}",
+                f"摘要：{p.get('briefBio_zh')}",
+            ])
+            docs.append((f"practitioner::{p['id']}::zh", text_zh, {**meta, "lang":"zh"}))
     chroma_upsert(docs)
\ No newline at end of file
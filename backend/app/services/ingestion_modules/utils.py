@@ -2,11 +2,11 @@
 from typing import Any, Dict, Tuple, List
 from uuid import UUID, uuid5, NAMESPACE_DNS
 from datetime import datetime, timezone
-from sqlalchemy import Table, insert
+from sqlalchemy import DateTime, Table, insert
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from ...utils.vectorstore import get_store
+from ...utils.lexical import get_lexical_index
 
 # ---------- Utilities ----------
 def to_list(v):
@@ -16,6 +16,9 @@ def to_list(v):
 def upsert(conn, table: Table, record: Dict[str, Any], pk: str = "id"):
     dialect = conn.dialect.name
     if dialect == "sqlite":
+        # SQLite's DateTime type only binds datetime objects; the JSON carries ISO strings
+        record = {k: datetime.fromisoformat(v) if isinstance(v, str) and k in table.c and isinstance(table.c[k].type, DateTime) else v
+                  for k, v in record.items()}
         stmt = sqlite_insert(table).values(**record)
         update_cols = {c.name: stmt.excluded[c.name] for c in table.columns if c.name != pk}
         stmt = stmt.on_conflict_do_update(index_elements=[pk], set_=update_cols)
@@ -32,16 +35,30 @@ def upsert(conn, table: Table, record: Dict[str, Any], pk: str = "id"):
 def delete_children(conn, table: Table, key_col: str, key_val: str):
     conn.execute(table.delete().where(getattr(table.c, key_col) == key_val))
 
+_splitter = None
+
 def chunk_text(text: str) -> List[str]:
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150, separators=["\n\n","\n",". "," ",""])
-    return splitter.split_text(text or "")
+    global _splitter
+    if _splitter is None:
+        # langchain_text_splitters is slow to import; only ingestion needs it
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150, separators=["\n\n","\n",". "," ",""])
+    return _splitter.split_text(text or "")
+
+def _record_filter(docs: List[Tuple[str, str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Match every stored chunk of the records being upserted (all languages, legacy ids too)."""
+    by_type: Dict[str, List[Any]] = {}
+    for _, _, meta in docs:
+        by_type.setdefault(meta.get("type"), []).append(meta.get("id"))
+    clauses = [{"$and": [{"type": t}, {"id": {"$in": sorted(set(ids))}}]} for t, ids in by_type.items()]
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
 
 def chroma_upsert(docs: List[Tuple[str, str, Dict[str, Any]]]):
     if not docs: return
     store = get_store()
-    ids = [d[0] for d in docs]
+    stale = _record_filter(docs)
     try:
-        store.delete(ids=ids)
+        store.delete(where=stale)
     except Exception:
         pass
     chunk_ids, texts, metas = [], [], []
@@ -54,6 +71,10 @@ def chroma_upsert(docs: List[Tuple[str, str, Dict[str, Any]]]):
             md["chunk_index"] = i+1
             metas.append(md)
     store.add_texts(texts=texts, metadatas=metas, ids=chunk_ids)
+    # Keep the BM25 index in lock-step with the vector store
+    index = get_lexical_index()
+    index.delete_where(stale)
+    index.upsert(chunk_ids, texts, metas)
 
 def _zh_day_name(en_day: str) -> str:
     mapping = {"Monday":"星期一","Tuesday":"星期二","Wednesday":"星期三","Thursday":"星期四","Friday":"星期五","Saturday":"星期六","Sunday":"星期日"}
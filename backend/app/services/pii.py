@@ -52,6 +52,32 @@ class PIIRedactor:
             'address': '[ADDRESS_REDACTED]',
             'dates': '[DATE_REDACTED]'
         }
+        self._replacement_by_tag = {tag: self.replacements[category] for category, tag in self.CATEGORY_ORDER}
+
+    # Category priority for overlapping matches; also the order of the redaction log
+    CATEGORY_ORDER = [
+        ('email', 'email'),
+        ('id_numbers', 'id'),
+        ('phone', 'phone'),
+        ('names', 'name'),
+        ('address', 'address'),
+        ('dates', 'date'),
+    ]
+    # Every pattern above needs one of these characters or lead-ins (keep in sync; the
+    # benchmarks.bench_pii run fails when a pattern match would slip past): texts
+    # without any of them, i.e. most chat messages, skip the scan altogether
+    _TRIGGER_CHARS = re.compile(r'[\d@市区縣县省我]')
+    _NAME_LEAD_INS = ("my name is", "i am", "i'm")
+    _NAME_LEAD_IN_RE = re.compile(r"my name is|i am|i'm", re.IGNORECASE)
+
+    def _may_contain_pii(self, text: str) -> bool:
+        if self._TRIGGER_CHARS.search(text):
+            return True
+        if text.isascii():
+            lowered = text.lower()
+            return any(lead in lowered for lead in self._NAME_LEAD_INS)
+        # Unicode case folding (e.g. 'ſ' ~ 's') is only exact through the regex engine
+        return self._NAME_LEAD_IN_RE.search(text) is not None
 
     def _compile_patterns(self):
         self.compiled_patterns = {}
@@ -62,54 +88,82 @@ class PIIRedactor:
                     self.compiled_patterns[category][lang] = [re.compile(p, re.IGNORECASE) for p in lang_patterns]
             else:
                 self.compiled_patterns[category] = [re.compile(p, re.IGNORECASE) for p in patterns]
+        self._engines = {}
+
+    def _compiled_for(self, category: str, language: str) -> List[re.Pattern]:
+        patterns = self.compiled_patterns[category]
+        if not isinstance(patterns, dict):
+            return patterns
+        if category == 'names':
+            return patterns.get(language, [])
+        return patterns['zh' if language.startswith('zh') else 'en']
+
+    def _engine(self, language: str):
+        """One compiled alternation per language; every pattern is a named group, in category priority order."""
+        engine = self._engines.get(language)
+        if engine is not None:
+            return engine
+        alternatives, spans = [], {}
+        for priority, (category, tag) in enumerate(self.CATEGORY_ORDER):
+            for i, pattern in enumerate(self._compiled_for(category, language)):
+                name = f"{tag}_{i}"
+                alternatives.append(f"(?P<{name}>{pattern.pattern})")
+                # Names redact only the captured name, not the "my name is" lead-in
+                spans[name] = (priority, i, tag, pattern, 1 if category == 'names' else 0)
+        combined = re.compile("|".join(alternatives), re.IGNORECASE)
+        for name, (priority, i, tag, pattern, sub) in list(spans.items()):
+            spans[name] = (combined.groupindex[name] + sub, priority, i, tag, pattern, sub)
+        engine = self._engines[language] = (combined, spans)
+        return engine
 
     def redact_pii(self, text: str, language: str = 'en') -> Tuple[str, List[str]]:
-        if not text:
+        """
+        Single left-to-right scan with the combined pattern. At any position the alternation
+        picks the highest-priority category; when a higher-priority match starts inside a
+        lower-priority one, the lower one is cut short there (as the old category-by-category
+        passes over the partially redacted text did). Output is rebuilt once from the spans.
+        """
+        if not text or not self._may_contain_pii(text):
             return text, []
-        redacted_text = text
-        redaction_log = []
+        taken: List[Tuple[int, int, str, int, int]] = []
         try:
-            # emails
-            for pattern in self.compiled_patterns['email']:
-                matches = list(pattern.finditer(redacted_text))
-                if matches:
-                    redacted_text = pattern.sub(self.replacements['email'], redacted_text)
-                    redaction_log += ["email"] * len(matches)
-            # ids
-            patterns = self.compiled_patterns['id_numbers']['zh'] if language.startswith('zh') else self.compiled_patterns['id_numbers']['en']
-            for pattern in patterns:
-                for m in list(pattern.finditer(redacted_text)):
-                    redacted_text = redacted_text.replace(m.group(0), self.replacements['id_numbers'])
-                    redaction_log.append("id")
-            # phones
-            patterns = self.compiled_patterns['phone']['zh'] if language.startswith('zh') else self.compiled_patterns['phone']['en']
-            for pattern in patterns:
-                matches = list(pattern.finditer(redacted_text))
-                if matches:
-                    redacted_text = pattern.sub(self.replacements['phone'], redacted_text)
-                    redaction_log += ["phone"] * len(matches)
-            # names
-            if language in self.compiled_patterns['names']:
-                for pattern in self.compiled_patterns['names'][language]:
-                    for m in list(pattern.finditer(redacted_text)):
-                        name = m.group(1)
-                        redacted_text = redacted_text.replace(name, self.replacements['names'])
-                        redaction_log.append("name")
-            # addresses
-            patterns = self.compiled_patterns['address']['zh'] if language.startswith('zh') else self.compiled_patterns['address']['en']
-            for pattern in patterns:
-                for m in list(pattern.finditer(redacted_text)):
-                    redacted_text = redacted_text.replace(m.group(0), self.replacements['address'])
-                    redaction_log.append("address")
-            # dates
-            for pattern in self.compiled_patterns['dates']:
-                for m in list(pattern.finditer(redacted_text)):
-                    redacted_text = redacted_text.replace(m.group(0), self.replacements['dates'])
-                    redaction_log.append("date")
+            combined, spans = self._engine(language)
+            m = combined.search(text)
+            while m:
+                group, priority, i, tag, pattern, sub = spans[m.lastgroup]
+                end = m.end()
+                # Anything matching inside this span? Lower-priority hits there (e.g. suffixes of
+                # the same number) are skipped; the first hit at or past `end` is the next match.
+                if priority:
+                    nxt = combined.search(text, m.start() + 1)
+                    while nxt and nxt.start() < end and spans[nxt.lastgroup][1] >= priority:
+                        nxt = combined.search(text, nxt.start() + 1)
+                    if nxt and nxt.start() < end:
+                        m = pattern.match(text, m.start(), nxt.start())
+                        group = sub
+                else:
+                    nxt = combined.search(text, end)
+                if m and m.end(group) > m.start(group):
+                    taken.append((m.start(group), m.end(group), tag, priority, i))
+                m = nxt
         except Exception as e:
             logger.warning(f"PII redaction error: {e}")
             return text, []
-        return redacted_text, redaction_log
+        if not taken:
+            return text, []
+
+        # One rebuild of the output string
+        out, pos = [], 0
+        for start, end, tag, _, _ in taken:
+            out.append(text[pos:start])
+            out.append(self._replacement_by_tag[tag])
+            pos = end
+        out.append(text[pos:])
+        redaction_log = [tag for _, _, tag, _, _ in sorted(taken, key=lambda t: (t[3], t[4], t[0]))]
+        return "".join(out), redaction_log
+
+# Everything detect_language can return; the redaction patterns are keyed by these
+LANGUAGES = ("en", "zh-Hans", "zh-Hant")
 
 def detect_language(text: str) -> str:
     if not text:
@@ -123,17 +177,13 @@ def detect_language(text: str) -> str:
     return "en"
 
 _redactor = PIIRedactor()
+_NUMBER_RE = re.compile(r'\\b\\d{4,}\\b')
+_HANDLE_RE = re.compile(r'@\\w+')
 
 def sanitize_text_for_llm(text: str, lang: str):
     if not text: 
         return "", []
     red, log = _redactor.redact_pii(text, lang)
-    red = re.sub(r'\\b\\d{4,}\\b', '[NUMBER_REDACTED]', red)
-    red = re.sub(r'@\\w+', '[HANDLE_REDACTED]', red)
+    red = _NUMBER_RE.sub('[NUMBER_REDACTED]', red)
+    red = _HANDLE_RE.sub('[HANDLE_REDACTED]', red)
     return red, log
-
-def redact_text_before_return(text: str, lang: str) -> str:
-    red, _ = _redactor.redact_pii(text, lang)
-    red = re.sub(r'\\b\\d{4,}\\b', '[NUMBER_REDACTED]', red)
-    red = re.sub(r'@\\w+', '[HANDLE_REDACTED]', red)
-    return red
@@ -1,13 +1,29 @@
 # backend/app/services/pipeline.py
+import time
+from contextlib import ExitStack
+from typing import Callable, Optional, Tuple
+
 from fastapi import HTTPException
 from langchain_core.runnables import RunnableLambda, RunnableParallel
 
-from .pii import detect_language, sanitize_text_for_llm, redact_text_before_return
-from ..utils.config import JANEAPP_BASE
+from .pii import detect_language, sanitize_text_for_llm
+from ..models.types import RouteOutput
+from ..utils.config import (
+    FAQ_FAST_PATH, FAQ_MATCH_SLICE_S, INTENT_SLICE_S, GENERATION_HEDGE, GENERATION_HEDGE_DEFAULT_S, GENERATION_HEDGE_QUANTILE, GENERATION_RESERVE_S,
+    COALESCE_QUESTIONS, JANEAPP_BASE, REQUEST_DEADLINE_S, ROUTER_LATE_S, ROUTER_SLICE_S,
+)
 from ..utils.rules import PUBLIC_REFUSAL
 from ..utils.db import get_janeapp_base
+from .faq_matcher import get_faq_matcher
 from .pipeline_modules import setup
-from .pipeline_modules.query_handlers import run_sql, run_docs, build_context_from_results
+from .pipeline_modules.query_handlers import run_sql, run_docs
+from .pipeline_modules.templates import answer_from_templates
+from .pipeline_modules.context import build_context_from_results, build_degraded_answer
+from ..utils.admission import admission
+from ..utils.deadline import Deadline, LatencyWindow, StageTimeout, call_with_timeout, hedged_call, start_deadline
+from ..utils.singleflight import JoinTimeout, SingleFlight
+from ..utils.tenancy import current_tenant, scoped_session
+from ..utils.metrics import COALESCED, DEADLINE_EVENTS, FAQ_FASTPATH, TEMPLATE_ANSWERS, current_request, set_route, set_session, stage
 from ..utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -16,40 +32,214 @@ def preprocess(question: str):
     if setup.intent_chain is None:
         raise HTTPException(status_code=503, detail="LLM intents not initialized. Set the OpenAI key first.")
 
-    lang = detect_language(question)
-    sanitized, _ = sanitize_text_for_llm(question, lang)
-    intent = setup.intent_chain.invoke({"text": sanitized})
+    with stage("detect_language"):
+        lang = detect_language(question)
+    with stage("pii_redact"):
+        sanitized, redactions = sanitize_text_for_llm(question, lang)
+    # Hours / contact / price questions answered straight from SQL, before any LLM call.
+    # Deliberately ahead of the intent refusal (refusal_for): a template only matches a question
+    # asking for nothing but one public fact, and only renders the clinic's published hours,
+    # contact details and prices, so there is nothing internal for a refusal to hold back.
+    # Checking intent first would put an LLM call back on this path.
+    with stage("template"):
+        templated = answer_from_templates(sanitized, lang)
+    if templated is not None:
+        reply, kind = templated
+        TEMPLATE_ANSWERS.labels(kind).inc()
+        set_route("template")
+        return {"final": reply, "lang": lang, "sanitized": sanitized}
+    return {"lang": lang, "sanitized": sanitized, "redacted": bool(redactions)}
+
+def refusal_for(pre: dict, deadline: Deadline) -> Optional[str]:
+    """Public refusal when the intent classifier flags an internal-ops request."""
+    # Fails open: a slow or failing classifier skips the check rather than refusing patients.
+    # Answers only ever draw on the clinic's public data, whatever the intent.
+    try:
+        with stage("intent"):
+            timeout = deadline.budget(INTENT_SLICE_S, reserve=GENERATION_RESERVE_S)
+            intent = call_with_timeout(setup.intent_chain.invoke, timeout, {"text": pre["sanitized"]})
+    except Exception as e:
+        DEADLINE_EVENTS.labels("intent_skipped").inc()
+        logger.warning("Intent check skipped (%s: %s)", type(e).__name__, e)
+        return None
     if getattr(intent, "intent", None) == "internal_ops" and float(getattr(intent, "confidence", 0.0)) >= 0.6:
-        refusal = PUBLIC_REFUSAL.get(lang, PUBLIC_REFUSAL["en"])
-        return {"final": refusal, "lang": lang, "sanitized": sanitized}
-    return {"lang": lang, "sanitized": sanitized}
+        set_route("refused")
+        return PUBLIC_REFUSAL.get(pre["lang"], PUBLIC_REFUSAL["en"])
+    return None
+
+_generation_latency = LatencyWindow()
+_shared_stages = SingleFlight()
+
+def coalescing_stats() -> dict:
+    return _shared_stages.stats()
+
+def _faq_answer(pre: dict, deadline: Deadline) -> Optional[str]:
+    """Stored FAQ answer when the question nearly matches one, else None."""
+    if not FAQ_FAST_PATH:
+        return None
+    try:
+        with stage("faq_match"):
+            hit = call_with_timeout(get_faq_matcher().match, deadline.budget(FAQ_MATCH_SLICE_S), pre["sanitized"], pre["lang"])
+    except Exception as e:
+        FAQ_FASTPATH.labels("error").inc()
+        logger.warning("FAQ matching skipped: %s", e)
+        return None
+    if hit is None:
+        FAQ_FASTPATH.labels("miss").inc()
+        return None
+    reply, score, row = hit
+    FAQ_FASTPATH.labels("hit").inc()
+    set_route("faq")
+    logger.info("FAQ fast path: %r (score %.2f)", row["question"], score)
+    return reply
+
+def _route(sanitized: str, deadline: Deadline) -> RouteOutput:
+    """Router decision, or the "both" path when running late or the router overruns its slice."""
+    if deadline.elapsed() > ROUTER_LATE_S:
+        DEADLINE_EVENTS.labels("router_skipped").inc()
+        logger.info("Skipping router, %.1fs into the request", deadline.elapsed())
+        return RouteOutput("both", 0.0)
+    try:
+        with stage("router"):
+            timeout = deadline.budget(ROUTER_SLICE_S, reserve=GENERATION_RESERVE_S)
+            return call_with_timeout(setup.router.invoke, timeout, {"question": sanitized})
+    except StageTimeout as e:
+        DEADLINE_EVENTS.labels("router_timeout").inc()
+        logger.warning("Router abandoned: %s", e)
+        return RouteOutput("both", 0.0)
+
+def _generate(inputs: dict) -> str:
+    t0 = time.perf_counter()
+    raw = setup.generation_chain.invoke(inputs)
+    _generation_latency.observe(time.perf_counter() - t0)
+    return raw
+
+def _generate_within(inputs: dict, deadline: Deadline) -> str:
+    timeout = deadline.remaining()
+    if not GENERATION_HEDGE:
+        return call_with_timeout(_generate, timeout, inputs)
+    hedge_after = _generation_latency.quantile(GENERATION_HEDGE_QUANTILE, GENERATION_HEDGE_DEFAULT_S)
+    # The second attempt is another LLM call in flight: only with a spare admission slot
+    raw, hedged = hedged_call(_generate, timeout, hedge_after, inputs, may_hedge=admission.try_extra)
+    if hedged:
+        DEADLINE_EVENTS.labels("generation_hedged").inc()
+    return raw
 
 def answer(question: str, session_id: str = "default") -> str:
     if not setup.api_is_ready():
         raise HTTPException(status_code=401, detail="OpenAI API key not set or invalid. Please set it first.")
     
+    # History, admission and usage are kept per clinic: the same session id in two clinics is two sessions
+    session_id = scoped_session(session_id)
+    set_session(session_id)
+    deadline = start_deadline(REQUEST_DEADLINE_S)
     pre = preprocess(question)
     if "final" in pre:
+        setup.append_turn(session_id, pre["sanitized"], pre["final"])
         return pre["final"]
+    # Everything past here calls the LLM: wait for a slot, or get Overloaded (429).
+    # A question that joins an identical one in flight waits for it without a slot (see _plan).
+    with ExitStack() as held:
+        admit = lambda: held.enter_context(admission.slot(session_id))
+        return _answer_with_llm(question, session_id, pre, deadline, admit)
 
-    routed = setup.router.invoke({"question": pre["sanitized"]})
+def _target_lang(lang: str) -> str:
+    return "zh-Hant" if lang.startswith("zh") else "en"
+
+def _coalesce_key(pre: dict):
+    # Case, spacing and trailing punctuation don't change what the shared stages produce;
+    # the clinic does (its own SQL and indexes)
+    text = " ".join(pre["sanitized"].casefold().split()).rstrip("?!.？！。 ")
+    return current_tenant(), text, _target_lang(pre["lang"])
+
+def _shared_plan(question: str, pre: dict, deadline: Deadline) -> dict:
+    """
+    The history-independent part of a chat turn: intent refusal, FAQ fast path, routing and
+    SQL / doc retrieval. Returns {"route", "final"} for a finished reply or {"route", "results"}.
+    """
+    refusal = refusal_for(pre, deadline)
+    if refusal is not None:
+        return {"route": "refused", "final": refusal}
+    reply = _faq_answer(pre, deadline)
+    if reply is not None:
+        return {"route": "faq", "final": reply}
+
+    routed = _route(pre["sanitized"], deadline)
     if routed.route == "sql" and routed.confidence >= 0.6:
-        results = {"sql": run_sql(question), "docs": {"ok": False, "text": "", "docs": []}}
-    elif routed.route == "docs" and routed.confidence >= 0.6:
-        results = {"sql": {"ok": False, "text": "", "rows": []}, "docs": run_docs(question)}
-    else:
-        results = RunnableParallel(sql=RunnableLambda(lambda x: run_sql(x)), docs=RunnableLambda(lambda x: run_docs(x))).invoke(question)
-
-    context = build_context_from_results(results)
-    booking_base = get_janeapp_base() or JANEAPP_BASE or ""
-    target_lang = "zh-Hant" if pre["lang"].startswith("zh") else "en"
+        set_route("sql")
+        return {"route": "sql", "results": {"sql": run_sql(question), "docs": {"ok": False, "text": "", "docs": []}}}
+    if routed.route == "docs" and routed.confidence >= 0.6:
+        set_route("docs")
+        return {"route": "docs", "results": {"sql": {"ok": False, "text": "", "rows": []}, "docs": run_docs(question, pre["lang"], routed.types)}}
+    set_route("both")
+    results = RunnableParallel(sql=RunnableLambda(lambda x: run_sql(x)), docs=RunnableLambda(lambda x: run_docs(x, pre["lang"], routed.types))).invoke(question)
+    return {"route": "both", "results": results}
+
+def _admitted_plan(admit: Callable[[], None], question: str, pre: dict, deadline: Deadline) -> dict:
+    admit()
+    return _shared_plan(question, pre, deadline)
+
+def _plan(question: str, pre: dict, deadline: Deadline, admit: Callable[[], None]) -> Tuple[dict, bool]:
+    """
+    The shared stages for this question, run under an admission slot taken with `admit`, or
+    joined from an identical question in flight without one. Returns (plan, admitted).
+    When the leader is turned away (Overloaded), the questions that joined it are too.
+    """
+    # A question with redacted PII keeps its own run: the shared stages read the raw text
+    if not COALESCE_QUESTIONS or pre.get("redacted"):
+        COALESCED.labels("bypass").inc()
+        return _admitted_plan(admit, question, pre, deadline), True
+    t0 = time.perf_counter()
+    try:
+        plan, shared = _shared_stages.do(_coalesce_key(pre), _admitted_plan, admit, question, pre, deadline,
+                                         timeout=deadline.remaining())
+    except JoinTimeout:
+        # Only a follower waits on the deadline here; the leader's run ends on its own stage slices
+        DEADLINE_EVENTS.labels("coalesce_timeout").inc()
+        logger.warning("Coalesced question still in flight at the deadline; returning degraded answer")
+        set_route("both")
+        empty = {"sql": {"ok": False, "text": "", "rows": []}, "docs": {"ok": False, "text": "", "docs": []}}
+        return {"route": "both", "final": build_degraded_answer(empty, pre["lang"])}, False
+    if shared:
+        # The leader's request carries the stage spans; this one only waited
+        ctx = current_request()
+        if ctx is not None:
+            ctx.add("coalesced", time.perf_counter() - t0)
+        set_route(plan["route"])
+    return plan, not shared
+
+def _answer_with_llm(question: str, session_id: str, pre: dict, deadline: Deadline, admit: Callable[[], None]) -> str:
+    plan, admitted = _plan(question, pre, deadline, admit)
+    if plan["route"] == "refused":
+        return plan["final"]
+    if "final" in plan:
+        setup.append_turn(session_id, pre["sanitized"], plan["final"])
+        return plan["final"]
+    results = plan["results"]
+    if not admitted:
+        admit()  # a follower still generates its own reply
+
+    with stage("context"):
+        context = build_context_from_results(results)
+        booking_base = get_janeapp_base() or JANEAPP_BASE or ""
+    target_lang = _target_lang(pre["lang"])
     
-    raw = setup.generator_with_history.invoke({
-            "query": pre["sanitized"], 
-            "context": context,
-            "booking_base": booking_base,
-            "target_lang": target_lang
-        }, 
-        config={"configurable": {"session_id": session_id}})
-    safe = redact_text_before_return(raw, pre["lang"])
+    inputs = {
+        "query": pre["sanitized"],
+        "context": context,
+        "booking_base": booking_base,
+        "target_lang": target_lang,
+        "chat_history": setup.get_session_history(session_id).messages,
+    }
+    try:
+        with stage("generation"):
+            raw = _generate_within(inputs, deadline)
+    except Exception as e:
+        # Timed out or failed (both attempts if hedged): answer from the retrieved context
+        DEADLINE_EVENTS.labels("generation_degraded").inc()
+        logger.warning("Generation unavailable (%s: %s); returning degraded answer", type(e).__name__, e)
+        raw = build_degraded_answer(results, pre["lang"])
+    # The reply is not redacted: it carries the clinic's own phone, address and booking links,
+    # which a redaction pass would blank. The user's PII never reaches the LLM (sanitized above).
+    setup.append_turn(session_id, pre["sanitized"], raw)
     return raw
\ No newline at end of file
@@ -0,0 +1,157 @@
+# backend/app/services/pipeline_modules/context.py
+import logging
+from typing import Any, Dict, List, Tuple
+
+from ...utils.config import CONTEXT_TOKEN_BUDGET, CONTEXT_SQL_SHARE, DEGRADED_TOKEN_BUDGET
+from ...utils.rules import DEGRADED_EMPTY, DEGRADED_NOTICE
+from ...utils.tokens import count_tokens
+from ...utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+SQL_HEADER = "## Structured Results (SQL)\n"
+DOCS_HEADER = "## Unstructured Context (Docs)\n"
+DOC_SEPARATOR = "\n\n---\n\n"
+
+def _merge_overlap(a: str, b: str, min_overlap: int = 20, max_overlap: int = 400) -> str | None:
+    """Join two consecutive chunks, dropping the splitter's overlap; None if they don't overlap."""
+    for n in range(min(len(a), len(b), max_overlap), min_overlap - 1, -1):
+        if a.endswith(b[:n]):
+            return a + b[n:]
+    return None
+
+def _merge_source(chunks: List[Tuple[int, str]]) -> str:
+    """Chunks of one source ordered by chunk_index; adjacent ones are stitched back together."""
+    pieces: List[str] = []
+    last_idx = None
+    for idx, text in sorted(chunks):
+        if pieces and last_idx is not None and idx == last_idx + 1:
+            merged = _merge_overlap(pieces[-1], text)
+            pieces[-1] = merged if merged is not None else pieces[-1] + "\n" + text
+        else:
+            pieces.append(text)
+        last_idx = idx
+    return "\n…\n".join(pieces)
+
+def assemble_doc_snippets(docs: List[Any]) -> List[str]:
+    """
+    Group retrieved chunks by source_id, merge adjacent/overlapping chunks, drop
+    duplicate or contained text, and order sources by their best retrieval score.
+    """
+    groups: Dict[str, Dict[str, Any]] = {}
+    for rank, d in enumerate(docs):
+        content = (getattr(d, "page_content", "") or "").strip()
+        if not content:
+            continue
+        md = getattr(d, "metadata", None) or {}
+        source = md.get("source_id") or f"_doc{rank}"
+        g = groups.setdefault(source, {"chunks": {}, "score": float("-inf"), "rank": rank})
+        g["chunks"].setdefault(int(md.get("chunk_index") or rank), content)
+        score = md.get("score")
+        if score is not None:
+            g["score"] = max(g["score"], float(score))
+
+    ordered = sorted(groups.values(), key=lambda g: (-g["score"], g["rank"]))
+    snippets: List[str] = []
+    for g in ordered:
+        text = _merge_source(list(g["chunks"].items()))
+        if any(text in s for s in snippets):
+            continue
+        snippets = [s for s in snippets if s not in text]
+        snippets.append(text)
+    return snippets
+
+def _fit_lines(text: str, budget: int) -> Tuple[str, int]:
+    """Keep the CSV header line (see compact_rows) and as many whole rows as fit in `budget` tokens."""
+    lines = text.splitlines()
+    kept = lines[:1]
+    used = count_tokens("\n".join(kept))
+    rows = lines[1:]
+    for i, line in enumerate(rows):
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            # Rows arrive in the query's ORDER BY, so keep a prefix rather than cherry-picking
+            return "\n".join(kept), len(rows) - i
+        kept.append(line)
+        used += cost
+    return "\n".join(kept), 0
+
+def _truncate(text: str, budget: int) -> str:
+    if count_tokens(text) <= budget:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + " …"
+
+def build_context_from_results(results: dict, budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+    """
+    Token-budgeted context: SQL rows (up to CONTEXT_SQL_SHARE of the budget when docs
+    are present) followed by de-duplicated doc snippets in score order.
+    """
+    sql_text = results.get("sql", {}).get("text") if results.get("sql", {}).get("ok") else ""
+    docs_res = results.get("docs", {})
+    snippets = assemble_doc_snippets(docs_res.get("docs") or []) if docs_res.get("ok") else []
+    raw_docs_text = (docs_res.get("text") or "") if docs_res.get("ok") else ""
+    if not snippets and raw_docs_text:
+        snippets = [raw_docs_text]
+
+    raw_tokens = count_tokens(sql_text or "") + count_tokens(raw_docs_text)
+
+    parts = []
+    remaining = budget
+    if sql_text:
+        sql_budget = int(budget * CONTEXT_SQL_SHARE) if snippets else budget
+        fitted, dropped = _fit_lines(sql_text.strip(), sql_budget - count_tokens(SQL_HEADER))
+        if dropped:
+            fitted += f"\n({dropped} more rows omitted)"
+        parts.append(SQL_HEADER + fitted)
+        remaining -= count_tokens(parts[-1])
+
+    kept: List[str] = []
+    remaining -= count_tokens(DOCS_HEADER)
+    for snippet in snippets:
+        cost = count_tokens(snippet) + count_tokens(DOC_SEPARATOR)
+        if cost <= remaining:
+            kept.append(snippet)
+            remaining -= cost
+        elif remaining > 50:
+            kept.append(_truncate(snippet, remaining - count_tokens(DOC_SEPARATOR)))
+            break
+        else:
+            break
+    if kept:
+        parts.append(DOCS_HEADER + DOC_SEPARATOR.join(kept))
+
+    context = "\n\n".join(parts).strip()
+    if logger.isEnabledFor(logging.INFO):  # counting the assembled context is only for this line
+        logger.info("Context tokens: %d raw -> %d assembled (budget %d, %d/%d doc sources)",
+                    raw_tokens, count_tokens(context), budget, len(kept), len(snippets))
+    return context
+
+def build_degraded_answer(results: dict, lang: str, budget: int = DEGRADED_TOKEN_BUDGET) -> str:
+    """
+    Reply without the generation LLM: a short notice, the best retrieved snippet (FAQ answers
+    read as-is) and the SQL rows, within `budget` tokens.
+    """
+    key = "zh" if lang.startswith("zh") else "en"
+    docs_res = results.get("docs", {})
+    snippets = assemble_doc_snippets(docs_res.get("docs") or []) if docs_res.get("ok") else []
+    sql_text = results.get("sql", {}).get("text") if results.get("sql", {}).get("ok") else ""
+    parts = []
+    remaining = budget
+    if snippets:
+        parts.append(_truncate(snippets[0], int(budget * 0.6) if sql_text else budget))
+        remaining -= count_tokens(parts[-1])
+    if sql_text and remaining > 30:
+        fitted, dropped = _fit_lines(sql_text.strip(), remaining)
+        if dropped:
+            fitted += f"\n({dropped} more rows omitted)"
+        parts.append(fitted)
+    if not parts:
+        return DEGRADED_EMPTY[key]
+    return DEGRADED_NOTICE[key] + "\n\n" + "\n\n".join(parts)
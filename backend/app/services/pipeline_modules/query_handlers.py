@@ -1,39 +1,77 @@
 # backend/app/services/pipeline_modules/query_handlers.py
-from ...utils.db import direct_sql_pricing_consultation, expand_query_for_clinic
+from ...utils.db import compact_rows, direct_sql_pricing_consultation, execute_select, expand_query_for_clinic
+from ...utils.sql_guard import SqlRejected, SqlTimeout
+from ...utils.vectorstore import hybrid_search, typed_search
 from . import setup
+from ...utils.config import GENERATION_RESERVE_S, SQL_GENERATE_SLICE_S
+from ...utils.deadline import StageTimeout, call_with_timeout, current_deadline
+from ...utils.metrics import DEADLINE_EVENTS, stage
 from ...utils.logging import get_logger
 
 logger = get_logger(__name__)
+
 def run_sql(q: str):
     expanded = expand_query_for_clinic(q)
-    sql = setup.sql_chain.invoke({"question": expanded})
+    deadline = current_deadline()
+    try:
+        with stage("sql_generate"):
+            if deadline is None:
+                sql = setup.sql_chain.invoke({"question": expanded})
+            else:
+                # Abandon SQL writing past its slice; the keyword fallback needs no LLM
+                timeout = deadline.budget(SQL_GENERATE_SLICE_S, reserve=GENERATION_RESERVE_S)
+                sql = call_with_timeout(setup.sql_chain.invoke, timeout, {"question": expanded})
+    except StageTimeout as e:
+        DEADLINE_EVENTS.labels("sql_generate_timeout").inc()
+        logger.warning("SQL generation abandoned: %s", e)
+        return _sql_fallback(q, "")
     if not sql or not sql.strip():
-        return {"ok": False, "sql": "", "rows": [], "text": ""}
+        return {"ok": False, "sql": "", "rows": [], "columns": [], "text": ""}
     try:
-        raw = setup.execute_sql.invoke(sql)
-        if isinstance(raw, (list, tuple)):
-            try:
-                from tabulate import tabulate
-                text = tabulate(raw, headers="keys" if raw and isinstance(raw[0], dict) else [], tablefmt="github")
-            except Exception:
-                text = str(raw)
-        else:
-            text = str(raw)
-        return {"ok": bool(str(text).strip()), "sql": sql, "rows": raw, "text": text}
+        with stage("sql_execute"):
+            res = execute_select(sql)
+            text = compact_rows(res.columns, res.rows, res.truncated)
+        return {"ok": bool(text), "sql": sql, "rows": res.as_dicts(), "columns": res.columns, "text": text}
+    except (SqlRejected, SqlTimeout) as e:
+        logger.warning("Generated SQL not run: %s", e)
+        return _sql_fallback(q, sql)
     except Exception:
+        return _sql_fallback(q, sql)
+
+def _sql_fallback(q: str, sql: str):
+    with stage("sql_fallback"):
         rows_fallback, sql_fallback = direct_sql_pricing_consultation(q)
-        if rows_fallback:
-            try:
-                from tabulate import tabulate
-                text_fb = tabulate(rows_fallback, headers="keys" if rows_fallback and isinstance(rows_fallback[0], dict) else [], tablefmt="github")
-            except Exception:
-                text_fb = str(rows_fallback)
-            return {"ok": True, "sql": sql_fallback, "rows": rows_fallback, "text": text_fb}
-        return {"ok": False, "sql": sql, "rows": [], "text": ""}
+    if rows_fallback:
+        columns = list(rows_fallback[0].keys())
+        text_fb = compact_rows(columns, [tuple(r.values()) for r in rows_fallback])
+        return {"ok": bool(text_fb), "sql": sql_fallback, "rows": rows_fallback, "columns": columns, "text": text_fb}
+    return {"ok": False, "sql": sql, "rows": [], "columns": [], "text": ""}
 
-def run_docs(q: str):
+def lang_filter(lang: str | None):
+    """Chunks in the user's language plus language-neutral ones (e.g. pricing)."""
+    if not lang:
+        return None
+    code = "zh" if lang.startswith("zh") else "en"
+    return {"lang": {"$in": [code, "any"]}}
+
+def _search(q: str, expanded: str, flt, types):
+    if types:
+        return typed_search(q, types, dense_query=expanded, filter=flt)
+    return hybrid_search(q, k=4, dense_query=expanded, filter=flt)
+
+def run_docs(q: str, lang: str | None = None, types: list | None = None):
     try:
-        docs = setup.retriever.invoke(expand_query_for_clinic(q)) or []
+        # BM25 sees the raw question; synonym expansion only helps the dense side.
+        expanded = expand_query_for_clinic(q)
+        flt = lang_filter(lang)
+        with stage("retrieval"):
+            docs = _search(q, expanded, flt, types) or []
+            if flt and not docs:
+                # Nothing indexed in this language (or a pre-split index): drop the language filter
+                docs = _search(q, expanded, None, types) or []
+            if types and not docs:
+                # The router's type plan found nothing: fall back to the whole collection
+                docs = hybrid_search(q, k=4, dense_query=expanded, filter=flt) or []
         snippets = []
         for d in docs:
             content = getattr(d, "page_content", "")
@@ -43,11 +81,3 @@ def run_docs(q: str):
         return {"ok": bool(text.strip()), "text": text, "docs": docs}
     except Exception:
         return {"ok": False, "text": "", "docs": []}
-
-def build_context_from_results(results: dict) -> str:
-    parts = []
-    if results.get("sql", {}).get("ok") and results["sql"].get("text"):
-        parts.append("## Structured Results (SQL)\\n" + results["sql"]["text"])
-    if results.get("docs", {}).get("ok") and results["docs"].get("text"):
-        parts.append("## Unstructured Context (Docs)\\n" + results["docs"]["text"])
-    return "\\n\\n".join(parts).strip()
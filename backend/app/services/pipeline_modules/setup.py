@@ -1,21 +1,25 @@
 # backend/app/services/pipeline_modules/setup.py
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
 
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.utilities import SQLDatabase
-from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
-from langchain.chains import create_sql_query_chain, RetrievalQA
 from langchain_core.runnables import RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_core.runnables.history import RunnableWithMessageHistory
+from langchain_core.messages import AIMessage, HumanMessage
 
 from ...models.types import IntentOut, RouteOutput
-from ...utils.config import LLM_MODEL, OPENAI_EMBED_MODEL, SQL_DB_URL
-from ...utils.vectorstore import get_retriever, set_embedding_api_key
+from ...utils.config import LLM_STAGES
+from ...utils.db import get_engine
+from ...utils.tenancy import TenantCache
+from ...utils.vectorstore import make_embeddings, set_embedding_api_key
+from ...utils.usage import UsageCallback
+from ...utils.llm_replay import get_http_client
 from ...utils.rules import INTENT_PROMPT, SQL_PROMPT, ROUTER_PROMPT, GENERATION_PROMPT
 from ...utils.logging import get_logger
 
+if TYPE_CHECKING:
+    from langchain_community.utilities import SQLDatabase
+    from langchain_openai import ChatOpenAI
+
 logger = get_logger(__name__)
 
 # ----- API readiness flag -----
@@ -25,19 +29,42 @@ def api_is_ready() -> bool:
     return _API_READY
 
 # ----- Lazy-initialized globals (no env key usage) -----
-llm: Optional[ChatOpenAI] = None
+# langchain_openai / langchain / langchain_community are imported when the key is set or by warm-up
+llm: Optional["ChatOpenAI"] = None  # generation model
+llms: Dict[str, "ChatOpenAI"] = {}  # per stage, see LLM_STAGES
 sql_chain = None
-execute_sql = None
-retriever = None
-knowledge_chain = None
 intent_chain = None
 router = None
 generation_chain = None
-generator_with_history: Optional[RunnableWithMessageHistory] = None
 
-# SQL DB (safe to init without key)
-db = SQLDatabase.from_uri(SQL_DB_URL)
-execute_sql = QuerySQLDatabaseTool(db=db)
+# SQL DB (safe to init without key); used for table info in the SQL-writing prompt.
+# Generated queries run through utils.db.execute_select for typed rows.
+# Reflecting the schema connects to the database, so it happens on first use, not at import.
+# The app's own tables are described from models.schema rather than reflected: SQLite reflects
+# their UUID columns as NUMERIC, and reading sample rows for the prompt then fails.
+# There is one per clinic, since the prompt's sample rows are that clinic's data.
+def _load_db(tenant: str) -> "SQLDatabase":
+    from sqlalchemy import MetaData, inspect
+    from langchain_community.utilities import SQLDatabase
+    from ...models.schema import metadata as app_metadata
+    from ...models.migrations import schema_migrations
+    known = MetaData()
+    for table in app_metadata.sorted_tables:
+        table.to_metadata(known)
+    engine = get_engine()
+    # Migration bookkeeping is not clinic data; keep it (and its timestamps) out of the prompt
+    ignore = [schema_migrations.name] if inspect(engine).has_table(schema_migrations.name) else []
+    return SQLDatabase(engine, metadata=known, ignore_tables=ignore)
+
+_dbs: TenantCache["SQLDatabase"] = TenantCache("sql_schema", _load_db)
+
+def get_db() -> "SQLDatabase":
+    return _dbs.get()
+
+class _TenantDB:
+    """Stands in for the SQLDatabase in sql_chain, which is built once: every lookup goes to the current clinic's."""
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
 
 # Session store
 SESSION_STORE: Dict[str, InMemoryChatMessageHistory] = {}
@@ -48,6 +75,10 @@ def get_session_history(session_id: str) -> InMemoryChatMessageHistory:
         SESSION_STORE[session_id] = hist
     return hist
 
+def append_turn(session_id: str, user_text: str, reply: str):
+    """Record one exchange in the session history."""
+    get_session_history(session_id).add_messages([HumanMessage(content=user_text), AIMessage(content=reply)])
+
 def clear_session(session_id: str):
     SESSION_STORE.pop(session_id, None)
 
@@ -56,44 +87,55 @@ def parse_router(json_str: str) -> RouteOutput:
     import json
     try:
         obj = json.loads(json_str)
-        return RouteOutput(obj.get("route","both"), float(obj.get("confidence",0.0)))
+        types = obj.get("types") or []
+        return RouteOutput(obj.get("route","both"), float(obj.get("confidence",0.0)), list(dict.fromkeys(types)) if isinstance(types, list) else [])
     except Exception:
         return RouteOutput("both", 0.0)
     
+def _build_llm(stage: str, api_key: str) -> "ChatOpenAI":
+    from langchain_openai import ChatOpenAI
+    cfg = LLM_STAGES[stage]
+    return ChatOpenAI(
+        model=cfg["model"],
+        temperature=cfg["temperature"],
+        max_tokens=cfg["max_tokens"],
+        timeout=cfg["timeout"],
+        max_retries=cfg["max_retries"],
+        api_key=api_key,
+        http_client=get_http_client(),  # record/replay when LLM_RECORD_MODE is set
+    )
+
 def set_openai_key(new_key: str) -> bool:
     """
     Validate the key cheaply, then rebuild LLM + chains and set embeddings key.
     """
-    global llm, sql_chain, knowledge_chain, intent_chain, generation_chain, generator_with_history, retriever, router, _API_READY
+    global llm, llms, sql_chain, intent_chain, generation_chain, router, _API_READY
 
     if not new_key or not isinstance(new_key, str):
         return False
 
     # 1) Validate with a tiny embeddings call (cheapest reliable check)
     try:
-        OpenAIEmbeddings(api_key=new_key, model=OPENAI_EMBED_MODEL).embed_query("ok")
+        make_embeddings(new_key).embed_query("ok")
     except Exception:
         return False  # invalid key or blocked
 
-    # 2) Swap LLM
-    llm = ChatOpenAI(model=LLM_MODEL, temperature=0.2, api_key=new_key)
+    # 2) Swap LLMs, one per stage
+    llms = {stage: _build_llm(stage, new_key) for stage in LLM_STAGES}
+    llm = llms["generation"]
+    for stage, cfg in LLM_STAGES.items():
+        logger.info("LLM stage %s: model=%s temperature=%s max_tokens=%s timeout=%ss max_retries=%s",
+                    stage, cfg['model'], cfg['temperature'], cfg['max_tokens'], cfg['timeout'], cfg['max_retries'])
 
-    # 3) Swap embeddings used by retriever
+    # 3) Swap embeddings used for retrieval
     set_embedding_api_key(new_key)  # same model; if you change models, re-ingest
 
-    # 4) Rebuild chains
-    sql_chain = create_sql_query_chain(llm=llm, db=db, prompt=SQL_PROMPT, k=5)
-    retriever = get_retriever(k=4)
-    knowledge_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-    intent_chain = INTENT_PROMPT | llm.with_structured_output(IntentOut)
-    router = ROUTER_PROMPT | llm | StrOutputParser() | RunnableLambda(parse_router)
+    # 4) Rebuild chains; each one attributes its token usage to its stage
+    from langchain.chains import create_sql_query_chain
+    sql_chain = create_sql_query_chain(llm=llms["sql"], db=_TenantDB(), prompt=SQL_PROMPT, k=5).with_config(callbacks=[UsageCallback("sql_generate")])
+    intent_chain = (INTENT_PROMPT | llms["intent"].with_structured_output(IntentOut)).with_config(callbacks=[UsageCallback("intent")])
+    router = (ROUTER_PROMPT | llms["router"] | StrOutputParser() | RunnableLambda(parse_router)).with_config(callbacks=[UsageCallback("router")])
     
-    generation_chain = GENERATION_PROMPT | llm | StrOutputParser()
-    generator_with_history = RunnableWithMessageHistory(
-        generation_chain,
-        get_session_history,
-        input_messages_key="query",
-        history_messages_key="chat_history",
-    )
+    generation_chain = (GENERATION_PROMPT | llm | StrOutputParser()).with_config(callbacks=[UsageCallback("generation")])
     _API_READY = True
     return True
\ No newline at end of file
@@ -0,0 +1,273 @@
+# backend/app/services/pipeline_modules/templates.py
+"""
+Template answers for structured facts: opening hours, contact details and prices.
+
+`answer_from_templates` only answers when the question resolves to exactly one fact type
+and nothing else is asked (every remaining word belongs to that fact's vocabulary);
+anything open-ended, mixed or unresolved returns None and goes through the LLM pipeline.
+Replies are rendered in English or Traditional Chinese from `clinic_info`, `clinic_hours`,
+`pricing` and `team_members`, with booking links from `get_janeapp_base()` + janeAppId.
+"""
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from ...models.schema import clinic_hours, clinic_info, pricing, services, team_members, team_services
+from ...utils.db import get_engine, get_janeapp_base
+from ...utils.lexical import tokenize
+from ...utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_DAYS_ZH = ["星期一", "星期二", "星期三", "星期四", "星期五", "星期六", "星期日"]
+_DAY_ALIASES = {
+    **{d.lower(): d for d in DAYS},
+    **{d[:3].lower(): d for d in DAYS},
+    "weekend": "Saturday,Sunday", "weekends": "Saturday,Sunday",
+}
+_DAY_ZH_RE = re.compile(r"(?:星期|週|周|禮拜|礼拜)([一二三四五六日天])|(週末|周末)")
+_ZH_DAY_INDEX = {c: i for i, c in enumerate("一二三四五六日")}
+
+_KINDS = {
+    "hours": re.compile(r"\b(hours?|open|opening|opens|close|closed|closes|closing)\b|營業|营业|開門|开门|關門|关门|幾點|几点|休息", re.I),
+    "contact": re.compile(r"\b(phone|telephone|call|email|e-mail|address|located|location|contact|directions)\b|電話|电话|電郵|电邮|郵箱|邮箱|地址|位置|在哪|聯絡|联络|聯繫|联系", re.I),
+    "price": re.compile(r"\b(price|prices|pricing|cost|costs|fee|fees|how much|charge|charges|rate|rates)\b|多少錢|多少钱|費用|费用|價錢|价钱|價格|价格|收費|收费", re.I),
+}
+# Questions that need judgement (or that the public bot must not answer) never get a template
+_OPEN_ENDED = re.compile(
+    r"\b(why|should|recommend|suitable|help|treat|pain|insurance|billing|cover|covered|refund|cancel|book|booking|"
+    r"appointment|available|availability|staff|salary|revenue|internal|supplier|payroll|discount)\b|"
+    r"為什麼|为什么|推薦|推荐|適合|适合|治療|治疗|保險|保险|預約|预约|取消|折扣",
+    re.I,
+)
+
+_CONTACT_FIELDS = {
+    "phone": ("phone", "telephone", "call", "電話", "电话"),
+    "email": ("email", "e-mail", "電郵", "电邮", "郵箱", "邮箱"),
+    "address": ("address", "located", "location", "directions", "地址", "位置", "在哪"),
+}
+# Words each fact type may contain besides its keywords (tokens from utils.lexical.tokenize)
+_COMMON_WORDS = {"what's", "whats", "tell", "please", "clinic", "know", "like", "would", "could", "us", "time", "times", "today"}
+_VOCAB = {
+    "hours": {"hours", "hour", "open", "opening", "opens", "close", "closed", "closes", "closing", "day", "days", "week",
+              "weekday", "weekdays", "weekend", "weekends", "on", "from", "until", "late", "early"} | set(_DAY_ALIASES),
+    "contact": {"phone", "telephone", "call", "number", "email", "e", "mail", "address", "located", "location", "contact",
+                "directions", "details", "info", "information", "reach", "find", "get"},
+    "price": {"price", "prices", "pricing", "cost", "costs", "fee", "fees", "much", "charge", "charges", "rate", "rates",
+              "list", "services", "service", "treatment", "treatments", "session", "sessions", "visit", "all",
+              "initial", "first", "consultation", "consult", "follow", "up", "followup", "follow-up", "min", "mins",
+              "minute", "minutes", "per"},
+}
+# Filler left after removing the fact keywords from a Chinese question
+_ZH_FILLER = set("你您們们的嗎吗呢是請请問问什麼么甚有多少一下診诊所貴贵幾几號号碼码哪裡里呀啊要時时間间")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+# Common treatment names in Chinese -> English words matched against pricing/services names
+_ZH_SERVICE_ALIASES = {
+    "針灸": "acupuncture", "针灸": "acupuncture", "按摩": "massage", "推拿": "massage",
+    "自然療法": "naturopathy", "自然疗法": "naturopathy", "拔罐": "cupping", "中藥": "herbal", "中药": "herbal",
+}
+_INITIAL_RE = re.compile(r"\b(initial|first|new patient)\b|初診|初诊|首次|第一次", re.I)
+_FOLLOWUP_RE = re.compile(r"\b(follow[- ]?up|subsequent|return)\b|複診|复诊|回診|回诊", re.I)
+_MINUTES_RE = re.compile(r"(\d{2,3})\s*(?:min|mins|minute|minutes|分鐘|分钟)", re.I)
+
+def _is_zh(lang: str) -> bool:
+    return lang.startswith("zh")
+
+def _fact_kind(question: str) -> Optional[str]:
+    if _OPEN_ENDED.search(question):
+        return None
+    kinds = [kind for kind, pattern in _KINDS.items() if pattern.search(question)]
+    return kinds[0] if len(kinds) == 1 else None
+
+def _leftover_words(question: str, kind: str, extra: Set[str]) -> List[str]:
+    """Latin words the fact vocabulary does not cover; any of them means the question asks for more."""
+    allowed = _VOCAB[kind] | _COMMON_WORDS | extra
+    return [t for t in tokenize(question) if not _CJK_RE.match(t) and not t.isdigit() and t not in allowed]
+
+def _zh_leftover(question: str, kind: str, extra: List[str]) -> int:
+    stripped = _KINDS[kind].sub("", question)
+    stripped = _DAY_ZH_RE.sub("", stripped)
+    for term in extra:
+        stripped = stripped.replace(term, "")
+    stripped = _INITIAL_RE.sub("", _FOLLOWUP_RE.sub("", _MINUTES_RE.sub("", stripped)))
+    return sum(1 for ch in stripped if _CJK_RE.match(ch) and ch not in _ZH_FILLER)
+
+def _asked_days(question: str) -> List[str]:
+    days: List[str] = []
+    for token in tokenize(question):
+        for day in _DAY_ALIASES.get(token, "").split(","):
+            if day and day not in days:
+                days.append(day)
+    for m in _DAY_ZH_RE.finditer(question):
+        picked = ["Saturday", "Sunday"] if m.group(2) else [DAYS[_ZH_DAY_INDEX["日" if m.group(1) == "天" else m.group(1)]]]
+        days.extend(d for d in picked if d not in days)
+    return days
+
+# ----- data -----
+def _latest_clinic(conn):
+    return conn.execute(select(clinic_info).order_by(clinic_info.c.updatedAt.desc()).limit(1)).mappings().first()
+
+def _hours_rows(conn, clinic_id) -> Dict[str, Tuple[str, str]]:
+    rows = conn.execute(select(clinic_hours.c.day, clinic_hours.c.open_time, clinic_hours.c.close_time)
+                        .where(clinic_hours.c.clinic_id == clinic_id)).all()
+    return {r.day: (r.open_time or "", r.close_time or "") for r in rows}
+
+def _pricing_rows(conn) -> List[Dict]:
+    stmt = (select(pricing.c.item, pricing.c.type, pricing.c.category, pricing.c.price, pricing.c.max,
+                   pricing.c.service_id, services.c.name.label("service"))
+            .select_from(pricing.outerjoin(services, services.c.id == pricing.c.service_id))
+            .order_by(pricing.c.category, pricing.c.price))
+    return [dict(r) for r in conn.execute(stmt).mappings()]
+
+def _practitioners_for(conn, service_ids: List) -> List[Dict]:
+    if not service_ids:
+        return []
+    stmt = (select(team_members.c.fullName, team_members.c.prefix, team_members.c.janeAppId).distinct()
+            .select_from(team_members.join(team_services, team_services.c.practitioner_id == team_members.c.id))
+            .where(team_services.c.service_id.in_(service_ids), team_members.c.janeAppId.is_not(None))
+            .order_by(team_members.c.fullName).limit(5))
+    return [dict(r) for r in conn.execute(stmt).mappings()]
+
+# ----- rendering -----
+def _fmt_time(value: str) -> str:
+    return value[:5] if re.match(r"^\d{1,2}:\d{2}", value or "") else value
+
+def _is_closed(open_time: str, close_time: str) -> bool:
+    return not open_time or open_time.lower() == "closed" or close_time.lower() == "closed"
+
+def render_hours(hours: Dict[str, Tuple[str, str]], days: List[str], zh: bool) -> Optional[str]:
+    if not hours:
+        return None
+    def day_name(day: str) -> str:
+        return _DAYS_ZH[DAYS.index(day)] if zh else day
+    def line(day: str) -> str:
+        open_time, close_time = hours.get(day, ("", ""))
+        if _is_closed(open_time, close_time):
+            return "休息" if zh else "Closed"
+        return f"{_fmt_time(open_time)}–{_fmt_time(close_time)}"
+    if len(days) == 1:
+        day = days[0]
+        if _is_closed(*hours.get(day, ("", ""))):
+            return f"{day_name(day)}休息。" if zh else f"We're closed on {day}."
+        return f"{day_name(day)}營業時間：{line(day)}。" if zh else f"Our hours on {day}: {line(day)}."
+    shown = days or [d for d in DAYS if d in hours]
+    header = "營業時間：" if zh else "Our opening hours:"
+    sep = "：" if zh else ": "
+    return header + "\n" + "\n".join(f"- {day_name(d)}{sep}{line(d)}" for d in shown)
+
+def render_contact(clinic: Dict, fields: List[str], zh: bool) -> Optional[str]:
+    address = ", ".join(p for p in [clinic.get("street"), clinic.get("city"),
+                                     " ".join(p for p in [clinic.get("province"), clinic.get("postalCode")] if p),
+                                     clinic.get("country")] if p)
+    values = {"phone": clinic.get("phone"), "email": clinic.get("email"), "address": address}
+    labels = {"phone": "電話", "email": "電郵", "address": "地址"} if zh else {"phone": "Phone", "email": "Email", "address": "Address"}
+    lines = [f"- {labels[f]}{'：' if zh else ': '}{values[f]}" for f in fields if values.get(f)]
+    if not lines:
+        return None
+    name = clinic.get("name") or ""
+    header = f"{name}聯絡資料：" if zh else f"How to reach {name}:".replace(" :", ":")
+    return header + "\n" + "\n".join(lines)
+
+def _fmt_price(row: Dict, zh: bool) -> str:
+    price, top = row.get("price"), row.get("max")
+    if price is None and top is None:
+        return "未列出價格" if zh else "price not listed"
+    if price is not None and top is not None and top != price:
+        return f"${price}–${top}"
+    return f"${price if price is not None else top}"
+
+def _type_label(value: Optional[str], zh: bool) -> str:
+    v = (value or "").lower()
+    if v == "initial":
+        return "初診" if zh else "Initial"
+    if v in ("follow-up", "followup", "follow up"):
+        return "複診" if zh else "Follow-up"
+    return value or ""
+
+def _booking_lines(practitioners: List[Dict], base: Optional[str], zh: bool) -> List[str]:
+    if not base:
+        return []
+    links = []
+    for p in practitioners:
+        name = " ".join(x for x in [p.get("prefix"), p.get("fullName")] if x)
+        links.append(f"[{'預約 ' if zh else 'Book with '}{name}]({base}/#/staff_member/{p['janeAppId']})")
+    return links or [f"[線上預約]({base})" if zh else f"[Book online]({base})"]
+
+def render_prices(rows: List[Dict], practitioners: List[Dict], base: Optional[str], zh: bool) -> Optional[str]:
+    if not rows:
+        return None
+    out: List[str] = []
+    categories = list(dict.fromkeys(r.get("category") or r.get("service") or "" for r in rows))
+    for category in categories:
+        out.append(f"{category}{' 收費：' if zh else ' prices:'}" if category else ("收費：" if zh else "Prices:"))
+        for r in rows:
+            if (r.get("category") or r.get("service") or "") != category:
+                continue
+            label = _type_label(r.get("type"), zh)
+            out.append(f"- {r.get('item')}{f' ({label})' if label else ''}: {_fmt_price(r, zh)}")
+    out.extend([""] + _booking_lines(practitioners, base, zh) if base else [])
+    return "\n".join(out).strip()
+
+def _select_prices(question: str, rows: List[Dict]) -> Tuple[List[Dict], Set[str], List[str]]:
+    """Rows the question names (by category/service words), narrowed by type and duration when given."""
+    lowered = question.lower()
+    zh_terms = [zh for zh in _ZH_SERVICE_ALIASES if zh in question]
+    words = set(tokenize(lowered)) | {_ZH_SERVICE_ALIASES[zh] for zh in zh_terms}
+    names: Set[str] = set()
+    picked = []
+    for r in rows:
+        name_words = set(tokenize(f"{r.get('category') or ''} {r.get('service') or ''}"))
+        hit = name_words & words
+        if hit:
+            picked.append(r)
+            names |= name_words
+    if not picked:
+        return [], names, zh_terms
+    narrowed = picked
+    if _INITIAL_RE.search(question):
+        narrowed = [r for r in narrowed if (r.get("type") or "").lower() == "initial"] or narrowed
+    elif _FOLLOWUP_RE.search(question):
+        narrowed = [r for r in narrowed if "follow" in (r.get("type") or "").lower()] or narrowed
+    minutes = _MINUTES_RE.search(question)
+    if minutes:
+        narrowed = [r for r in narrowed if re.search(rf"\b{minutes.group(1)}\s*min", r.get("item") or "", re.I)] or narrowed
+    return narrowed, names, zh_terms
+
+def answer_from_templates(question: str, lang: str) -> Optional[Tuple[str, str]]:
+    """(reply, fact kind) when the question resolves to exactly one structured fact, else None."""
+    kind = _fact_kind(question)
+    if kind is None:
+        return None
+    zh = _is_zh(lang)
+    try:
+        with get_engine().connect() as conn:
+            if kind == "price":
+                rows = _pricing_rows(conn)
+                chosen, names, zh_terms = _select_prices(question, rows)
+                generic = not names and not _leftover_words(question, kind, set()) and not _zh_leftover(question, kind, [])
+                if generic:
+                    chosen = rows  # "what are your prices?" -> the full list
+                elif not chosen or _leftover_words(question, kind, names) or _zh_leftover(question, kind, zh_terms):
+                    return None
+                service_ids = list(dict.fromkeys(r["service_id"] for r in chosen if r.get("service_id")))
+                practitioners = [] if generic else _practitioners_for(conn, service_ids)
+                reply = render_prices(chosen, practitioners, get_janeapp_base(), zh)
+            else:
+                if _leftover_words(question, kind, set()) or _zh_leftover(question, kind, []):
+                    return None
+                clinic = _latest_clinic(conn)
+                if clinic is None:
+                    return None
+                if kind == "hours":
+                    reply = render_hours(_hours_rows(conn, clinic["id"]), _asked_days(question), zh)
+                else:
+                    lowered = question.lower()
+                    fields = [f for f, terms in _CONTACT_FIELDS.items() if any(t in lowered for t in terms)]
+                    reply = render_contact(dict(clinic), fields or list(_CONTACT_FIELDS), zh)
+    except Exception as e:
+        logger.warning("Template answer failed (%s): %s", kind, e)
+        return None
+    return (reply, kind) if reply else None
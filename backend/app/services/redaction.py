@@ -0,0 +1,205 @@
+# backend/app/services/redaction.py
+"""
+Bulk transcript redaction with the same rules as the chat path (`detect_language` +
+`PIIRedactor` via `sanitize_text_for_llm`), sharded across a process pool.
+
+Input is JSONL, one object per line with the text under `field` (default "text") and
+an optional "lang" (en, zh-Hans or zh-Hant; anything else is detected); other keys pass through. Each output line is the record with the
+text redacted, the language used and `pii_counts` per category.
+
+CLI:
+    cd backend
+    python -m app.services.redaction transcripts.jsonl -o redacted.jsonl --workers 4
+    cat export.jsonl | python -m app.services.redaction - > redacted.jsonl
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from .pii import LANGUAGES, detect_language, sanitize_text_for_llm
+from ..utils.config import REDACT_WORKERS, REDACT_CHUNK_SIZE
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+def redact_record(record: Dict[str, Any], field: str = "text") -> Dict[str, Any]:
+    text = record.get(field)
+    if not isinstance(text, str):
+        return {**record, "error": f"missing string field '{field}'"}
+    # A language the patterns don't know would fail inside the redactor and pass the text through
+    lang = record.get("lang")
+    if lang not in LANGUAGES:
+        lang = detect_language(text)
+    redacted, log = sanitize_text_for_llm(text, lang)
+    return {**record, field: redacted, "lang": lang, "pii_counts": dict(Counter(log))}
+
+def redact_lines(lines: List[str], field: str = "text") -> List[Dict[str, Any]]:
+    """Worker entry point: parse and redact one shard of JSONL lines."""
+    out = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            out.append({"error": f"invalid JSON: {e}"})
+            continue
+        if not isinstance(record, dict):
+            out.append({"error": "expected a JSON object"})
+            continue
+        out.append(redact_record(record, field))
+    return out
+
+class BatchStats:
+    def __init__(self):
+        self.records = 0
+        self.errors = 0
+        self.counts: Counter = Counter()
+        self.started = time.perf_counter()
+
+    def add(self, results: List[Dict[str, Any]]):
+        for r in results:
+            self.records += 1
+            if "error" in r:
+                self.errors += 1
+            self.counts.update(r.get("pii_counts") or {})
+
+    def summary(self) -> Dict[str, Any]:
+        seconds = time.perf_counter() - self.started
+        return {
+            "records": self.records,
+            "errors": self.errors,
+            "counts": dict(self.counts),
+            "seconds": round(seconds, 3),
+            "records_per_sec": round(self.records / seconds, 1) if seconds > 0 else None,
+        }
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn, not fork: the API process has live threads (uvicorn, DB pools) that must not be cloned
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_redaction_pool() -> ProcessPoolExecutor:
+    """Process pool shared by /redact/batch requests, started on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _new_pool(REDACT_WORKERS)
+                logger.info("Started redaction pool with %s workers", REDACT_WORKERS)
+    return _pool
+
+def shutdown_redaction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _shards(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    shard = []
+    for line in lines:
+        if line.strip():
+            shard.append(line)
+            if len(shard) >= size:
+                yield shard
+                shard = []
+    if shard:
+        yield shard
+
+def redact_stream(lines: Iterable[str], pool: ProcessPoolExecutor, stats: BatchStats, field: str = "text",
+                  chunk_size: int = REDACT_CHUNK_SIZE, max_pending: int = 2 * REDACT_WORKERS) -> Iterator[Dict[str, Any]]:
+    """Redact JSONL lines, yielding results in input order with at most `max_pending` shards in flight."""
+    pending: deque = deque()
+    for shard in _shards(lines, chunk_size):
+        pending.append(pool.submit(redact_lines, shard, field))
+        if len(pending) >= max_pending:
+            results = pending.popleft().result()
+            stats.add(results)
+            yield from results
+    while pending:
+        results = pending.popleft().result()
+        stats.add(results)
+        yield from results
+
+async def _async_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    buf = b""
+    async for chunk in chunks:
+        buf += chunk
+        *complete, buf = buf.split(b"\n")
+        for line in complete:
+            yield line.decode("utf-8", errors="replace")
+    if buf:
+        yield buf.decode("utf-8", errors="replace")
+
+async def redact_stream_async(chunks: AsyncIterator[bytes], stats: BatchStats, field: str = "text",
+                              chunk_size: int = REDACT_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Request body (bytes) -> JSONL output lines, using the shared pool; ends with a summary line."""
+    pool = get_redaction_pool()
+    loop = asyncio.get_running_loop()
+    max_pending = 2 * REDACT_WORKERS
+    pending: deque = deque()
+    shard: List[str] = []
+
+    async def _drain_one():
+        results = await pending.popleft()
+        stats.add(results)
+        return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+
+    async for line in _async_lines(chunks):
+        if not line.strip():
+            continue
+        shard.append(line)
+        if len(shard) >= chunk_size:
+            pending.append(loop.run_in_executor(pool, redact_lines, shard, field))
+            shard = []
+            if len(pending) >= max_pending:
+                yield await _drain_one()
+    if shard:
+        pending.append(loop.run_in_executor(pool, redact_lines, shard, field))
+    while pending:
+        yield await _drain_one()
+    summary = stats.summary()
+    logger.info("Batch redaction: %s records in %ss (%s rec/s)", summary['records'], summary['seconds'], summary['records_per_sec'])
+    yield json.dumps({"summary": summary}, ensure_ascii=False) + "\n"
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Redact PII from JSONL transcripts.")
+    parser.add_argument("input", help="JSONL file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file (default stdout)")
+    parser.add_argument("--field", default="text", help="key holding the text to redact")
+    parser.add_argument("--workers", type=int, default=REDACT_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=REDACT_CHUNK_SIZE, help="records per shard")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    stats = BatchStats()
+    try:
+        with _new_pool(args.workers) as pool:
+            records = redact_stream(src, pool, stats, field=args.field, chunk_size=args.chunk_size,
+                                   max_pending=2 * args.workers)
+            for record in records:
+                dst.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    summary = stats.summary()
+    counts = ", ".join(f"{k}={v}" for k, v in sorted(summary["counts"].items())) or "none"
+    print(
+        f"{summary['records']} records ({summary['errors']} errors) in {summary['seconds']}s "
+        f"= {summary['records_per_sec']} records/sec with {args.workers} workers; redactions: {counts}",
+        file=sys.stderr,
+    )
+
+if __name__ == "__main__":
+    main()
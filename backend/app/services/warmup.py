@@ -0,0 +1,75 @@
+# backend/app/services/warmup.py
+"""
+Background warm-up after startup. The API imports no LLM client, vector-store client or
+text splitter and does not reflect the SQL schema at import time, so it can answer
+/health quickly. This thread then loads those pieces so the first /chat does not pay for
+them. Each step is timed into the startup report. A request that arrives first just
+loads what it needs itself; Python's import lock keeps the two from loading the same
+module twice.
+"""
+import threading
+import time
+
+from ..utils import startup
+from ..utils.config import VECTOR_BACKEND
+from ..utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+def _import_llm_clients():
+    import langchain_openai  # noqa: F401
+    import langchain.chains  # noqa: F401
+
+def _import_vector_client():
+    if VECTOR_BACKEND != "numpy":
+        import chromadb  # noqa: F401
+        import langchain_chroma  # noqa: F401
+
+def _reflect_sql_schema():
+    from .pipeline_modules import setup
+    setup.get_db().get_usable_table_names()
+
+def _import_text_splitter():
+    import langchain_text_splitters  # noqa: F401
+
+def _load_indexes():
+    from ..utils.lexical import get_lexical_index
+    from .faq_matcher import get_faq_matcher
+    get_lexical_index()
+    get_faq_matcher()
+
+def _load_tokenizer():
+    from ..utils.tokens import count_tokens
+    count_tokens("warm-up")
+
+STEPS = [
+    ("import LLM clients", _import_llm_clients),
+    ("import vector store client", _import_vector_client),
+    ("reflect SQL schema", _reflect_sql_schema),
+    ("load retrieval indexes", _load_indexes),
+    ("load tokenizer", _load_tokenizer),
+    ("import text splitter", _import_text_splitter),
+]
+
+def warm_up():
+    startup.set_warmup_state("running")
+    t0 = time.perf_counter()
+    failed = []
+    for name, step in STEPS:
+        try:
+            with startup.phase(f"warmup: {name}"):
+                step()
+        except Exception as e:
+            failed.append(name)
+            logger.warning("Warm-up step '%s' failed: %s", name, e)
+    seconds = time.perf_counter() - t0
+    startup.set_warmup_state("failed" if failed else "done", seconds)
+    if failed:
+        logger.info("Warm-up finished in %.2fs (%d steps failed)", seconds, len(failed))
+    else:
+        logger.info("Warm-up finished in %.2fs", seconds)
+
+def start_warm_up() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,161 @@
+# backend/app/utils/admission.py
+"""
+Admission control for LLM-bound chat requests.
+
+At most ADMISSION_MAX_INFLIGHT requests run the LLM stages at once. Others wait in a
+bounded queue (ADMISSION_QUEUE_SIZE, at most ADMISSION_MAX_PER_SESSION per session) and
+freed slots go round-robin across sessions, FIFO within one, so a chatty session cannot
+starve the rest. When the queue is full, or a request has waited ADMISSION_MAX_WAIT_S,
+`Overloaded` is raised with a Retry-After estimate (the API turns it into a 429).
+
+A slot is held until the request and every stage call it submitted to the stage pool have
+finished, so calls the deadline abandoned still count against the limit until they end
+(at the latest at their client timeout). A hedged second generation needs a spare slot of
+its own (`try_extra`), so ADMISSION_MAX_INFLIGHT bounds the LLM calls in flight.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Iterator, Optional
+
+from .config import ADMISSION_MAX_INFLIGHT, ADMISSION_MAX_PER_SESSION, ADMISSION_MAX_WAIT_S, ADMISSION_QUEUE_SIZE
+from .metrics import ADMISSION_INFLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"{reason}; retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _Hold:
+    """Slots held by one request: released once the request and its tracked stage calls are done."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self.controller = controller
+        self.started = time.perf_counter()
+        self.slots = 1
+        self._pending = 1  # the request itself
+        self._lock = threading.Lock()
+
+    def track(self, future: Future):
+        with self._lock:
+            if not self._pending:
+                return  # already released; nothing left to hold the slot for
+            self._pending += 1
+        future.add_done_callback(lambda _: self.done())
+
+    def done(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending:
+                return
+        self.controller.release(time.perf_counter() - self.started, self.slots)
+
+_hold: ContextVar[Optional[_Hold]] = ContextVar("clinicbot_admission_hold", default=None)
+
+def track(future: Future):
+    """Keep the current request's slot until `future` finishes (called for stage pool submissions)."""
+    hold = _hold.get()
+    if hold is not None:
+        hold.track(future)
+
+class AdmissionController:
+    def __init__(self, max_inflight: int, max_queue: int, max_per_session: int, max_wait: float):
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._waiting: "OrderedDict[str, Deque[threading.Event]]" = OrderedDict()  # round-robin order
+        self._queued = 0
+        self._avg_service = 5.0  # seconds a slot is held, EWMA
+
+    def retry_after(self) -> int:
+        """Rough time for the current backlog to drain, in whole seconds."""
+        seconds = (self._queued + 1) * self._avg_service / self.max_inflight
+        return max(1, min(60, math.ceil(seconds)))
+
+    def _reject(self, reason: str):
+        ADMISSION_REJECTED.labels(reason).inc()
+        raise Overloaded(reason, self.retry_after())
+
+    def _update_gauges(self):
+        ADMISSION_INFLIGHT.set(self._inflight)
+        ADMISSION_QUEUE_DEPTH.set(self._queued)
+
+    def acquire(self, session_id: str):
+        t0 = time.perf_counter()
+        with self._lock:
+            if self._inflight < self.max_inflight and not self._queued:
+                self._inflight += 1
+                self._update_gauges()
+                ADMISSION_WAIT_SECONDS.observe(0.0)
+                return
+            if self._queued >= self.max_queue:
+                self._reject("queue_full")
+            queue = self._waiting.get(session_id)
+            if queue is not None and len(queue) >= self.max_per_session:
+                self._reject("session_limit")
+            ticket = threading.Event()
+            self._waiting.setdefault(session_id, deque()).append(ticket)
+            self._queued += 1
+            self._update_gauges()
+        ticket.wait(self.max_wait)
+        with self._lock:
+            # Checked under the lock: a grant can land between the wait timing out and here
+            if not ticket.is_set():
+                # Timed out (a grant arriving now would have set the ticket under this lock)
+                queue = self._waiting.get(session_id)
+                if queue is not None and ticket in queue:
+                    queue.remove(ticket)
+                    self._queued -= 1
+                    if not queue:
+                        del self._waiting[session_id]
+                self._update_gauges()
+                self._reject("wait_timeout")
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - t0)
+
+    def try_extra(self) -> bool:
+        """Take one more slot for the current request if one is free and nobody is queued."""
+        hold = _hold.get()
+        with self._lock:
+            if hold is None or self._inflight >= self.max_inflight or self._queued:
+                return False
+            self._inflight += 1
+            hold.slots += 1
+            self._update_gauges()
+        return True
+
+    def release(self, held: float, slots: int = 1):
+        with self._lock:
+            self._avg_service = 0.8 * self._avg_service + 0.2 * held
+            self._inflight -= slots
+            while self._inflight < self.max_inflight and self._waiting:
+                session_id, queue = next(iter(self._waiting.items()))
+                ticket = queue.popleft()
+                self._queued -= 1
+                # Next turn goes to the next session; this one rejoins at the back if it still waits
+                del self._waiting[session_id]
+                if queue:
+                    self._waiting[session_id] = queue
+                self._inflight += 1
+                ticket.set()
+            self._update_gauges()
+
+    @contextmanager
+    def slot(self, session_id: str) -> Iterator[None]:
+        self.acquire(session_id)
+        hold = _Hold(self)
+        token = _hold.set(hold)
+        try:
+            yield
+        finally:
+            _hold.reset(token)
+            hold.done()
+
+admission = AdmissionController(ADMISSION_MAX_INFLIGHT, ADMISSION_QUEUE_SIZE, ADMISSION_MAX_PER_SESSION, ADMISSION_MAX_WAIT_S)
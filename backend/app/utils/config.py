@@ -1,16 +1,152 @@
 # backend/app/utils/config.py
+import json
 import os
 
 # Core paths
 DATA_DIR = os.getenv("DATA_DIR", "/app/data/json")
 SQL_DB_URL = os.getenv("SQL_DB_URL", "sqlite:////app/data/clinic.db")
 CHROMA_URL = os.getenv("CHROMA_URL", "/app/data/chroma_db")
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "/app/data/lexical_index.json")
+
+# Vector store backend: "chroma" (HTTP server) or "numpy" (in-process, memory-mapped file)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+NUMPY_STORE_PATH = os.getenv("NUMPY_STORE_PATH", "/app/data/vectors/clinic_data")
+
+# Precompiled knowledge bundle (SQL records + chunks + embeddings), mapped at startup if present
+KNOWLEDGE_BUNDLE_PATH = os.getenv("KNOWLEDGE_BUNDLE_PATH", "/app/data/knowledge.bundle")
 
 # Models
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4.1-nano-2025-04-14")
+# Per-stage LLM settings (model, temperature, max_tokens, timeout seconds). Precedence: env
+# LLM_<STAGE>_MODEL / _TEMPERATURE / _MAX_TOKENS / _TIMEOUT / _MAX_RETRIES, then the LLM_STAGE_CONFIG JSON file
+# ({"intent": {"model": "...", "max_tokens": 32}, ...}), then the defaults below.
+# Classification stages only emit a few tokens, so they get small max_tokens and short timeouts.
+# No client retries: the request deadline decides what happens next (fallback, hedge), and the
+# timeout stays the ceiling on how long an abandoned call keeps running.
+LLM_STAGE_CONFIG = os.getenv("LLM_STAGE_CONFIG", "")
+_STAGE_DEFAULTS = {
+    "intent": {"temperature": 0.0, "max_tokens": 64, "timeout": 10.0, "max_retries": 0},
+    "router": {"temperature": 0.0, "max_tokens": 96, "timeout": 10.0, "max_retries": 0},
+    "sql": {"temperature": 0.0, "max_tokens": 400, "timeout": 20.0, "max_retries": 0},
+    "generation": {"temperature": 0.2, "max_tokens": None, "timeout": 60.0, "max_retries": 0},
+}
+
+def _load_stage_file(path: str) -> dict:
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _stage_settings() -> dict:
+    from_file = _load_stage_file(LLM_STAGE_CONFIG)
+    out = {}
+    for stage, defaults in _STAGE_DEFAULTS.items():
+        cfg = {"model": LLM_MODEL, **defaults, **from_file.get(stage, {})}
+        prefix = f"LLM_{stage.upper()}_"
+        for key, cast in (("model", str), ("temperature", float), ("max_tokens", int), ("timeout", float), ("max_retries", int)):
+            raw = os.getenv(prefix + key.upper())
+            if raw is not None and raw.strip():
+                cfg[key] = cast(raw)
+        out[stage] = cfg
+    return out
+
+LLM_STAGES = _stage_settings()
+
+# USD per 1M tokens (input, cached input, output) for cost estimates; empty = built-in table in utils.usage
+LLM_PRICE_PER_1M = os.getenv("LLM_PRICE_PER_1M", "")
+# Rolling spend alarm: warn in the logs when estimated LLM spend over the window exceeds the budget (0 disables)
+LLM_BUDGET_USD = float(os.getenv("LLM_BUDGET_USD", "0"))
+LLM_BUDGET_WINDOW_S = int(os.getenv("LLM_BUDGET_WINDOW_S", "3600"))
+USAGE_MAX_SESSIONS = int(os.getenv("USAGE_MAX_SESSIONS", "10000"))  # per-session totals kept, least recently used dropped
 OPENAI_EMBED_MODEL = os.getenv("OPENAI_EMBED_MODEL", "text-embedding-3-small")
+# Token-length check before embedding needs tiktoken's encoding files (downloaded on first use)
+OPENAI_EMBED_CHECK_CTX = os.getenv("OPENAI_EMBED_CHECK_CTX", "true").lower() == "true"
+OPENAI_EMBED_TIMEOUT = float(os.getenv("OPENAI_EMBED_TIMEOUT", "20"))  # seconds per embeddings request
+# Record/replay of OpenAI HTTP calls (chat + embeddings): "off", "record" (call the API, store every
+# response), "replay" (serve stored responses only) or "auto" (replay when stored, else record).
+# LLM_REPLAY_TIMING=true sleeps for the recorded latency on replay; false replays at full speed.
+LLM_RECORD_MODE = os.getenv("LLM_RECORD_MODE", "off").lower()
+LLM_RECORD_PATH = os.getenv("LLM_RECORD_PATH", "/app/data/llm_cassette.sqlite")
+LLM_REPLAY_TIMING = os.getenv("LLM_REPLAY_TIMING", "false").lower() == "true"
 HF_EMBED_MODEL = os.getenv("HF_EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
 
+# Hybrid retrieval (BM25 + vectors)
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "8"))  # candidates pulled from each ranker before fusion
+LEXICAL_CONFIDENT_SCORE = float(os.getenv("LEXICAL_CONFIDENT_SCORE", "0.6"))  # top BM25 score / reference score of the query
+LEXICAL_CONFIDENT_MARGIN = float(os.getenv("LEXICAL_CONFIDENT_MARGIN", "1.5"))  # top score / runner-up score
+# Typed retrieval: chunks per type in the router's plan (1st, 2nd, 3rd... type) and overall cap
+TYPE_K_BUDGETS = [int(x) for x in os.getenv("TYPE_K_BUDGETS", "3,2,1").split(",") if x.strip()]
+DOCS_MAX_CHUNKS = int(os.getenv("DOCS_MAX_CHUNKS", "4"))
+
+# Generation context: token budget and the share SQL rows may take when docs are also present
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_SQL_SHARE = float(os.getenv("CONTEXT_SQL_SHARE", "0.5"))
+SQL_MAX_ROWS = int(os.getenv("SQL_MAX_ROWS", "20"))  # rows fetched per generated query
+# Generated SQL guard: per-statement timeout and optional EXPLAIN cost ceiling (Postgres; 0 disables)
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", "3000"))
+SQL_MAX_PLAN_COST = float(os.getenv("SQL_MAX_PLAN_COST", "0"))
+
+# FAQ fast path: near-exact FAQ questions get the stored answer without generation (index built at ingest)
+FAQ_FAST_PATH = os.getenv("FAQ_FAST_PATH", "true").lower() == "true"
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", "/app/data/faq_index")
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.85"))  # combined score needed to answer directly
+FAQ_MATCH_MARGIN = float(os.getenv("FAQ_MATCH_MARGIN", "0.05"))  # over the runner-up FAQ
+FAQ_MATCH_EMBED_WEIGHT = float(os.getenv("FAQ_MATCH_EMBED_WEIGHT", "0.7"))  # cosine vs keyword overlap
+FAQ_MIN_KEYWORD_OVERLAP = float(os.getenv("FAQ_MIN_KEYWORD_OVERLAP", "0.5"))  # below this the query is not embedded
+FAQ_MATCH_SLICE_S = float(os.getenv("FAQ_MATCH_SLICE_S", "2"))
+
+# Admission control for LLM-bound /chat requests: concurrent slots, bounded fair wait queue, then 429
+ADMISSION_MAX_INFLIGHT = int(os.getenv("ADMISSION_MAX_INFLIGHT", "8"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "32"))
+ADMISSION_MAX_PER_SESSION = int(os.getenv("ADMISSION_MAX_PER_SESSION", "2"))  # queued requests per session_id
+ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "10"))
+
+# Identical concurrent questions share intent, routing, SQL and retrieval; generation stays per session
+COALESCE_QUESTIONS = os.getenv("COALESCE_QUESTIONS", "true").lower() == "true"
+
+# Request deadline for /chat, split across stages (seconds). The intent check gets at most INTENT_SLICE_S
+# (skipped when it overruns); the router is skipped (route "both") once ROUTER_LATE_S have passed;
+# SQL writing gets at most SQL_GENERATE_SLICE_S; the query embedding for retrieval at most
+# RETRIEVAL_EMBED_SLICE_S (lexical results only past it); GENERATION_RESERVE_S is kept
+# back for generation, which is hedged with a second attempt after the recent p95 generation latency
+# (GENERATION_HEDGE_DEFAULT_S until enough samples). Without a generated reply the answer is built from context.
+REQUEST_DEADLINE_S = float(os.getenv("REQUEST_DEADLINE_S", "20"))
+INTENT_SLICE_S = float(os.getenv("INTENT_SLICE_S", "3"))
+ROUTER_LATE_S = float(os.getenv("ROUTER_LATE_S", "5"))
+ROUTER_SLICE_S = float(os.getenv("ROUTER_SLICE_S", "4"))
+SQL_GENERATE_SLICE_S = float(os.getenv("SQL_GENERATE_SLICE_S", "6"))
+RETRIEVAL_EMBED_SLICE_S = float(os.getenv("RETRIEVAL_EMBED_SLICE_S", "3"))
+GENERATION_RESERVE_S = float(os.getenv("GENERATION_RESERVE_S", "6"))
+GENERATION_HEDGE = os.getenv("GENERATION_HEDGE", "true").lower() == "true"
+GENERATION_HEDGE_QUANTILE = float(os.getenv("GENERATION_HEDGE_QUANTILE", "0.95"))
+GENERATION_HEDGE_DEFAULT_S = float(os.getenv("GENERATION_HEDGE_DEFAULT_S", "8"))
+DEGRADED_TOKEN_BUDGET = int(os.getenv("DEGRADED_TOKEN_BUDGET", "400"))
+# Threads for deadline-bounded stage calls. Abandoned calls keep their admission slot, so per slot at most
+# intent, FAQ match, router, SQL writing, query embedding and generation can be running at once
+STAGE_POOL_WORKERS = int(os.getenv("STAGE_POOL_WORKERS", str(6 * ADMISSION_MAX_INFLIGHT)))
+
+# Bulk transcript redaction (/redact/batch and python -m app.services.redaction)
+REDACT_WORKERS = int(os.getenv("REDACT_WORKERS", str(os.cpu_count() or 2)))
+REDACT_CHUNK_SIZE = int(os.getenv("REDACT_CHUNK_SIZE", "200"))  # records per shard sent to a worker
+
+# Load LLM clients, the SQL schema and retrieval indexes in a background thread after startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# Multi-clinic: requests name a tenant_id; other clinics keep their data under TENANT_ROOT/<tenant>/
+# (see utils/tenancy.py). Per-clinic indexes and connections are dropped after TENANT_IDLE_S idle.
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_ROOT = os.getenv("TENANT_ROOT", "/app/data/tenants")
+TENANT_CACHE_SIZE = int(os.getenv("TENANT_CACHE_SIZE", "64"))  # clinics loaded at once, besides the default
+TENANT_IDLE_S = float(os.getenv("TENANT_IDLE_S", "900"))
+
+# Per-request profiling: X-Profile: <PROFILE_ADMIN_TOKEN> on /chat or /ingest, or a random share of calls.
+# Captures are listed at /admin/profiles (same token in X-Admin-Token, which also guards per-session /usage);
+# no token disables all of them.
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))  # captures kept in memory
+
 # Service
 DEBUG = os.getenv("DEBUG", "false").lower() == "true" # Set to 'false' in production
 ALLOW_ORIGINS = os.getenv("ALLOW_ORIGINS", "*").split(",") # Restrict origins in production
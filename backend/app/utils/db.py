@@ -1,21 +1,45 @@
 # backend/app/utils/db.py
+import csv
+import io
 import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
 from urllib.parse import urlparse
+from uuid import UUID
 from sqlalchemy import create_engine, text as sql_text
 from sqlalchemy.engine import Engine
-from .config import SQL_DB_URL, JANEAPP_BASE
+from .config import SQL_DB_URL, JANEAPP_BASE, SQL_MAX_ROWS
+from .sql_guard import run_guarded
+from .tenancy import TenantCache, tenant_sql_url
 from ..models.schema import metadata
+from ..models.migrations import run_migrations
 
-def get_engine() -> Engine:
-    # SQL
-    if SQL_DB_URL.startswith("sqlite:////"):
-        path = SQL_DB_URL.replace("sqlite:////", "")
+# Set by services.bundle: fills a new engine's empty tables from the tenant's knowledge bundle
+bundle_hydrator: Optional[Callable[[Engine, str], None]] = None
+
+def _create_engine(tenant: str) -> Engine:
+    url = tenant_sql_url(SQL_DB_URL, tenant)
+    if url.startswith("sqlite:////"):
+        path = url.replace("sqlite:////", "")
         os.makedirs(os.path.dirname(path), exist_ok=True)
-        return create_engine(SQL_DB_URL, future=True)
-    return create_engine(SQL_DB_URL, future=True, pool_pre_ping=True)
+        engine = create_engine(url, future=True)
+    else:
+        engine = create_engine(url, future=True, pool_pre_ping=True)
+    if bundle_hydrator is not None:
+        bundle_hydrator(engine, tenant)
+    return engine
+
+# One engine (and connection pool) per clinic; an idle clinic's pool is closed
+_engines: TenantCache[Engine] = TenantCache("engine", _create_engine, close=lambda engine: engine.dispose())
+
+def get_engine() -> Engine:
+    """Engine of the current tenant (see utils/tenancy.py)."""
+    return _engines.get()
 
 def ensure_tables(engine: Engine):
     metadata.create_all(engine)
+    run_migrations(engine)
 
 def fetch_rows(sql: str, params: dict | None = None):
     """Run a SELECT and return a list[dict] for easy downstream use."""
@@ -27,6 +51,54 @@ def fetch_rows(sql: str, params: dict | None = None):
     except Exception:
         return []
 
+@dataclass
+class SqlResult:
+    columns: List[str]
+    rows: List[tuple] = field(default_factory=list)
+    truncated: bool = False
+
+    def as_dicts(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, r)) for r in self.rows]
+
+def execute_select(sql: str, max_rows: int = SQL_MAX_ROWS) -> SqlResult:
+    """
+    Run a generated SELECT through the guard (single read-only SELECT, LIMIT, timeout)
+    and return typed rows with column names, capped at `max_rows`.
+    Raises SqlRejected / SqlTimeout from utils.sql_guard.
+    """
+    with get_engine().connect() as conn:
+        columns, rows, truncated = run_guarded(conn, sql, max_rows)
+    return SqlResult(columns=columns, rows=rows, truncated=truncated)
+
+# Dashed form, or the 32-hex form SQLite hands back for UUID columns
+_UUID_RE = re.compile(r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{32})$")
+
+def _is_uuid(v: Any) -> bool:
+    return isinstance(v, UUID) or (isinstance(v, str) and bool(_UUID_RE.match(v)))
+
+def compact_rows(columns: List[str], rows: List[tuple], truncated: bool = False) -> str:
+    """
+    CSV-style rendering for the prompt: one header line, one line per row.
+    Columns that are entirely NULL or hold only UUIDs (internal keys) are dropped.
+    """
+    if not rows:
+        return ""
+    keep = [
+        i for i, _ in enumerate(columns)
+        if any(r[i] is not None and not _is_uuid(r[i]) for r in rows)
+    ]
+    if not keep:
+        return ""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow([columns[i] for i in keep])
+    for r in rows:
+        writer.writerow(["" if r[i] is None else r[i] for i in keep])
+    text = buf.getvalue().rstrip("\n")
+    if truncated:
+        text += f"\n(more rows not shown; limited to {len(rows)})"
+    return text
+
 def get_janeapp_base() -> str | None:
     try:
         rows = fetch_rows(
@@ -0,0 +1,134 @@
+# backend/app/utils/deadline.py
+"""
+Per-request deadline shared by the pipeline stages.
+
+`pipeline.answer` starts a `Deadline(REQUEST_DEADLINE_S)`; stages read it through
+`current_deadline()` (a ContextVar, so it follows RunnableParallel worker threads) and
+take a slice of what is left with `budget(cap)`. `call_with_timeout` runs a blocking
+call on the shared stage pool and gives up waiting after the slice; the abandoned call
+keeps running until the LLM client's own timeout (LLM_<STAGE>_TIMEOUT) ends it, and keeps
+the request's admission slot until then (see utils.admission).
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple, TypeVar
+
+from . import admission
+from .config import STAGE_POOL_WORKERS
+from .profiler import attach
+
+T = TypeVar("T")
+
+class StageTimeout(TimeoutError):
+    """A stage did not finish within its slice of the request deadline."""
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def budget(self, cap: float, reserve: float = 0.0) -> float:
+        """Seconds a stage may use: at most `cap`, leaving `reserve` for the stages after it."""
+        return max(0.0, min(cap, self.remaining() - reserve))
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("clinicbot_deadline", default=None)
+
+def start_deadline(seconds: float) -> Deadline:
+    deadline = Deadline(seconds)
+    _current.set(deadline)
+    return deadline
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+_pool = ThreadPoolExecutor(max_workers=STAGE_POOL_WORKERS, thread_name_prefix="stage")
+
+def submit(fn: Callable[..., T], *args) -> "Future[T]":
+    # Copy the caller's context so metrics spans and the deadline follow the call
+    ctx = contextvars.copy_context()
+    future = _pool.submit(ctx.run, attach(fn), *args)
+    admission.track(future)  # an abandoned call keeps holding the request's admission slot
+    return future
+
+def call_with_timeout(fn: Callable[..., T], timeout: float, *args) -> T:
+    if timeout <= 0:
+        raise StageTimeout("no time left")
+    future = submit(fn, *args)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise StageTimeout(f"gave up after {timeout:.1f}s")
+
+def hedged_call(fn: Callable[..., T], timeout: float, hedge_after: float, *args,
+                may_hedge: Callable[[], bool] = lambda: True) -> Tuple[T, bool]:
+    """
+    Run `fn`; if it has not finished after `hedge_after` seconds (or failed before that),
+    start a second attempt and take whichever succeeds first. Returns (result, hedged).
+    `may_hedge` is asked once before the second attempt; when it says no, the first
+    attempt just gets the rest of the timeout.
+    """
+    if timeout <= 0:
+        raise StageTimeout("no time left")
+    t_end = time.monotonic() + timeout
+    pending: List[Future] = [submit(fn, *args)]
+    hedged = declined = False
+    error: Optional[BaseException] = None
+    while True:
+        left = t_end - time.monotonic()
+        if left <= 0 or (hedged and not pending):
+            break
+        if not pending:
+            # The first attempt failed: retrying does not add a call in flight
+            hedged = True
+            pending.append(submit(fn, *args))
+            continue
+        done, _ = wait(pending, timeout=left if hedged or declined else min(left, hedge_after), return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return future.result(), hedged
+            error = future.exception()
+        if not done and not hedged and not declined:
+            if may_hedge():
+                hedged = True
+                pending.append(submit(fn, *args))
+            else:
+                declined = True
+    for future in pending:
+        future.cancel()
+    if error is not None and not pending:
+        raise error
+    raise StageTimeout(f"gave up after {timeout:.1f}s")
+
+class LatencyWindow:
+    """Recent durations of one stage, for a p95-based hedge delay."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self._samples: deque = deque(maxlen=size)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, default: float) -> float:
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return default
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
@@ -0,0 +1,36 @@
+# backend/app/utils/filters.py
+from typing import Any, Dict
+
+def matches(meta: Dict[str, Any], flt: Dict[str, Any] | None) -> bool:
+    """
+    Evaluate a Chroma-style metadata filter against one metadata dict.
+    Supports {"k": v}, {"k": {"$eq"|"$ne"|"$in"|"$nin": ...}}, {"$and": [...]}, {"$or": [...]}.
+    """
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches(meta, sub) for sub in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches(meta, sub) for sub in cond):
+                return False
+            continue
+        value = meta.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, expected in cond.items():
+            if op == "$eq":
+                ok = value == expected
+            elif op == "$ne":
+                ok = value != expected
+            elif op == "$in":
+                ok = value in expected
+            elif op == "$nin":
+                ok = value not in expected
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if not ok:
+                return False
+    return True
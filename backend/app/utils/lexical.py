@@ -0,0 +1,174 @@
+# backend/app/utils/lexical.py
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import LEXICAL_INDEX_PATH
+from .tenancy import TenantCache, tenant_path
+from .filters import matches
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "do", "does", "did", "of", "to", "in", "on", "at", "for",
+    "and", "or", "i", "you", "your", "my", "me", "we", "our", "it", "be", "can", "with", "what",
+    "how", "which", "who", "where", "when", "there", "this", "that", "any", "have", "has",
+}
+
+def tokenize(text: str) -> List[str]:
+    """
+    CJK-aware tokenizer: latin/digit words (lower-cased, light stopword removal) plus
+    character unigrams and bigrams for every run of Chinese characters.
+    """
+    if not text:
+        return []
+    lowered = text.lower()
+    tokens = [w for w in _WORD_RE.findall(lowered) if w not in _STOPWORDS]
+    for run in _CJK_RE.findall(lowered):
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+class BM25Index:
+    """
+    Small in-process Okapi BM25 index over the same chunks that go to the vector store.
+    Chunk ids follow the `{source_id}::chunk{n}` convention from `chroma_upsert`.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._docs: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._tf: Dict[str, Counter] = {}
+        self._len: Dict[str, int] = {}
+        self._df: Counter = Counter()
+        self._avgdl = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def upsert(self, ids: List[str], texts: List[str], metas: List[Dict[str, Any]]):
+        with self._lock:
+            for chunk_id, text, meta in zip(ids, texts, metas):
+                self._remove(chunk_id)
+                tf = Counter(tokenize(text))
+                self._docs[chunk_id] = (text, dict(meta))
+                self._tf[chunk_id] = tf
+                self._len[chunk_id] = sum(tf.values())
+                self._df.update(tf.keys())
+            self._refresh_avgdl()
+
+    def delete_where(self, flt: Dict[str, Any]):
+        with self._lock:
+            doomed = [cid for cid, (_, meta) in self._docs.items() if matches(meta, flt)]
+            for cid in doomed:
+                self._remove(cid)
+            self._refresh_avgdl()
+
+    def _remove(self, chunk_id: str):
+        tf = self._tf.pop(chunk_id, None)
+        if tf is None:
+            return
+        self._docs.pop(chunk_id, None)
+        self._len.pop(chunk_id, None)
+        for term in tf:
+            self._df[term] -= 1
+            if self._df[term] <= 0:
+                del self._df[term]
+
+    def _refresh_avgdl(self):
+        self._avgdl = (sum(self._len.values()) / len(self._len)) if self._len else 0.0
+
+    def _idf(self, term: str) -> float:
+        n = len(self._docs)
+        df = self._df.get(term, 0)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Return up to k (chunk_id, score) pairs, best first, restricted to chunks matching `filter`."""
+        terms = Counter(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            if not self._docs:
+                return []
+            allowed = {cid for cid, (_, meta) in self._docs.items() if matches(meta, filter)} if filter else None
+            scores: Dict[str, float] = {}
+            for term, qtf in terms.items():
+                if term not in self._df:
+                    continue
+                idf = self._idf(term)
+                for cid, tf in self._tf.items():
+                    f = tf.get(term)
+                    if not f or (allowed is not None and cid not in allowed):
+                        continue
+                    norm = f + self.k1 * (1 - self.b + self.b * self._len[cid] / (self._avgdl or 1.0))
+                    scores[cid] = scores.get(cid, 0.0) + qtf * idf * f * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    def reference_score(self, query: str) -> float:
+        """Score an average-length chunk gets when it contains every query term once."""
+        terms = Counter(tokenize(query))
+        with self._lock:
+            return sum(qtf * self._idf(t) for t, qtf in terms.items())
+
+    def get(self, chunk_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        return self._docs.get(chunk_id)
+
+    # ----- persistence -----
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        with self._lock:
+            payload = {"version": 1, "docs": [[cid, text, meta] for cid, (text, meta) in self._docs.items()]}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        index = cls()
+        if not os.path.isfile(path):
+            return index
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            docs = payload.get("docs", [])
+            index.upsert([d[0] for d in docs], [d[1] for d in docs], [d[2] for d in docs])
+        except Exception as e:
+            logger.warning("Could not load lexical index from %s: %s", path, e)
+        return index
+
+def rrf_fuse(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Reciprocal rank fusion of several ranked id lists."""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+
+# Set by services.bundle: the tenant's knowledge bundle as a BM25 index, or None without one
+bundle_loader: Optional[Callable[[str], Optional[BM25Index]]] = None
+
+def _load_index(tenant: str) -> BM25Index:
+    index = bundle_loader(tenant) if bundle_loader is not None else None
+    return index if index is not None else BM25Index.load(tenant_path(LEXICAL_INDEX_PATH, tenant))
+
+_indexes: TenantCache[BM25Index] = TenantCache("lexical", _load_index)
+
+def get_lexical_index() -> BM25Index:
+    """The current tenant's index."""
+    return _indexes.get()
+
+def replace_lexical_index(index: BM25Index):
+    _indexes.put(index)
+
+def save_lexical_index():
+    get_lexical_index().save(tenant_path(LEXICAL_INDEX_PATH))
@@ -0,0 +1,152 @@
+# backend/app/utils/llm_replay.py
+"""
+Record/replay of OpenAI HTTP calls, for regression benchmarks and reproducible debugging.
+
+Every chain model (`setup._build_llm`) and the embeddings client (`vectorstore.make_embeddings`)
+share `get_http_client()`. With LLM_RECORD_MODE set, its transport keys each request by a
+SHA-256 of method, path and the canonical JSON body (model, messages/input and all parameters).
+  - record: forward to the API and store the response with its latency,
+  - replay: answer from the store only; a miss raises `ReplayMiss` (the client sees a connection error),
+  - auto:   replay what is stored, record the rest.
+Entries live in one SQLite file (LLM_RECORD_PATH) with zlib-compressed bodies; the first
+response recorded for a key wins. Only the sync client is covered, which is all the pipeline uses.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from .config import LLM_RECORD_MODE, LLM_RECORD_PATH, LLM_REPLAY_TIMING
+from .metrics import LLM_REPLAY
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+MODES = ("off", "record", "replay", "auto")
+
+class ReplayMiss(httpx.TransportError):
+    """Replay mode and no recorded response for this request."""
+
+def request_key(method: str, path: str, body: bytes) -> Tuple[str, Dict[str, Any]]:
+    """(hex key, parsed body); the key ignores JSON key order and whitespace."""
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        payload = {"raw": body.decode("utf-8", "replace")}
+    canonical = json.dumps([method.upper(), path, payload], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest(), payload
+
+def _kind(path: str) -> str:
+    if path.endswith("/chat/completions"):
+        return "chat"
+    if path.endswith("/embeddings"):
+        return "embeddings"
+    return "other"
+
+class Cassette:
+    """On-disk store of recorded responses."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, kind TEXT, model TEXT, status INTEGER, content_type TEXT,"
+            "elapsed REAL, request BLOB, response BLOB, created REAL)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[int, str, float, bytes]]:
+        """(status, content type, recorded seconds, response body) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, content_type, elapsed, response FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, content_type, elapsed, blob = row
+        return status, content_type, elapsed, zlib.decompress(blob)
+
+    def put(self, key: str, kind: str, model: str, status: int, content_type: str, elapsed: float,
+            request: bytes, response: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, model, status, content_type, elapsed, zlib.compress(request), zlib.compress(response), time.time()),
+            )
+            self._conn.commit()
+
+_DECODED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+class ReplayTransport(httpx.BaseTransport):
+    def __init__(self, cassette: Cassette, mode: str, timing: bool = False,
+                 inner: Optional[httpx.BaseTransport] = None):
+        self.cassette = cassette
+        self.mode = mode
+        self.timing = timing
+        self.inner = inner or httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        path = request.url.path
+        key, payload = request_key(request.method, path, body)
+        kind = _kind(path)
+        if self.mode in ("replay", "auto"):
+            hit = self.cassette.get(key)
+            if hit is not None:
+                status, content_type, elapsed, content = hit
+                if self.timing and elapsed:
+                    time.sleep(elapsed)
+                LLM_REPLAY.labels(kind, "hit").inc()
+                return httpx.Response(status, headers={"content-type": content_type}, content=content, request=request)
+            if self.mode == "replay":
+                LLM_REPLAY.labels(kind, "miss").inc()
+                logger.warning("No recorded response for %s call to %s (key %s)", kind, payload.get('model', '?'), key[:12])
+                raise ReplayMiss(f"no recorded response for key {key}", request=request)
+        t0 = time.perf_counter()
+        response = self.inner.handle_request(request)
+        content = response.read()
+        elapsed = time.perf_counter() - t0
+        if response.status_code < 500:
+            # Server errors are transient; recording them would replay the outage
+            self.cassette.put(key, kind, str(payload.get("model", "")), response.status_code,
+                              response.headers.get("content-type", "application/json"), elapsed, body, content)
+            LLM_REPLAY.labels(kind, "recorded").inc()
+        # `content` is already decoded, so the encoding/length headers no longer apply
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DECODED_HEADERS]
+        return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+    def close(self):
+        self.inner.close()
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+def get_http_client() -> Optional[httpx.Client]:
+    """Shared client for OpenAI calls, or None (library default) when recording is off."""
+    global _client
+    if LLM_RECORD_MODE == "off":
+        return None
+    if LLM_RECORD_MODE not in MODES:
+        logger.warning("Unknown LLM_RECORD_MODE=%r; expected one of %s. Recording is off.", LLM_RECORD_MODE, ', '.join(MODES))
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                cassette = Cassette(LLM_RECORD_PATH)
+                logger.info("LLM %s mode: %s (%s recorded calls, %s replay delay)", LLM_RECORD_MODE, LLM_RECORD_PATH,
+                            len(cassette), 'recorded' if LLM_REPLAY_TIMING else 'no')
+                _client = httpx.Client(transport=ReplayTransport(cassette, LLM_RECORD_MODE, LLM_REPLAY_TIMING), timeout=None)
+    return _client
@@ -1,14 +1,124 @@
 # backend/app/utils/logging.py
+"""
+Logging setup. Loggers write to a `QueueHandler` and a listener thread does the formatting
+and stdout I/O, so a request only pays for building the record. Records keep their `%`
+arguments until the listener formats them (unlike the stock QueueHandler, which formats on
+the caller's thread), so hot paths should log with `logger.info("... %s", value)`.
+Arguments are formatted a moment later on the listener thread, so do not pass objects that
+the caller goes on to mutate.
+
+  LOG_FORMAT=json   one JSON object per line, with request_id, session_id and route of the
+                    /chat request that logged it and any `extra=` fields (e.g. stage timings)
+  LOG_QUEUE=false   write inline on the calling thread (e.g. when debugging logging itself)
+  LOG_SAMPLE        keep only a share of DEBUG/INFO records per logger, e.g.
+                    "uvicorn.access=0.1,app.services.pipeline=0.5"; warnings and errors are
+                    always kept. A name also covers its child loggers.
+"""
 import os
+import atexit
+import json
 import logging
+import queue
+import threading
+from datetime import datetime, timezone
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from .metrics import current_request
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+class RequestFields(logging.Filter):
+    """Stamp records with the current /chat request. Runs on the logging thread, where the context is set."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = current_request()
+        if ctx is not None:
+            record.request_id = ctx.request_id
+            record.session_id = ctx.session_id
+            record.route = ctx.route
+        return True
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, rate = part.partition("=")
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+class SampleFilter(logging.Filter):
+    """Keep `rate` of a logger's records below WARNING, evenly spaced (1 in 10 at 0.1), counting per logger."""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, name: str) -> Optional[float]:
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1.0:
+            return True
+        with self._lock:
+            n = self._seen.get(record.name, 0)
+            self._seen[record.name] = n + 1
+        if int((n + 1) * rate) == int(n * rate):
+            return False
+        record.sample_rate = rate  # lets log queries scale counts back up
+        return True
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+_listener: Optional[QueueListener] = None
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains what is queued
+        _listener = None
 
 # Idempotent setup: safe to call multiple times
 def setup_logging() -> None:
+    global _listener
     level = os.getenv("LOG_LEVEL", "INFO").upper()
     access_level = os.getenv("UVICORN_ACCESS_LOG_LEVEL", "INFO").upper()
     sql_level = os.getenv("SQL_LOG_LEVEL", "WARNING").upper()
+    log_format = os.getenv("LOG_FORMAT", "text").lower()
+    use_queue = os.getenv("LOG_QUEUE", "true").lower() == "true"
+    sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE", ""))
 
+    _stop_listener()
     dictConfig({
         "version": 1,
         "disable_existing_loggers": False,  # keep uvicorn/fastapi loggers
@@ -17,16 +127,12 @@ def setup_logging() -> None:
                 "format": "[%(levelname)s] %(asctime)s %(name)s: %(message)s",
                 "datefmt": "%Y-%m-%d %H:%M:%S",
             },
-            # Optional JSON formatter (uncomment if you prefer JSON logs)
-            # "json": {
-            #     "()": "pythonjsonlogger.jsonlogger.JsonFormatter",
-            #     "fmt": "%(levelname)s %(asctime)s %(name)s %(message)s",
-            # }
+            "json": {"()": JsonFormatter},
         },
         "handlers": {
             "console": {
                 "class": "logging.StreamHandler",
-                "formatter": "default",  # or "json"
+                "formatter": "json" if log_format == "json" else "default",
                 "stream": "ext://sys.stdout",
             },
         },
@@ -43,5 +149,22 @@ def setup_logging() -> None:
         },
     })
 
+    root = logging.getLogger()
+    console = root.handlers[0]
+    front: logging.Handler = console
+    if use_queue:
+        # Everything that wrote to the console now goes through one queue to the listener
+        front = DeferredQueueHandler(queue.SimpleQueue())
+        _listener = QueueListener(front.queue, console, respect_handler_level=True)
+        _listener.start()
+        for logger in (root, *(logging.getLogger(n) for n in ("uvicorn.error", "uvicorn.access", "sqlalchemy.engine"))):
+            logger.removeHandler(console)
+            logger.addHandler(front)
+    # Filters run on the logging thread: sampling drops records before they are queued
+    front.addFilter(SampleFilter(sample_rates))
+    front.addFilter(RequestFields())
+
+atexit.register(_stop_listener)
+
 def get_logger(name: str | None = None) -> logging.Logger:
     return logging.getLogger(name if name else __name__)
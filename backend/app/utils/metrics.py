@@ -0,0 +1,202 @@
+# backend/app/utils/metrics.py
+"""
+Per-stage timing for the chat pipeline.
+
+`stage("router")` times a block. Inside a request (see `begin_request`) the span is
+kept on the request context and observed at `end_request`, once the route is known,
+so every stage of a request carries the same `route` label; outside a request it is
+observed straight away with route="none". Histograms are exposed in Prometheus text
+format by `render_metrics()`, and each request's spans become a Server-Timing header.
+LLM token usage (see utils.usage) is carried on the same context and counted the same way;
+usage reported after the request ended is counted on its own (see `record_usage`).
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_SECONDS = Histogram(
+    "clinicbot_stage_duration_seconds", "Time spent in each chat pipeline stage",
+    ["stage", "route"], buckets=_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "clinicbot_request_duration_seconds", "End-to-end chat request time",
+    ["route"], buckets=_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "clinicbot_stage_errors_total", "Pipeline stages that raised", ["stage", "route"],
+)
+DEADLINE_EVENTS = Counter(
+    "clinicbot_deadline_events_total",
+    "Deadline handling: intent_skipped, router_skipped, router_timeout, sql_generate_timeout, embed_timeout, "
+    "generation_hedged, generation_degraded, coalesce_timeout",
+    ["event"],
+)
+FAQ_FASTPATH = Counter(
+    "clinicbot_faq_fastpath_total", "FAQ fast path outcomes: hit (answered directly), miss, error", ["result"],
+)
+TEMPLATE_ANSWERS = Counter(
+    "clinicbot_template_answers_total", "Questions answered from fact templates without any LLM call", ["kind"],
+)
+ADMISSION_INFLIGHT = Gauge("clinicbot_admission_inflight", "Chat requests holding an LLM slot")
+ADMISSION_QUEUE_DEPTH = Gauge("clinicbot_admission_queue_depth", "Chat requests waiting for an LLM slot")
+ADMISSION_WAIT_SECONDS = Histogram(
+    "clinicbot_admission_wait_seconds", "Time admitted requests waited for an LLM slot", buckets=(0.0,) + _BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "clinicbot_admission_rejected_total", "Requests turned away with 429: queue_full, session_limit, wait_timeout", ["reason"],
+)
+COALESCED = Counter(
+    "clinicbot_coalesced_total",
+    "Chat requests by coalescing role: leader (ran the shared stages), follower (shared a leader's result), bypass",
+    ["role"],
+)
+TENANT_CACHE_EVENTS = Counter(
+    "clinicbot_tenant_cache_events_total", "Per-clinic cache loads and evictions (evict_idle, evict_size), by cache",
+    ["cache", "event"],
+)
+TENANTS_LOADED = Gauge("clinicbot_tenants_loaded", "Clinics with a loaded object in each per-clinic cache", ["cache"])
+PROFILES = Counter(
+    "clinicbot_profiles_total", "Profiled calls by label (chat, ingest) and trigger (header, sampled)",
+    ["label", "trigger"],
+)
+LLM_REPLAY = Counter(
+    "clinicbot_llm_replay_total", "Record/replay of OpenAI calls: hit, miss or recorded, by kind (chat, embeddings)",
+    ["kind", "result"],
+)
+LLM_TOKENS = Counter(
+    "clinicbot_llm_tokens_total", "LLM tokens by stage; kind is prompt, completion or cached (part of prompt)",
+    ["stage", "route", "model", "kind"],
+)
+LLM_COST = Counter(
+    "clinicbot_llm_cost_usd_total", "Estimated LLM spend in USD", ["stage", "route", "model"],
+)
+LLM_CALL_SECONDS = Histogram(
+    "clinicbot_llm_call_seconds", "Latency of single LLM calls by stage and model (see LLM_STAGES)",
+    ["stage", "model"], buckets=_BUCKETS,
+)
+LLM_CALLS = Counter(
+    "clinicbot_llm_calls_total", "LLM calls by stage", ["stage", "route", "model"],
+)
+
+class RequestContext:
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex[:16]
+        self.route = "none"
+        self.session_id: Optional[str] = None
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, bool]] = []  # (stage, seconds, failed)
+        self.usage: List[Tuple[str, str, int, int, int, float]] = []  # (stage, model, prompt, completion, cached, usd)
+        self.finished = False  # set by end_request; usage arriving later is not carried here
+        self._lock = threading.Lock()  # stages of one request may run on several threads
+
+    def add(self, name: str, seconds: float, failed: bool = False):
+        with self._lock:
+            self.spans.append((name, seconds, failed))
+
+    def add_usage(self, name: str, model: str, prompt: int, completion: int, cached: int, usd: float) -> bool:
+        """Carry one LLM call's usage to end_request; False once the request has ended."""
+        with self._lock:
+            if self.finished:
+                return False
+            self.usage.append((name, model, prompt, completion, cached, usd))
+            return True
+
+    def totals(self) -> Dict[str, float]:
+        """Seconds per stage name, in first-seen order (repeated stages are summed)."""
+        out: Dict[str, float] = {}
+        with self._lock:
+            for name, seconds, _ in self.spans:
+                out[name] = out.get(name, 0.0) + seconds
+        return out
+
+    def usage_totals(self) -> Dict[str, float]:
+        """Token counts and estimated spend summed over the request's LLM calls."""
+        with self._lock:
+            usage = list(self.usage)
+        return {
+            "calls": len(usage),
+            "prompt": sum(u[2] for u in usage),
+            "completion": sum(u[3] for u in usage),
+            "cached": sum(u[4] for u in usage),
+            "usd": round(sum(u[5] for u in usage), 6),
+        }
+
+_current: ContextVar[Optional[RequestContext]] = ContextVar("clinicbot_request", default=None)
+
+def begin_request(request_id: Optional[str] = None) -> RequestContext:
+    ctx = RequestContext(request_id)
+    _current.set(ctx)
+    return ctx
+
+def current_request() -> Optional[RequestContext]:
+    return _current.get()
+
+def set_route(route: str):
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.route = route
+
+def set_session(session_id: str):
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.session_id = session_id
+
+def observe_usage(name: str, route: str, model: str, prompt: int, completion: int, cached: int, usd: float):
+    LLM_CALLS.labels(name, route, model).inc()
+    LLM_TOKENS.labels(name, route, model, "prompt").inc(prompt)
+    LLM_TOKENS.labels(name, route, model, "completion").inc(completion)
+    LLM_TOKENS.labels(name, route, model, "cached").inc(cached)
+    LLM_COST.labels(name, route, model).inc(usd)
+
+def end_request(ctx: RequestContext) -> float:
+    """Observe the request's spans and LLM usage under its final route label; returns total seconds."""
+    total = time.perf_counter() - ctx.started
+    with ctx._lock:
+        ctx.finished = True
+        spans = list(ctx.spans)
+        usage = list(ctx.usage)
+    for name, seconds, failed in spans:
+        STAGE_SECONDS.labels(name, ctx.route).observe(seconds)
+        if failed:
+            STAGE_ERRORS.labels(name, ctx.route).inc()
+    for name, model, prompt, completion, cached, usd in usage:
+        observe_usage(name, ctx.route, model, prompt, completion, cached, usd)
+    REQUEST_SECONDS.labels(ctx.route).observe(total)
+    return total
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        ctx = _current.get()
+        if ctx is not None:
+            ctx.add(name, seconds, failed)
+        else:
+            STAGE_SECONDS.labels(name, "none").observe(seconds)
+            if failed:
+                STAGE_ERRORS.labels(name, "none").inc()
+
+def server_timing(ctx: RequestContext) -> str:
+    """Server-Timing header value, e.g. `intent;dur=412.3, router;dur=380.1, total;dur=1503.0`."""
+    parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in ctx.totals().items()]
+    parts.append(f"total;dur={(time.perf_counter() - ctx.started) * 1000:.1f}")
+    return ", ".join(parts)
+
+def render_metrics() -> bytes:
+    return generate_latest()
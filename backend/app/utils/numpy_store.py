@@ -0,0 +1,235 @@
+# backend/app/utils/numpy_store.py
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+def columns_from_metadatas(metadatas: List[dict]) -> Dict[str, List[Any]]:
+    keys = {k for md in metadatas for k in (md or {})}
+    return {k: [(md or {}).get(k) for md in metadatas] for k in keys}
+
+def normalize_rows(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat[None, :]
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process vector index for small corpora (a clinic is a few hundred chunks).
+
+    Vectors live in one L2-normalized float32 matrix, so cosine top-k is a single
+    matrix-vector product. Metadata is kept column-wise so Chroma-style `filter`
+    dicts ($eq/$ne/$in/$nin/$and/$or) become boolean masks over the rows.
+    With `path`, the matrix is persisted as `{path}.npy` (opened memory-mapped)
+    next to `{path}.json` holding ids, texts and metadata columns.
+    """
+    def __init__(self, embedding: Embeddings, path: Optional[str] = None):
+        self.embedding = embedding
+        self.path = path
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._columns: Dict[str, List[Any]] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._col_cache: Dict[str, np.ndarray] = {}
+        if path:
+            self._load(path)
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ----- writes -----
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        vectors = self.embedding.embed_documents(texts) if texts else []
+        return self.add_embeddings(texts, vectors, metadatas, ids)
+
+    def add_embeddings(self, texts: List[str], embeddings: Any, metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        vectors = normalize_rows(embeddings)
+        with self._lock:
+            self._delete_rows(set(ids))
+            n_before = len(self._ids)
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+            keys = set(self._columns) | {k for md in metadatas for k in md}
+            for key in keys:
+                col = self._columns.setdefault(key, [None] * n_before)
+                col.extend(md.get(key) for md in metadatas)
+            self._matrix = vectors if self._matrix is None or n_before == 0 else np.vstack([self._matrix, vectors])
+            self._col_cache.clear()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+               **kwargs: Any) -> Optional[bool]:
+        """Delete by ids and/or by a metadata filter (same `where` shape Chroma accepts)."""
+        if not ids and not where:
+            return False
+        with self._lock:
+            doomed = set(ids or [])
+            if where and self._ids:
+                doomed.update(self._ids[i] for i in np.flatnonzero(self._mask(where)))
+            self._delete_rows(doomed)
+        return True
+
+    def _delete_rows(self, doomed: set):
+        if not doomed or not self._ids:
+            return
+        keep = [i for i, cid in enumerate(self._ids) if cid not in doomed]
+        if len(keep) == len(self._ids):
+            return
+        self._ids = [self._ids[i] for i in keep]
+        self._texts = [self._texts[i] for i in keep]
+        self._columns = {k: [col[i] for i in keep] for k, col in self._columns.items()}
+        self._matrix = self._matrix[keep] if keep else None
+        self._col_cache.clear()
+
+    # ----- reads -----
+    def _column(self, key: str) -> np.ndarray:
+        arr = self._col_cache.get(key)
+        if arr is None:
+            values = self._columns.get(key) or [None] * len(self._ids)
+            arr = np.empty(len(values), dtype=object)
+            arr[:] = values
+            self._col_cache[key] = arr
+        return arr
+
+    def _mask(self, flt: Dict[str, Any]) -> np.ndarray:
+        n = len(self._ids)
+        mask = np.ones(n, dtype=bool)
+        for key, cond in flt.items():
+            if key == "$and":
+                for sub in cond:
+                    mask &= self._mask(sub)
+            elif key == "$or":
+                any_mask = np.zeros(n, dtype=bool)
+                for sub in cond:
+                    any_mask |= self._mask(sub)
+                mask &= any_mask
+            else:
+                col = self._column(key)
+                if not isinstance(cond, dict):
+                    cond = {"$eq": cond}
+                for op, val in cond.items():
+                    if op == "$eq":
+                        mask &= col == val
+                    elif op == "$ne":
+                        mask &= col != val
+                    elif op in ("$in", "$nin"):
+                        hit = np.zeros(n, dtype=bool)
+                        for v in val:
+                            hit |= col == v
+                        mask &= hit if op == "$in" else ~hit
+                    else:
+                        raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        with self._lock:
+            if self._matrix is None or not self._ids:
+                return []
+            scores = self._matrix @ normalize_rows(embedding)[0]
+            if filter:
+                scores = np.where(self._mask(filter), scores, -np.inf)
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            out = []
+            for i in top:
+                if not np.isfinite(scores[i]):
+                    break
+                md = {key: col[i] for key, col in self._columns.items() if col[i] is not None}
+                out.append((Document(id=self._ids[i], page_content=self._texts[i], metadata=md), float(scores[i])))
+            return out
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score_by_vector(embedding, k=k, filter=filter)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None,
+                          **kwargs: Any) -> List[Document]:
+        return [d for d, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding=embedding, path=kwargs.get("path"))
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    @classmethod
+    def from_arrays(cls, embedding: Optional[Embeddings], ids: List[str], texts: List[str],
+                    columns: Dict[str, List[Any]], matrix: np.ndarray) -> "NumpyVectorStore":
+        """Wrap an already-normalized matrix (e.g. a view into a mapped bundle) without copying it."""
+        store = cls(embedding=embedding)
+        store._ids, store._texts, store._columns = list(ids), list(texts), dict(columns)
+        store._matrix = matrix if len(ids) else None
+        return store
+
+    def export(self) -> Tuple[List[str], List[str], Dict[str, List[Any]], np.ndarray]:
+        """Snapshot of (ids, texts, metadata columns, normalized matrix)."""
+        with self._lock:
+            matrix = self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=np.float32)
+            return list(self._ids), list(self._texts), {k: list(v) for k, v in self._columns.items()}, matrix
+
+    # ----- persistence -----
+    def persist(self, path: Optional[str] = None):
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            matrix = self._matrix if self._matrix is not None else np.zeros((0, 0), dtype=np.float32)
+            meta = {"version": 1, "ids": self._ids, "texts": self._texts, "columns": self._columns}
+            # Write-then-rename so readers holding the old memory map are never torn
+            with open(f"{path}.npy.tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+            with open(f"{path}.json.tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, default=str)
+            os.replace(f"{path}.npy.tmp", f"{path}.npy")
+            os.replace(f"{path}.json.tmp", f"{path}.json")
+
+    def _load(self, path: str):
+        if not (os.path.isfile(f"{path}.npy") and os.path.isfile(f"{path}.json")):
+            return
+        try:
+            with open(f"{path}.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(f"{path}.npy", mmap_mode="r")
+            if matrix.shape[0] != len(meta["ids"]):
+                raise ValueError("matrix/ids length mismatch")
+            self._ids, self._texts, self._columns = meta["ids"], meta["texts"], meta["columns"]
+            self._matrix = matrix if len(self._ids) else None
+        except Exception as e:
+            logger.warning("Could not load vector index from %s: %s", path, e)
@@ -0,0 +1,187 @@
+# backend/app/utils/profiler.py
+"""
+On-demand sampling profiler for single requests.
+
+`capture(label, request_id, requested)` profiles a block when `requested` is true (the admin
+`X-Profile` header) or, failing that, with probability PROFILE_SAMPLE_RATE. While any
+capture is open a sampler thread wakes every PROFILE_INTERVAL_MS and records the Python
+stack of each thread attached to it: the thread that opened it, plus pool threads running
+work submitted on its behalf (`deadline.submit` and the retrieval pool wrap their calls with
+`attach`). Captures are kept in memory (the last PROFILE_KEEP) and rendered as collapsed
+stacks, one `frame;frame;frame count` line per distinct stack, which flamegraph.pl,
+speedscope and inferno read directly.
+
+Without a capture the cost is one random draw per profiled call and one ContextVar read per
+pool submission.
+"""
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+from .config import PROFILE_ADMIN_TOKEN, PROFILE_INTERVAL_MS, PROFILE_KEEP, PROFILE_SAMPLE_RATE
+from .metrics import PROFILES
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+class Profile:
+    def __init__(self, label: str, request_id: Optional[str], trigger: str):
+        # Generated here: the request id may come from the client (X-Request-ID) and repeat
+        self.id = uuid.uuid4().hex[:16]
+        self.request_id = request_id
+        self.label = label
+        self.trigger = trigger  # "header" or "sampled"
+        self.started = time.time()
+        self.seconds: Optional[float] = None
+        self.samples: Counter = Counter()
+        self.threads: Dict[int, int] = {}  # thread id -> nesting depth of attach()
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id, "request_id": self.request_id, "label": self.label, "trigger": self.trigger,
+            "started": round(self.started, 3), "seconds": None if self.seconds is None else round(self.seconds, 3),
+            "samples": sum(self.samples.values()),
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.samples.most_common())
+
+_current: ContextVar[Optional[Profile]] = ContextVar("clinicbot_profile", default=None)
+
+_lock = threading.Lock()
+_open: List[Profile] = []
+_done: "OrderedDict[str, Profile]" = OrderedDict()
+_sampler: Optional[threading.Thread] = None
+_labels: Dict[Any, str] = {}  # code object -> frame label
+
+_SHORTEN = [p for p in sys.path if p and os.path.isdir(p)]
+_SHORTEN.sort(key=len, reverse=True)
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename
+        for prefix in _SHORTEN:
+            if path.startswith(prefix):
+                path = path[len(prefix):].lstrip(os.sep)
+                break
+        label = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+def _thread_label(name: str) -> str:
+    # "stage_3" and "stage_7" are the same pool; keep the flame graph from splitting on the number
+    return name.rstrip("0123456789").rstrip("_-") or name
+
+def _stack(frame, thread_name: str) -> str:
+    parts = []
+    while frame is not None:
+        parts.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    parts.append(thread_name)
+    return ";".join(reversed(parts))
+
+def _sample_loop():
+    global _sampler
+    interval = max(0.001, PROFILE_INTERVAL_MS / 1000)
+    me = threading.get_ident()
+    while True:
+        time.sleep(interval)
+        with _lock:
+            if not _open:
+                _sampler = None
+                return
+            watched = [(p, list(p.threads)) for p in _open]
+        frames = sys._current_frames()
+        names = {t.ident: _thread_label(t.name) for t in threading.enumerate()}
+        hits = [(profile, _stack(frames[tid], names.get(tid, "thread")))
+                for profile, tids in watched for tid in tids if tid in frames and tid != me]
+        del frames
+        with _lock:
+            for profile, stack in hits:
+                profile.samples[stack] += 1
+
+def _attach(profile: Profile):
+    tid = threading.get_ident()
+    with _lock:
+        profile.threads[tid] = profile.threads.get(tid, 0) + 1
+
+def _detach(profile: Profile):
+    tid = threading.get_ident()
+    with _lock:
+        depth = profile.threads.get(tid, 1) - 1
+        if depth:
+            profile.threads[tid] = depth
+        else:
+            profile.threads.pop(tid, None)
+
+def attach(fn: Callable[..., T]) -> Callable[..., T]:
+    """Wrap `fn` so the thread that runs it is sampled for the caller's open capture, if any."""
+    profile = _current.get()
+    if profile is None:
+        return fn
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        _attach(profile)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _detach(profile)
+    return run
+
+def authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_ADMIN_TOKEN)
+
+@contextmanager
+def capture(label: str, request_id: Optional[str] = None, requested: bool = False) -> Iterator[Optional[Profile]]:
+    """Profile the block when requested or sampled; yields the Profile, or None when not profiling."""
+    global _sampler
+    if _current.get() is not None or not (requested or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)):
+        yield None
+        return
+    profile = Profile(label, request_id, "header" if requested else "sampled")
+    token = _current.set(profile)
+    _attach(profile)
+    with _lock:
+        _open.append(profile)
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_loop, name="profiler", daemon=True)
+            _sampler.start()
+    t0 = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.seconds = time.perf_counter() - t0
+        _detach(profile)
+        _current.reset(token)
+        with _lock:
+            _open.remove(profile)
+            profile.threads.clear()
+            _done[profile.id] = profile
+            _done.move_to_end(profile.id)
+            while len(_done) > PROFILE_KEEP:
+                _done.popitem(last=False)
+            samples = sum(profile.samples.values())
+        PROFILES.labels(label, profile.trigger).inc()
+        logger.info("Profiled %s %s (request %s): %.2fs, %s samples", label, profile.id, profile.request_id, profile.seconds, samples)
+
+def list_profiles() -> List[Dict[str, Any]]:
+    with _lock:
+        return [p.summary() for p in reversed(_done.values())]
+
+def collapsed_stacks(profile_id: str) -> Optional[str]:
+    with _lock:
+        profile = _done.get(profile_id)
+        return None if profile is None else profile.collapsed()
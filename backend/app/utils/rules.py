@@ -8,6 +8,16 @@ PUBLIC_REFUSAL = {
     "zh": ("抱歉，此系統不提供內部營運資料。若您需要預約、服務或門診時間等資訊，我很樂意協助。"),
 }
 
+# Prefix for answers assembled straight from retrieved context when generation is unavailable
+DEGRADED_NOTICE = {
+    "en": "I can't put together a full answer right now, but here is the most relevant clinic information I found:",
+    "zh": "目前無法產生完整回覆，以下是我們找到的相關診所資訊：",
+}
+DEGRADED_EMPTY = {
+    "en": "Sorry, I can't answer right now. Please try again in a moment, or contact the clinic directly.",
+    "zh": "抱歉，目前無法回覆，請稍後再試或直接聯絡診所。",
+}
+
 INTENT_PROMPT = ChatPromptTemplate.from_template(
     """Classify the user request for a public-facing TCM clinic chatbot.
 Categories:
@@ -104,8 +114,8 @@ GENERATION_PROMPT = ChatPromptTemplate.from_messages([
      - If pricing for the asked service is not found, clearly say it is not listed and show any related pricing you do have.
 
     PARSING SQL CONTEXT:
-     - SQL results appear under "## Structured Results (SQL)" as a GitHub-style table with a header row.
-     - Read exact column values from that table. Common columns include: fullName, title, janeAppId, name (service).
+     - SQL results appear under "## Structured Results (SQL)" as CSV: a header row of column names, then one line per row.
+     - Empty fields are NULL. Read exact column values from those rows. Common columns include: fullName, title, janeAppId, name (service).
      
     BOOKING LINKS:
     - Output ONLY real links. Never output placeholders, variables, or notes like “replace <janeAppId>”.
@@ -157,6 +167,9 @@ ROUTER_PROMPT = ChatPromptTemplate.from_template(
         If the question asks about price/cost/fee (EN or ZH), address/phone/email/hours/directions, prefer "sql".
         If the question asks about practitioner bio, service description, faqs, prefer "both"
         Also return a confidence 0-1.
+        Also return "types": the document types worth searching, most relevant first (1-3 of
+        "practitioner", "service", "faq", "clinic", "pricing"), e.g. ["practitioner", "service"] for
+        "who treats back pain?", ["faq"] for policies/insurance/what to bring, ["clinic"] for hours/address.
         Question: {question}
-        Respond as JSON: {{ "route": "...", "confidence": 0.0 }}
+        Respond as JSON: {{ "route": "...", "confidence": 0.0, "types": ["..."] }}
     """)
\ No newline at end of file
@@ -0,0 +1,62 @@
+# backend/app/utils/singleflight.py
+"""
+Single-flight call coalescing: while a call for `key` is running, identical calls wait
+for it and share its result (or its exception) instead of running again. Nothing is
+cached once the call finishes; the next call for the key runs afresh. A caller that joins
+waits at most `timeout` seconds and then gets JoinTimeout; the running call carries on.
+"""
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from .metrics import COALESCED
+
+T = TypeVar("T")
+
+class JoinTimeout(TimeoutError):
+    """A joined call was still running when the caller's wait ran out."""
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._leaders = 0
+        self._followers = 0
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args, timeout: Optional[float] = None) -> Tuple[T, bool]:
+        """Run fn(*args), or join the identical call already in flight. Returns (result, shared)."""
+        with self._lock:
+            future = self._inflight.get(key)
+            shared = future is not None
+            if shared:
+                self._followers += 1
+            else:
+                future = Future()
+                self._inflight[key] = future
+                self._leaders += 1
+        COALESCED.labels("follower" if shared else "leader").inc()
+        if shared:
+            try:
+                return future.result(timeout=timeout), True
+            except FutureTimeout:
+                raise JoinTimeout(f"call still in flight after {timeout:.1f}s") from None
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result(), False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            leaders, followers = self._leaders, self._followers
+        total = leaders + followers
+        return {
+            "leaders": leaders,
+            "followers": followers,
+            "inflight": len(self._inflight),
+            "ratio": round(followers / total, 4) if total else 0.0,
+        }
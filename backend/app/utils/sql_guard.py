@@ -0,0 +1,287 @@
+# backend/app/utils/sql_guard.py
+"""
+Guard for LLM-written SQL: single read-only SELECT, bounded LIMIT, statement
+timeout and an optional EXPLAIN cost ceiling. No SQL parser dependency; comments
+and literals are masked so keyword checks only see the statement's structure.
+"""
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from sqlalchemy import text as sql_text
+from sqlalchemy.engine import Connection
+
+from .config import SQL_MAX_ROWS, SQL_STATEMENT_TIMEOUT_MS, SQL_MAX_PLAN_COST
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+class SqlRejected(ValueError):
+    """The statement failed validation or exceeded the plan cost ceiling."""
+
+class SqlTimeout(RuntimeError):
+    """The statement was cancelled by the statement timeout."""
+
+# Only checked where a statement starts, so columns and aliases may use these names
+_FORBIDDEN = {
+    "insert", "update", "delete", "merge", "replace", "drop", "alter", "create", "truncate",
+    "grant", "revoke", "attach", "detach", "pragma", "vacuum", "reindex", "copy", "call",
+    "execute", "lock", "set", "reset",
+}
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*|[(),]")
+# LIMIT n|ALL [OFFSET m], or SQLite/MySQL's LIMIT m, n (offset first)
+_TRAILING_LIMIT_RE = re.compile(
+    r"\blimit\s+(\d+|all)(?:\s*,\s*(\d+)|\s+offset\s+\d+)?\s*$", re.IGNORECASE
+)
+# Standard SQL row limit (Postgres): [OFFSET m ROWS] FETCH FIRST|NEXT [n] ROW|ROWS ONLY|WITH TIES
+_TRAILING_FETCH_RE = re.compile(r"\bfetch\s+(?:first|next)\b[^()]*$", re.IGNORECASE)
+_FETCH_ONLY_RE = re.compile(r"\bfetch\s+(?:first|next)\s+(?:(\d+)\s+)?rows?\s+only\s*$", re.IGNORECASE)
+
+_stats = {"checked": 0, "rejected": 0, "timed_out": 0, "clamped": 0}
+_stats_lock = threading.Lock()
+
+def _bump(key: str):
+    with _stats_lock:
+        _stats[key] += 1
+
+def guard_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+def _mask(sql: str) -> str:
+    """Replace comments with spaces and the contents of quoted literals/identifiers with 'x'."""
+    out = []
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if sql.startswith("--", i):
+            j = sql.find("\n", i)
+            j = n if j < 0 else j
+            out.append(" " * (j - i))
+            i = j
+        elif sql.startswith("/*", i):
+            j = sql.find("*/", i + 2)
+            if j < 0:
+                raise SqlRejected("unterminated comment")
+            out.append(" " * (j + 2 - i))
+            i = j + 2
+        elif c in ("'", '"', "`"):
+            j = i + 1
+            while True:
+                j = sql.find(c, j)
+                if j < 0:
+                    raise SqlRejected("unterminated quoted string")
+                if j + 1 < n and sql[j + 1] == c:  # doubled quote escape
+                    j += 2
+                    continue
+                break
+            out.append(c + "x" * (j - i - 1) + c)
+            i = j + 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out)
+
+def _statement_words(body: str) -> List[str]:
+    """
+    First word of each statement in `body`: the statement itself, each CTE body
+    (`name AS (...)`, where Postgres allows INSERT/UPDATE/DELETE) and the main
+    statement after a WITH list (`WITH x AS (...) DELETE ...`).
+    """
+    tokens = [t.lower() for t in _TOKEN_RE.findall(body)]
+    found = tokens[:1]
+    main_pending = found == ["with"]
+    depth = 0
+    for i, tok in enumerate(tokens):
+        prev = tokens[i - 1] if i else ""
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+        elif prev == "(" and i >= 2 and tokens[i - 2] in ("as", "materialized"):
+            found.append(tok)
+        elif main_pending and depth == 0 and prev == ")" and tok not in (",", "as", "search", "cycle"):
+            found.append(tok)
+            main_pending = False
+    return found
+
+def validate_select(sql: str) -> str:
+    """Return the statement without its trailing semicolon, or raise SqlRejected."""
+    stmt = (sql or "").strip()
+    masked = _mask(stmt)
+    body = masked.rstrip().rstrip(";").rstrip()
+    if not body:
+        raise SqlRejected("empty statement")
+    if ";" in body:
+        raise SqlRejected("multiple statements")
+    words = [w.lower() for w in _WORD_RE.findall(body)]
+    if not words or words[0] not in ("select", "with"):
+        raise SqlRejected(f"only SELECT is allowed (got {words[0].upper() if words else 'nothing'})")
+    bad = sorted(set(_statement_words(body)) & _FORBIDDEN)
+    if bad:
+        raise SqlRejected(f"forbidden keyword(s): {', '.join(bad).upper()}")
+    depth = 0
+    for ch in body:
+        depth += ch == "("
+        depth -= ch == ")"
+        if depth < 0:
+            raise SqlRejected("unbalanced parentheses")
+    if depth:
+        raise SqlRejected("unbalanced parentheses")
+    return stmt[:len(body)]
+
+def _top_level(masked: str, m) -> bool:
+    # A LIMIT or FETCH inside a sub-select is followed by its closing paren, not at the top level
+    return masked[:m.start()].count("(") == masked[:m.start()].count(")")
+
+def enforce_limit(sql: str, max_rows: int = SQL_MAX_ROWS) -> str:
+    """Clamp a top-level trailing LIMIT or FETCH FIRST to `max_rows`, or append a LIMIT if there is none."""
+    masked = _mask(sql)
+    m = _TRAILING_FETCH_RE.search(masked)
+    if m and _top_level(masked, m):
+        only = _FETCH_ONLY_RE.search(masked)
+        if not only:
+            # WITH TIES can return any number of rows past n; a count expression can't be checked
+            raise SqlRejected("FETCH is only allowed as FETCH FIRST n ROWS ONLY")
+        if only.group(1) is None or int(only.group(1)) <= max_rows:
+            return sql  # no count means one row
+        _bump("clamped")
+        return f"{sql[:only.start(1)]}{max_rows}{sql[only.end(1):]}"
+    m = _TRAILING_LIMIT_RE.search(masked)
+    if m and _top_level(masked, m):
+        if m.group(1).lower() == "all":
+            if m.group(2) is not None:
+                raise SqlRejected("LIMIT ALL, n is not valid SQL")
+            _bump("clamped")
+            return f"{sql[:m.start(1)]}{max_rows}{sql[m.end(1):]}"
+        if m.group(2) is not None:
+            # Rewritten as LIMIT n OFFSET m, which Postgres also accepts
+            offset, count = int(m.group(1)), int(m.group(2))
+            if count > max_rows:
+                _bump("clamped")
+            return f"{sql[:m.start()]}LIMIT {min(count, max_rows)} OFFSET {offset}"
+        if int(m.group(1)) <= max_rows:
+            return sql
+        _bump("clamped")
+        return f"{sql[:m.start(1)]}{max_rows}{sql[m.end(1):]}"
+    return f"{sql}\nLIMIT {max_rows}"
+
+def prepare(sql: str, max_rows: int = SQL_MAX_ROWS) -> str:
+    """Validate and bound a generated statement; counts rejections."""
+    _bump("checked")
+    try:
+        return enforce_limit(validate_select(sql), max_rows)
+    except SqlRejected as e:
+        _bump("rejected")
+        logger.warning("Rejected generated SQL (%s): %r", e, sql)
+        raise
+
+def _check_plan_cost(conn: Connection, sql: str):
+    if SQL_MAX_PLAN_COST <= 0 or conn.dialect.name != "postgresql":
+        return
+    plan = conn.execute(sql_text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    cost = float(plan[0]["Plan"]["Total Cost"])
+    if cost > SQL_MAX_PLAN_COST:
+        _bump("rejected")
+        logger.warning("Rejected generated SQL: plan cost %.0f > %.0f: %r", cost, SQL_MAX_PLAN_COST, sql)
+        raise SqlRejected(f"plan cost {cost:.0f} exceeds {SQL_MAX_PLAN_COST:.0f}")
+
+@contextmanager
+def read_only(conn: Connection, timeout_ms: int = SQL_STATEMENT_TIMEOUT_MS) -> Iterator[Connection]:
+    """
+    Run the block in a read-only transaction with a statement timeout.
+    Postgres: SET TRANSACTION READ ONLY + SET LOCAL statement_timeout (both end with the transaction).
+    SQLite: PRAGMA query_only and a progress handler that aborts past the deadline.
+    """
+    dialect = conn.dialect.name
+    raw = None
+    with conn.begin():
+        try:
+            if dialect == "postgresql":
+                conn.execute(sql_text("SET TRANSACTION READ ONLY"))
+                if timeout_ms > 0:
+                    conn.execute(sql_text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+            elif dialect == "sqlite":
+                conn.exec_driver_sql("PRAGMA query_only = ON")
+                if timeout_ms > 0:
+                    raw = conn.connection.dbapi_connection
+                    deadline = time.monotonic() + timeout_ms / 1000
+                    raw.set_progress_handler(lambda: int(time.monotonic() > deadline), 10_000)
+            yield conn
+        except Exception as e:
+            if _is_timeout(e):
+                _bump("timed_out")
+                logger.warning("Generated SQL cancelled after %s ms", timeout_ms)
+                raise SqlTimeout(f"statement exceeded {timeout_ms} ms") from e
+            raise
+        finally:
+            if dialect == "sqlite":
+                # Pooled connection: leave it writable and without a handler for the next user
+                if raw is not None:
+                    raw.set_progress_handler(None, 0)
+                conn.exec_driver_sql("PRAGMA query_only = OFF")
+
+def _is_timeout(e: Exception) -> bool:
+    msg = str(getattr(e, "orig", e)).lower()
+    return "statement timeout" in msg or "interrupted" in msg
+
+def run_guarded(conn: Connection, sql: str, max_rows: int = SQL_MAX_ROWS):
+    """Validate, bound and execute `sql` on `conn`; returns (columns, rows, truncated)."""
+    # Fetch one extra row so callers can tell the result was cut off
+    bounded = prepare(sql, max_rows + 1)
+    with read_only(conn):
+        _check_plan_cost(conn, bounded)
+        result = conn.execute(sql_text(bounded))
+        if not result.returns_rows:
+            return [], [], False
+        columns = list(result.keys())
+        rows = [tuple(r) for r in result.fetchmany(max_rows + 1)]
+    return columns, rows[:max_rows], len(rows) > max_rows
+
+# `python -m app.utils.sql_guard` runs these: (statement, max_rows, expected result of prepare)
+_CHECKS = [
+    ("SELECT * FROM pricing", 50, "SELECT * FROM pricing\nLIMIT 50"),
+    ("SELECT * FROM pricing LIMIT 10;", 50, "SELECT * FROM pricing LIMIT 10"),
+    ("SELECT * FROM pricing LIMIT 100000 OFFSET 0", 50, "SELECT * FROM pricing LIMIT 50 OFFSET 0"),
+    ("SELECT * FROM pricing LIMIT 0, 100000", 50, "SELECT * FROM pricing LIMIT 50 OFFSET 0"),
+    ("SELECT * FROM pricing LIMIT 20, 10", 50, "SELECT * FROM pricing LIMIT 10 OFFSET 20"),
+    ("SELECT * FROM pricing LIMIT ALL", 50, "SELECT * FROM pricing LIMIT 50"),
+    ("SELECT * FROM pricing LIMIT ALL OFFSET 10", 50, "SELECT * FROM pricing LIMIT 50 OFFSET 10"),
+    ("SELECT * FROM pricing FETCH FIRST 100000 ROWS ONLY", 50, "SELECT * FROM pricing FETCH FIRST 50 ROWS ONLY"),
+    ("SELECT * FROM pricing OFFSET 5 ROWS FETCH NEXT 10 ROWS ONLY;", 50, "SELECT * FROM pricing OFFSET 5 ROWS FETCH NEXT 10 ROWS ONLY"),
+    ("SELECT * FROM pricing FETCH FIRST ROW ONLY", 50, "SELECT * FROM pricing FETCH FIRST ROW ONLY"),
+    ("SELECT * FROM pricing ORDER BY price FETCH FIRST 5 ROWS WITH TIES", 50, SqlRejected),
+    ("SELECT * FROM (SELECT * FROM pricing FETCH FIRST 5 ROWS ONLY) p", 50, "SELECT * FROM (SELECT * FROM pricing FETCH FIRST 5 ROWS ONLY) p\nLIMIT 50"),
+    ("SELECT * FROM (SELECT * FROM pricing LIMIT 5)", 50, "SELECT * FROM (SELECT * FROM pricing LIMIT 5)\nLIMIT 50"),
+    ("SELECT 1; DROP TABLE pricing", 50, SqlRejected),
+    ("DELETE FROM pricing", 50, SqlRejected),
+    ("SELECT name AS reset FROM t", 50, "SELECT name AS reset FROM t\nLIMIT 50"),
+    ("SELECT set, lock, lower(copy) AS call FROM t", 50, "SELECT set, lock, lower(copy) AS call FROM t\nLIMIT 50"),
+    ("WITH x(a) AS (SELECT 1) SELECT a FROM x", 50, "WITH x(a) AS (SELECT 1) SELECT a FROM x\nLIMIT 50"),
+    ("WITH d AS (DELETE FROM pricing RETURNING *) SELECT * FROM d", 50, SqlRejected),
+    ("WITH d AS MATERIALIZED (UPDATE pricing SET price = 0 RETURNING *) SELECT 1", 50, SqlRejected),
+    ("WITH x AS (SELECT 1), y AS (SELECT 2) DELETE FROM pricing", 50, SqlRejected),
+]
+
+def _self_check():
+    failed = 0
+    for sql, max_rows, expected in _CHECKS:
+        try:
+            got = prepare(sql, max_rows)
+        except SqlRejected as e:
+            got = SqlRejected
+            detail = str(e)
+        else:
+            detail = got
+        ok = got == expected
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {sql!r} -> {detail!r}")
+    raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    _self_check()
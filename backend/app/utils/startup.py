@@ -0,0 +1,51 @@
+# backend/app/utils/startup.py
+"""
+Cold-start accounting. `app.api` imports this module first, so `STARTED` is close to the
+moment the API began importing; it then records how long its own imports took, the
+startup hook records each init step and warm-up records what it loaded in the background.
+`startup_report()` (served at GET /startup) lists them all, so cold-start regressions show up.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+STARTED = time.perf_counter()
+
+_lock = threading.Lock()
+_phases: List[Tuple[str, float, bool]] = []  # (name, seconds, failed)
+_warmup: Dict[str, Any] = {"state": "pending", "seconds": None}
+
+def record(name: str, seconds: float, failed: bool = False):
+    with _lock:
+        _phases.append((name, seconds, failed))
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record(name, time.perf_counter() - t0, failed)
+
+def set_warmup_state(state: str, seconds: float | None = None):
+    with _lock:
+        _warmup.update(state=state, seconds=None if seconds is None else round(seconds, 3))
+
+def startup_report() -> Dict[str, Any]:
+    with _lock:
+        phases = list(_phases)
+        warmup = dict(_warmup)
+    return {
+        "uptime_s": round(time.perf_counter() - STARTED, 3),
+        "phases": [{"name": n, "ms": round(s * 1000, 1), **({"failed": True} if f else {})} for n, s, f in phases],
+        "warmup": warmup,
+    }
@@ -0,0 +1,212 @@
+# backend/app/utils/tenancy.py
+"""
+Several clinics (tenants) in one deployment.
+
+Each tenant has its own SQL database, vector collection, BM25 index and FAQ index, so a
+generated SQL query or a retrieval can only ever see one clinic's data. The tenant of the
+current request lives in a ContextVar (set by the API with `use_tenant`), which follows
+work onto the stage and retrieval pools like the deadline and metrics context do.
+
+Where a tenant's state lives:
+  - the DEFAULT_TENANT uses the configured paths as they are (a single-clinic setup is unchanged),
+  - a setting containing `{tenant}` is formatted with the tenant id,
+  - otherwise the file goes to TENANT_ROOT/<tenant>/ under its usual name
+    (e.g. LEXICAL_INDEX_PATH=/app/data/lexical_index.json -> /app/data/tenants/<tenant>/lexical_index.json).
+SQLite databases follow the same rule; other databases need a `{tenant}` in SQL_DB_URL
+(e.g. a database per clinic, or `?options=-csearch_path%3Dclinic_{tenant}` for a Postgres schema).
+
+Per-tenant objects are held in `TenantCache`s: loaded on first use, dropped when a tenant has
+been idle for TENANT_IDLE_S or when more than TENANT_CACHE_SIZE tenants are loaded (least
+recently used first). The default tenant is never evicted.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+from .config import DEFAULT_TENANT, TENANT_CACHE_SIZE, TENANT_IDLE_S, TENANT_ROOT
+from .metrics import TENANT_CACHE_EVENTS, TENANTS_LOADED
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Also a valid Chroma collection suffix and path component
+TENANT_ID_PATTERN = r"^[a-z0-9](?:[a-z0-9_-]{0,38}[a-z0-9])?$"
+_TENANT_ID_RE = re.compile(TENANT_ID_PATTERN)
+
+class UnknownTenant(LookupError):
+    """No data has been ingested for this tenant."""
+
+_current: ContextVar[str] = ContextVar("clinicbot_tenant", default=DEFAULT_TENANT)
+
+def current_tenant() -> str:
+    return _current.get()
+
+@contextmanager
+def use_tenant(tenant: Optional[str]) -> Iterator[str]:
+    token = _current.set(tenant or DEFAULT_TENANT)
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+def tenant_dir(tenant: str) -> str:
+    return os.path.join(TENANT_ROOT, tenant)
+
+def tenant_path(base: str, tenant: Optional[str] = None) -> str:
+    tenant = tenant or current_tenant()
+    if "{tenant}" in base:
+        return base.replace("{tenant}", tenant)
+    if tenant == DEFAULT_TENANT or not base:
+        return base
+    return os.path.join(tenant_dir(tenant), os.path.basename(base.rstrip("/")))
+
+def tenant_sql_url(url: str, tenant: Optional[str] = None) -> str:
+    tenant = tenant or current_tenant()
+    if "{tenant}" in url or tenant == DEFAULT_TENANT:
+        return url.replace("{tenant}", tenant)
+    if url.startswith("sqlite:///"):
+        return "sqlite:///" + tenant_path(url[len("sqlite:///"):], tenant)
+    raise ValueError("SQL_DB_URL needs a {tenant} placeholder to serve more than one clinic")
+
+def collection_name(base: str, tenant: Optional[str] = None) -> str:
+    tenant = tenant or current_tenant()
+    return base if tenant == DEFAULT_TENANT else f"{base}-{tenant}"
+
+def scoped_session(session_id: str, tenant: Optional[str] = None) -> str:
+    """Session key for history, admission and usage: the same session id in two clinics is two sessions."""
+    tenant = tenant or current_tenant()
+    return session_id if tenant == DEFAULT_TENANT else f"{tenant}:{session_id}"
+
+def resolve_tenant(tenant_id: Optional[str], create: bool = False) -> str:
+    """Validated tenant id; raises UnknownTenant for a tenant with no data unless `create`."""
+    tenant = tenant_id or DEFAULT_TENANT
+    if tenant == DEFAULT_TENANT:
+        return tenant
+    if not _TENANT_ID_RE.match(tenant):
+        raise UnknownTenant(tenant)
+    if create:
+        os.makedirs(tenant_dir(tenant), exist_ok=True)
+    elif not os.path.isdir(tenant_dir(tenant)):
+        raise UnknownTenant(tenant)
+    return tenant
+
+# ----- per-tenant caches -----
+_caches: List["TenantCache"] = []
+_SWEEP_EVERY_S = 60  # idle tenants are looked for at most this often
+_last_sweep = time.monotonic()
+
+def sweep_idle(now: Optional[float] = None):
+    """Drop idle tenants from every cache, including ones no request has read lately."""
+    global _last_sweep
+    _last_sweep = now = now or time.monotonic()
+    for cache in list(_caches):
+        cache._evict(now)
+
+class TenantCache(Generic[T]):
+    """Lazily loaded per-tenant objects with LRU and idle eviction."""
+
+    def __init__(self, name: str, load: Callable[[str], T], close: Optional[Callable[[T], None]] = None):
+        self.name = name
+        self._load = load
+        self._close = close
+        self._entries: "OrderedDict[str, Tuple[T, float]]" = OrderedDict()  # tenant -> (value, last used)
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        _caches.append(self)
+
+    def get(self, tenant: Optional[str] = None) -> T:
+        tenant = tenant or current_tenant()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is not None:
+                self._entries[tenant] = (entry[0], now)
+                self._entries.move_to_end(tenant)
+            load_lock = self._loading.setdefault(tenant, threading.Lock())
+        if now - _last_sweep >= _SWEEP_EVERY_S:
+            sweep_idle(now)
+        if entry is not None:
+            return entry[0]
+        with load_lock:  # one load per tenant; other callers wait for it
+            with self._lock:
+                entry = self._entries.get(tenant)
+            if entry is not None:
+                return entry[0]
+            value = self._load(tenant)
+            TENANT_CACHE_EVENTS.labels(self.name, "load").inc()
+            self.put(value, tenant)
+        return value
+
+    def put(self, value: T, tenant: Optional[str] = None):
+        """Install (or replace) the tenant's object, e.g. after re-ingesting it."""
+        tenant = tenant or current_tenant()
+        with self._lock:
+            self._entries[tenant] = (value, time.monotonic())
+            self._entries.move_to_end(tenant)
+        self._evict(time.monotonic())
+
+    def items(self) -> List[Tuple[str, T]]:
+        with self._lock:
+            return [(tenant, v) for tenant, (v, _) in self._entries.items()]
+
+    def discard(self, tenant: Optional[str] = None):
+        with self._lock:
+            entry = self._entries.pop(tenant or current_tenant(), None)
+        if entry is not None:
+            self._closing([entry[0]])
+        self._set_gauge()
+
+    def clear(self):
+        with self._lock:
+            dropped = [v for v, _ in self._entries.values()]
+            self._entries.clear()
+        self._closing(dropped)
+        self._set_gauge()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _evict(self, now: float):
+        dropped = []
+        with self._lock:
+            for tenant, (value, used) in list(self._entries.items()):
+                if tenant != DEFAULT_TENANT and now - used > TENANT_IDLE_S:
+                    dropped.append((tenant, value, "idle"))
+                    del self._entries[tenant]
+            # Oldest first; the default tenant does not count against the limit
+            for tenant in list(self._entries):
+                if len(self._entries) - (DEFAULT_TENANT in self._entries) <= TENANT_CACHE_SIZE:
+                    break
+                if tenant != DEFAULT_TENANT:
+                    dropped.append((tenant, self._entries.pop(tenant)[0], "size"))
+            for tenant, _, _ in dropped:
+                self._loading.pop(tenant, None)
+        for tenant, _, reason in dropped:
+            TENANT_CACHE_EVENTS.labels(self.name, f"evict_{reason}").inc()
+            logger.info("Evicted %s for tenant %s (%s)", self.name, tenant, reason)
+        self._closing([value for _, value, _ in dropped])
+        self._set_gauge()
+
+    def _closing(self, values: List[T]):
+        if self._close is None:
+            return
+        for value in values:
+            try:
+                self._close(value)
+            except Exception as e:
+                logger.warning("Closing evicted %s failed: %s", self.name, e)
+
+    def _set_gauge(self):
+        TENANTS_LOADED.labels(self.name).set(len(self))
+
+def tenant_stats() -> Dict[str, Any]:
+    """Loaded tenants per cache, for /health."""
+    return {cache.name: len(cache) for cache in _caches}
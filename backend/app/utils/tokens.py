@@ -0,0 +1,37 @@
+# backend/app/utils/tokens.py
+import re
+import threading
+
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_encoder = None
+_encoder_failed = False
+_lock = threading.Lock()
+
+def _get_encoder():
+    """tiktoken's o200k_base (gpt-4.1 / gpt-4o family) if it can be loaded, else None."""
+    global _encoder, _encoder_failed
+    if _encoder is not None or _encoder_failed:
+        return _encoder
+    with _lock:
+        if _encoder is None and not _encoder_failed:
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                # The BPE file is downloaded on first use; offline instances fall back to an estimate
+                _encoder_failed = True
+                logger.warning("tiktoken unavailable (%s); using estimated token counts", e.__class__.__name__)
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + max(0, len(text) - cjk) // 4 + 1
@@ -0,0 +1,186 @@
+# backend/app/utils/usage.py
+"""
+LLM token and cost accounting. Every chain built in `setup.set_openai_key` carries a
+`UsageCallback(stage)`; on each LLM response it reads the token usage, estimates the
+cost and records it:
+  - per stage and route as Prometheus counters (via the request context in utils.metrics,
+    so the route label is the one the router finally picked),
+  - per session in memory (`session_usage`), for the USAGE_MAX_SESSIONS most recently active sessions,
+  - in a rolling window checked against LLM_BUDGET_USD, with a warning logged when exceeded.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from .config import LLM_BUDGET_USD, LLM_BUDGET_WINDOW_S, LLM_MODEL, LLM_PRICE_PER_1M, USAGE_MAX_SESSIONS
+from .metrics import LLM_CALL_SECONDS, current_request, observe_usage
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+# USD per 1M tokens: (input, cached input, output). Matched by longest prefix so dated
+# snapshots (gpt-4.1-nano-2025-04-14) resolve to their family.
+PRICES_PER_1M: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+
+def _price_override() -> Optional[Tuple[float, float, float]]:
+    if not LLM_PRICE_PER_1M:
+        return None
+    try:
+        inp, cached, out = (float(x) for x in LLM_PRICE_PER_1M.split(","))
+        return inp, cached, out
+    except ValueError:
+        logger.warning("Ignoring LLM_PRICE_PER_1M=%r; expected 'input,cached,output'", LLM_PRICE_PER_1M)
+        return None
+
+_OVERRIDE = _price_override()
+_unpriced_models: set = set()
+
+def price_for(model: str) -> Tuple[float, float, float]:
+    if _OVERRIDE:
+        return _OVERRIDE
+    for prefix in sorted(PRICES_PER_1M, key=len, reverse=True):
+        if model.startswith(prefix):
+            return PRICES_PER_1M[prefix]
+    if model not in _unpriced_models:
+        _unpriced_models.add(model)
+        logger.warning("No price known for model %s; its cost is counted as 0 (set LLM_PRICE_PER_1M)", model)
+    return 0.0, 0.0, 0.0
+
+def estimate_cost(model: str, prompt: int, completion: int, cached: int) -> float:
+    inp, cached_price, out = price_for(model)
+    return ((prompt - cached) * inp + cached * cached_price + completion * out) / 1_000_000
+
+def _usage_from(response: LLMResult) -> Tuple[str, int, int, int]:
+    """(model, prompt, completion, cached) for one LLM response; 0s when the provider reported nothing."""
+    llm_output = response.llm_output or {}
+    model = llm_output.get("model_name") or ""
+    prompt = completion = cached = 0
+    seen = False
+    for generations in response.generations:
+        for gen in generations:
+            msg = gen.message if isinstance(gen, ChatGeneration) else None
+            meta = getattr(msg, "usage_metadata", None)
+            if not meta:
+                continue
+            seen = True
+            prompt += meta.get("input_tokens", 0)
+            completion += meta.get("output_tokens", 0)
+            cached += (meta.get("input_token_details") or {}).get("cache_read", 0) or 0
+            model = model or (msg.response_metadata or {}).get("model_name", "")
+    if not seen:
+        token_usage = llm_output.get("token_usage") or {}
+        prompt = token_usage.get("prompt_tokens", 0)
+        completion = token_usage.get("completion_tokens", 0)
+        cached = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+    return model or LLM_MODEL, prompt, completion, cached
+
+class _Totals:
+    __slots__ = ("calls", "prompt", "completion", "cached", "usd")
+
+    def __init__(self):
+        self.calls = self.prompt = self.completion = self.cached = 0
+        self.usd = 0.0
+
+    def add(self, prompt: int, completion: int, cached: int, usd: float):
+        self.calls += 1
+        self.prompt += prompt
+        self.completion += completion
+        self.cached += cached
+        self.usd += usd
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "prompt_tokens": self.prompt, "completion_tokens": self.completion,
+                "cached_tokens": self.cached, "cost_usd": round(self.usd, 6)}
+
+_lock = threading.Lock()
+_sessions: "OrderedDict[str, _Totals]" = OrderedDict()  # least recently active first
+_window: deque = deque()  # (monotonic time, usd)
+_window_usd = 0.0
+_over_budget = False
+
+def _check_budget(usd: float):
+    """Rolling-window spend; logs once when the budget is crossed and once when back under it."""
+    global _window_usd, _over_budget
+    now = time.monotonic()
+    _window.append((now, usd))
+    _window_usd += usd
+    while _window and _window[0][0] < now - LLM_BUDGET_WINDOW_S:
+        _window_usd -= _window.popleft()[1]
+    if LLM_BUDGET_USD <= 0:
+        return
+    if _window_usd > LLM_BUDGET_USD and not _over_budget:
+        _over_budget = True
+        logger.warning("LLM budget alarm: $%.6f spent in the last %ss (budget $%.6f)",
+                       _window_usd, LLM_BUDGET_WINDOW_S, LLM_BUDGET_USD)
+    elif _window_usd <= LLM_BUDGET_USD and _over_budget:
+        _over_budget = False
+        logger.info("LLM spend back under budget: $%.6f in the last %ss", _window_usd, LLM_BUDGET_WINDOW_S)
+
+def record_usage(stage: str, model: str, prompt: int, completion: int, cached: int) -> float:
+    usd = estimate_cost(model, prompt, completion, cached)
+    ctx = current_request()
+    # Calls the deadline abandoned, or a hedge's losing attempt, can end after their request
+    # has been observed: count those directly, under the route the request ended with
+    if ctx is None or not ctx.add_usage(stage, model, prompt, completion, cached, usd):
+        observe_usage(stage, ctx.route if ctx is not None else "none", model, prompt, completion, cached, usd)
+    session_id = ctx.session_id if ctx is not None else None
+    with _lock:
+        if session_id:
+            _sessions.setdefault(session_id, _Totals()).add(prompt, completion, cached, usd)
+            _sessions.move_to_end(session_id)
+            while len(_sessions) > USAGE_MAX_SESSIONS:
+                _sessions.popitem(last=False)
+        _check_budget(usd)
+    return usd
+
+def session_usage(session_id: str) -> Dict[str, Any]:
+    with _lock:
+        totals = _sessions.get(session_id)
+        return totals.as_dict() if totals else _Totals().as_dict()
+
+def usage_summary() -> Dict[str, Any]:
+    with _lock:
+        return {
+            "sessions": len(_sessions),
+            "window_seconds": LLM_BUDGET_WINDOW_S,
+            "window_cost_usd": round(_window_usd, 6),
+            "budget_usd": LLM_BUDGET_USD,
+            "over_budget": _over_budget,
+        }
+
+class UsageCallback(BaseCallbackHandler):
+    """Attributes every LLM call made under a chain to `stage`, and times it per model."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        try:
+            model, prompt, completion, cached = _usage_from(response)
+            if started is not None:
+                LLM_CALL_SECONDS.labels(self.stage, model).observe(time.perf_counter() - started)
+            record_usage(self.stage, model, prompt, completion, cached)
+        except Exception as e:
+            logger.warning("Usage accounting failed for stage %s: %s", self.stage, e)
@@ -1,57 +1,255 @@
 # backend/app/utils/vectorstore.py
+import contextvars
 import os
-from typing import Optional
-import chromadb
-from langchain_openai import OpenAIEmbeddings
-from langchain_chroma import Chroma
-from .config import OPENAI_EMBED_MODEL
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from .config import GENERATION_RESERVE_S, OPENAI_EMBED_CHECK_CTX, OPENAI_EMBED_MODEL, OPENAI_EMBED_TIMEOUT, RETRIEVAL_EMBED_SLICE_S, VECTOR_BACKEND, NUMPY_STORE_PATH, HYBRID_FETCH_K, LEXICAL_CONFIDENT_SCORE, LEXICAL_CONFIDENT_MARGIN, TYPE_K_BUDGETS, DOCS_MAX_CHUNKS
+from .deadline import StageTimeout, call_with_timeout, current_deadline
+from .lexical import get_lexical_index, rrf_fuse
+from .llm_replay import get_http_client
+from .profiler import attach
+from .tenancy import TenantCache, collection_name, current_tenant, tenant_path
+from .numpy_store import NumpyVectorStore, columns_from_metadatas, normalize_rows
+from .metrics import DEADLINE_EVENTS
+from .logging import get_logger
 
-_emb: Optional[OpenAIEmbeddings] = None
-_store: Optional[Chroma] = None
+if TYPE_CHECKING:
+    from langchain_openai import OpenAIEmbeddings
+
+logger = get_logger(__name__)
+
+# langchain_openai, chromadb and langchain_chroma are imported on first use (see services/warmup.py)
+_emb: Optional["OpenAIEmbeddings"] = None
+_RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
 
 def _assert_key():
     if _emb is None:
         raise RuntimeError("OpenAI API key not set. Call /set-api-key first.")
 
 
+def make_embeddings(api_key: str, model: str | None = None) -> "OpenAIEmbeddings":
+    from langchain_openai import OpenAIEmbeddings
+    # The endpoint comes from OPENAI_BASE_URL when set (e.g. a local OpenAI-compatible server);
+    # with LLM_RECORD_MODE the calls go through the record/replay client
+    return OpenAIEmbeddings(api_key=api_key, model=model or OPENAI_EMBED_MODEL, check_embedding_ctx_length=OPENAI_EMBED_CHECK_CTX,
+                            request_timeout=OPENAI_EMBED_TIMEOUT, http_client=get_http_client())
+
 def set_embedding_api_key(new_key: str, model: str | None = None) -> bool:
     """
     Hot-swap the API key (and optionally model) used for **query embeddings**.
     This does NOT re-embed documents; it only affects future queries.
     """
-    global _emb, _store
+    global _emb
     if not new_key:
         return False
-    chosen = model or OPENAI_EMBED_MODEL
-    _emb = OpenAIEmbeddings(api_key=new_key, model=chosen)
-    # Re-open collection with the new embedding function
-    _store = _build_store()
+    _emb = make_embeddings(new_key, model)
+    for tenant, store in _stores.items():
+        if isinstance(store, NumpyVectorStore):
+            # In-process index (possibly a mapped bundle): keep the vectors, swap the query embedder
+            store.embedding = _emb
+        else:
+            # Re-opened with the new embedding function on next use
+            _stores.discard(tenant)
     return True
 
-def get_embeddings() -> OpenAIEmbeddings:
+def get_embeddings() -> "OpenAIEmbeddings":
     _assert_key()
     return _emb
 
-def _build_store() -> Chroma:
-     # os.makedirs(CHROMA_DIR, exist_ok=True)
-     
+def embed_query_within(text: str) -> List[float]:
+    """Query embedding for retrieval, bounded by the request deadline when there is one (StageTimeout past it)."""
+    deadline = current_deadline()
+    if deadline is None:
+        return get_embeddings().embed_query(text)
+    try:
+        return call_with_timeout(get_embeddings().embed_query, deadline.budget(RETRIEVAL_EMBED_SLICE_S, reserve=GENERATION_RESERVE_S), text)
+    except StageTimeout:
+        DEADLINE_EVENTS.labels("embed_timeout").inc()
+        raise
+
+_client = None
+
+def _chroma_client():
+    import chromadb
     # Connect to the remote Chroma client
     # chroma_client = chromadb.HttpClient(host="http://your-chroma-server-ip:8000") # Replace with server's IP/hostname and port
-    chroma_client = chromadb.HttpClient(host=os.getenv("CHROMA_HOST"), port=8000)
+    return chromadb.HttpClient(host=os.getenv("CHROMA_HOST"), port=8000)
 
+# Swappable so tests and load runs can point Chroma at an in-memory stand-in
+chroma_client_factory: Callable[[], Any] = _chroma_client
+
+def _open_backend(tenant: str) -> VectorStore:
+    global _client
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore(embedding=get_embeddings(), path=tenant_path(NUMPY_STORE_PATH, tenant))
+    # os.makedirs(CHROMA_DIR, exist_ok=True)
+    from langchain_chroma import Chroma
+
+    if _client is None:
+        _client = chroma_client_factory()  # one client shared by every clinic's collection
     return Chroma(
-        collection_name="clinic_data",
+        collection_name=collection_name("clinic_data", tenant),
         embedding_function=get_embeddings(),
         # persist_directory=CHROMA_DIR,
-        client=chroma_client
+        client=_client
     )
 
-def get_store() -> Chroma:
+# Set by services.bundle: the tenant's knowledge bundle as an in-process index, or None without one
+bundle_loader: Optional[Callable[[str], Optional[NumpyVectorStore]]] = None
+
+def _build_store(tenant: str) -> VectorStore:
+    store = bundle_loader(tenant) if bundle_loader is not None else None
+    if store is None:
+        return _open_backend(tenant)
+    store.embedding = _emb
+    _preloaded.add(store)
+    return store
+
+# Stores served from a bundle: read-only snapshots with no backing path
+_preloaded: "weakref.WeakSet[NumpyVectorStore]" = weakref.WeakSet()
+
+# One store (Chroma collection or in-process index) per clinic; loaded from its bundle when there is one
+_stores: TenantCache[VectorStore] = TenantCache("vectors", _build_store)
+
+def get_store() -> VectorStore:
     _assert_key()
-    global _store
-    if _store is None:
-        _store = _build_store()
-    return _store
+    return _stores.get()
 
 def get_retriever(k: int = 4):
     return get_store().as_retriever(search_type="similarity", search_kwargs={"k": k})
+
+def use_preloaded_store(store: NumpyVectorStore):
+    """Serve retrieval from an already-built in-process index (e.g. a knowledge bundle)."""
+    store.embedding = _emb
+    _stores.put(store)
+    _preloaded.add(store)
+
+def drop_preloaded_store():
+    """
+    Stop serving the current tenant's preloaded snapshot, so the next writes (an ingest) go to
+    the configured backend and are persisted there instead of into a copy that is never saved.
+    """
+    tenant = current_tenant()
+    for owner, store in _stores.items():
+        if owner == tenant and store in _preloaded:
+            # Opened directly: a reload through the cache would map the (still present) bundle again
+            _stores.put(_open_backend(tenant), tenant)
+
+def export_vectors() -> Tuple[List[str], List[str], Dict[str, List[Any]], np.ndarray]:
+    """(ids, texts, metadata columns, normalized float32 matrix) for everything in the store."""
+    store = get_store()
+    if isinstance(store, NumpyVectorStore):
+        return store.export()
+    data = store.get(include=["embeddings", "documents", "metadatas"])
+    embeddings = data.get("embeddings")
+    matrix = normalize_rows(embeddings) if embeddings is not None and len(embeddings) else np.zeros((0, 0), dtype=np.float32)
+    return list(data["ids"]), list(data["documents"]), columns_from_metadatas(data["metadatas"]), matrix
+
+def persist_store():
+    """Flush the in-process backend to disk; Chroma persists server-side."""
+    store = get_store()
+    if isinstance(store, NumpyVectorStore):
+        store.persist()
+
+
+def _chunk_key(doc: Document) -> str:
+    md = doc.metadata or {}
+    return f"{md.get('source_id')}::chunk{md.get('chunk_index')}"
+
+def lexical_is_confident(hits: list, reference_score: float) -> bool:
+    if not hits or reference_score <= 0:
+        return False
+    top = hits[0][1]
+    runner_up = hits[1][1] if len(hits) > 1 else 0.0
+    return top / reference_score >= LEXICAL_CONFIDENT_SCORE and (runner_up == 0.0 or top / runner_up >= LEXICAL_CONFIDENT_MARGIN)
+
+def hybrid_search(query: str, k: int = 4, dense_query: str | None = None,
+                  filter: Dict[str, Any] | None = None,
+                  embed: Callable[[], List[float]] | None = None) -> List[Document]:
+    """
+    BM25 + dense retrieval fused with reciprocal rank fusion.
+    If the lexical ranking is confident on its own, the embedding call is skipped.
+    `dense_query` lets callers send an expanded query to the vector side only;
+    `filter` is a Chroma-style metadata filter applied to both rankers;
+    `embed` supplies the query vector (so several searches can share one embedding call).
+    """
+    index = get_lexical_index()
+    hits = index.search(query, k=HYBRID_FETCH_K, filter=filter)
+    lexical_docs = {}
+    for chunk_id, score in hits:
+        text, meta = index.get(chunk_id)
+        lexical_docs[chunk_id] = Document(page_content=text, metadata={**meta, "score": score})
+
+    if lexical_is_confident(hits, index.reference_score(query)):
+        logger.debug("Lexical hit is confident; skipping embeddings for: %r", query)
+        # Scored as if both rankers agreed, so scores stay comparable with fused results
+        ranking = list(lexical_docs.keys())
+        return [Document(page_content=lexical_docs[key].page_content, metadata={**lexical_docs[key].metadata, "score": score})
+                for key, score in rrf_fuse([ranking, ranking])[:k]]
+
+    dense_docs = {}
+    try:
+        vector = embed() if embed else embed_query_within(dense_query or query)
+        for d in get_store().similarity_search_by_vector(vector, k=HYBRID_FETCH_K, filter=filter):
+            dense_docs.setdefault(_chunk_key(d), d)
+    except Exception as e:
+        if not lexical_docs:
+            raise
+        logger.warning("Dense retrieval failed, using lexical results only: %s", e)
+
+    fused = rrf_fuse([list(lexical_docs.keys()), list(dense_docs.keys())])
+    out = []
+    for key, score in fused[:k]:
+        doc = lexical_docs.get(key) or dense_docs[key]
+        out.append(Document(page_content=doc.page_content, metadata={**(doc.metadata or {}), "score": score}))
+    return out
+
+def _and(*clauses: Dict[str, Any] | None) -> Dict[str, Any] | None:
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def typed_search(query: str, types: List[str], dense_query: str | None = None,
+                 filter: Dict[str, Any] | None = None) -> List[Document]:
+    """
+    Run one type-filtered hybrid search per entry of the routing plan, concurrently,
+    with per-type budgets from TYPE_K_BUDGETS. Results are merged in plan order,
+    de-duplicated by chunk (several chunks of one source may stay, for context assembly
+    to merge) and capped at DOCS_MAX_CHUNKS.
+    The query is embedded at most once and shared by every sub-query.
+    """
+    lock = threading.Lock()
+    cached: List[Any] = []  # the vector, or the error every sub-query then re-raises
+
+    def embed() -> List[float]:
+        with lock:
+            if not cached:
+                try:
+                    cached.append(embed_query_within(dense_query or query))
+                except Exception as e:
+                    cached.append(e)
+        if isinstance(cached[0], Exception):
+            raise cached[0]
+        return cached[0]
+
+    budgets = [TYPE_K_BUDGETS[min(i, len(TYPE_K_BUDGETS) - 1)] if TYPE_K_BUDGETS else 2 for i in range(len(types))]
+    futures = [
+        # The copied context carries the tenant (and the request's spans) to the pool thread
+        _RETRIEVAL_POOL.submit(contextvars.copy_context().run, attach(hybrid_search), query, k, dense_query, _and(filter, {"type": t}), embed)
+        for t, k in zip(types, budgets)
+    ]
+    out, seen = [], set()
+    for fut in futures:
+        for doc in fut.result():
+            key = _chunk_key(doc)
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(doc)
+    return out[:DOCS_MAX_CHUNKS]
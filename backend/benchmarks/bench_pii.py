@@ -0,0 +1,191 @@
+# backend/benchmarks/bench_pii.py
+"""
+Single-pass PII engine vs the previous pass-per-pattern implementation.
+
+    cd backend
+    python -m benchmarks.bench_pii            # equivalence check + timing
+    BENCH_REPEAT=2000 python -m benchmarks.bench_pii
+
+The corpus below (EN / zh-Hans / zh-Hant) must redact identically under both
+engines, log included; the run exits non-zero on any difference. It also fails
+when the hand-kept trigger prefilter (PIIRedactor._may_contain_pii) would skip
+a text the old engine redacts or any single pattern match in the corpus, or when
+a batch record with an unsupported "lang" comes back unredacted. The old
+engine also rewrote unrelated identical substrings via str.replace;
+KNOWN_DIFFERENCES lists inputs where the new engine intentionally leaves those alone.
+"""
+import os
+import statistics
+import sys
+import time
+
+from app.services.pii import PIIRedactor, detect_language
+from app.services.redaction import redact_record
+
+REPEAT = int(os.getenv("BENCH_REPEAT", "500"))
+
+CORPUS = [
+    # English
+    "What are your opening hours on Saturday?",
+    "How much is an initial acupuncture consultation?",
+    "My name is John Smith and my email is john.smith@example.com",
+    "I'm Mary Jane Watson, call me at (604) 555-1234 please",
+    "i am Alex Chen. Reach me on +1 604.555.9876 or alex@mail.co",
+    "My SIN is 123-45-6789, can I direct bill?",
+    "I live at 1234 Kingsway Avenue, Vancouver",
+    "Born 1985-07-23, is cupping safe for me?",
+    "Appointment on 2024/3/5 at 10am, my number is 6045551234",
+    "Send it to a@b.cc and b@c.dd, thanks",
+    "I am going to the clinic tomorrow",
+    "Two ids 123-45-6789 and 987 65 4321 for my claim",
+    "Contact: jane_doe+tcm@clinic-mail.org / 778-555-0000",
+    "No PII here, just asking about herbal medicine for sleep.",
+    "My name is Ana Li, my address is 55 Main St and I was born 1990-1-2",
+    "Is 9am-5pm on 2025-12-24 ok? email me: x.y@z.io",
+    "",
+    # Simplified Chinese
+    "我叫王小明，电话13812345678，请帮我预约针灸",
+    "我的名字是李华，邮箱 lihua@example.cn",
+    "我是张伟，身份证号码110101199003071234",
+    "我住在北京市朝阳区建国路88号",
+    "广东省深圳市的诊所营业时间？",
+    "请问2024年3月15日开门吗？",
+    "初诊费用多少钱？",
+    "我是陈静，手机+86 13912345678，生日1988年12月1日",
+    # Traditional Chinese
+    "我叫陳大文，電話 91234567，想預約推拿",
+    "我的名字是林美玲，手機0912345678",
+    "我是黃志明，身份證A123456789",
+    "請問初診費用多少？",
+    "我住在台北市信義區松仁路100號",
+    "香港電話 +852 61234567，電郵 chan@hk.com",
+    "2023年1月5日有開門嗎？",
+]
+
+# Inputs where the old engine's global str.replace also hit unrelated identical text
+KNOWN_DIFFERENCES = [
+    "My name is John Smith. John Smith is also my father's name.",
+]
+
+class LegacyPIIRedactor(PIIRedactor):
+    """The previous implementation: one pass per pattern, str.replace for each match."""
+    def redact_pii(self, text, language='en'):
+        if not text:
+            return text, []
+        redacted_text = text
+        redaction_log = []
+        for pattern in self.compiled_patterns['email']:
+            matches = list(pattern.finditer(redacted_text))
+            if matches:
+                redacted_text = pattern.sub(self.replacements['email'], redacted_text)
+                redaction_log += ["email"] * len(matches)
+        patterns = self.compiled_patterns['id_numbers']['zh'] if language.startswith('zh') else self.compiled_patterns['id_numbers']['en']
+        for pattern in patterns:
+            for m in list(pattern.finditer(redacted_text)):
+                redacted_text = redacted_text.replace(m.group(0), self.replacements['id_numbers'])
+                redaction_log.append("id")
+        patterns = self.compiled_patterns['phone']['zh'] if language.startswith('zh') else self.compiled_patterns['phone']['en']
+        for pattern in patterns:
+            matches = list(pattern.finditer(redacted_text))
+            if matches:
+                redacted_text = pattern.sub(self.replacements['phone'], redacted_text)
+                redaction_log += ["phone"] * len(matches)
+        if language in self.compiled_patterns['names']:
+            for pattern in self.compiled_patterns['names'][language]:
+                for m in list(pattern.finditer(redacted_text)):
+                    redacted_text = redacted_text.replace(m.group(1), self.replacements['names'])
+                    redaction_log.append("name")
+        patterns = self.compiled_patterns['address']['zh'] if language.startswith('zh') else self.compiled_patterns['address']['en']
+        for pattern in patterns:
+            for m in list(pattern.finditer(redacted_text)):
+                redacted_text = redacted_text.replace(m.group(0), self.replacements['address'])
+                redaction_log.append("address")
+        for pattern in self.compiled_patterns['dates']:
+            for m in list(pattern.finditer(redacted_text)):
+                redacted_text = redacted_text.replace(m.group(0), self.replacements['dates'])
+                redaction_log.append("date")
+        return redacted_text, redaction_log
+
+def _check(new, old) -> int:
+    failures = 0
+    for text in CORPUS:
+        lang = detect_language(text)
+        got, want = new.redact_pii(text, lang), old.redact_pii(text, lang)
+        if got != want:
+            failures += 1
+            print(f"MISMATCH [{lang}] {text!r}\n  new: {got}\n  old: {want}")
+    for text in KNOWN_DIFFERENCES:
+        lang = detect_language(text)
+        print(f"known difference [{lang}] {text!r}\n  new: {new.redact_pii(text, lang)[0]!r}\n  old: {old.redact_pii(text, lang)[0]!r}")
+    return failures
+
+def _check_prefilter(new, old) -> int:
+    """Every text the old engine redacts, and every match of any pattern in any language, must pass the prefilter."""
+    failures = 0
+    for text in CORPUS + KNOWN_DIFFERENCES:
+        lang = detect_language(text)
+        if old.redact_pii(text, lang)[1] and not new._may_contain_pii(text):
+            failures += 1
+            print(f"PREFILTER SKIPS [{lang}] {text!r}")
+        for category, _ in new.CATEGORY_ORDER:
+            patterns = {p for pl in ("en", "zh-Hans", "zh-Hant") for p in new._compiled_for(category, pl)}
+            for pattern in patterns:
+                for m in pattern.finditer(text):
+                    if not new._may_contain_pii(m.group(0)):
+                        failures += 1
+                        print(f"PREFILTER MISSES {category} match {m.group(0)!r} in {text!r}")
+    return failures
+
+# Client-supplied "lang" values /redact/batch must not trust: each record still has to be redacted
+BAD_LANGS = [5, None, "", "fr", "EN", ["en"], {"lang": "en"}]
+
+def _check_batch_langs() -> int:
+    failures = 0
+    text = "call me at 416-555-1234 email a@b.com"
+    for lang in BAD_LANGS:
+        out = redact_record({"text": text, "lang": lang})
+        if out["text"] == text or not out.get("pii_counts") or out["lang"] != detect_language(text):
+            failures += 1
+            print(f"UNREDACTED with lang={lang!r}: {out}")
+    return failures
+
+def _time(redactor, items) -> float:
+    """Median microseconds per redact_pii call; long inputs get fewer repetitions."""
+    loops = max(1, REPEAT * 50 // max(sum(len(t) for t, _ in items), 1))
+    samples = []
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            for text, lang in items:
+                redactor.redact_pii(text, lang)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) / (loops * len(items)) * 1e6
+
+def main():
+    new, old = PIIRedactor(), LegacyPIIRedactor()
+    failures = _check(new, old)
+    print(f"equivalence: {len(CORPUS) - failures}/{len(CORPUS)} identical")
+    prefilter_failures = _check_prefilter(new, old)
+    print(f"prefilter: {'ok' if not prefilter_failures else f'{prefilter_failures} missed'}")
+    failures += prefilter_failures
+    lang_failures = _check_batch_langs()
+    print(f"batch lang values: {'ok' if not lang_failures else f'{lang_failures} unredacted'}")
+    failures += lang_failures
+
+    items = [(t, detect_language(t)) for t in CORPUS if t]
+    clean = [(t, lang) for t, lang in items if not old.redact_pii(t, lang)[1]]
+    suites = {
+        "corpus (per message)": items,
+        "messages without PII": clean,
+    }
+    for repeat in (20, 100, 400):
+        long_text = " ".join(t for t in CORPUS if t) * repeat
+        suites[f"transcript ({len(long_text)} chars)"] = [(long_text, "en")]
+    print(f"{'suite':<36}{'old us':>12}{'new us':>12}{'speedup':>10}")
+    for name, suite in suites.items():
+        o, n = _time(old, suite), _time(new, suite)
+        print(f"{name:<36}{o:>12.1f}{n:>12.1f}{o / n:>9.1f}x")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
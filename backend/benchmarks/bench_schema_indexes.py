@@ -0,0 +1,138 @@
+# backend/benchmarks/bench_schema_indexes.py
+"""
+Query latency for the SQL_PROMPT query shapes on a synthetic large clinic, without
+secondary indexes and after the migration runner has added them.
+
+    cd backend
+    python -m benchmarks.bench_schema_indexes                        # temp SQLite file
+    BENCH_DB_URL=postgresql+psycopg2://... python -m benchmarks.bench_schema_indexes
+    BENCH_SERVICES=5000 BENCH_REPEAT=20 python -m benchmarks.bench_schema_indexes
+
+The Postgres run drops and recreates the schema tables in the target database.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, text as sql_text
+
+from app.models.schema import metadata, clinic_info, clinic_hours, services, pricing, team_members, team_services, service_specialties
+from app.models.migrations import run_migrations, schema_migrations, _TRGM_INDEXES
+
+N_SERVICES = int(os.getenv("BENCH_SERVICES", "2000"))
+N_PRACTITIONERS = int(os.getenv("BENCH_PRACTITIONERS", "500"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "10"))
+
+WORDS = ["acupuncture", "cupping", "herbal", "tuina", "moxibustion", "gua sha", "massage", "consultation", "follow-up", "fertility"]
+
+def _queries(dialect: str):
+    like = "ILIKE" if dialect == "postgresql" else "LIKE"
+    return {
+        "hours": (
+            "SELECT h.day, h.open_time, h.close_time FROM clinic_info ci "
+            'JOIN clinic_hours h ON h.clinic_id = ci.id ORDER BY ci."updatedAt" DESC, h.day ASC LIMIT 20'
+        ),
+        "pricing_by_service": (
+            "SELECT p.item, p.type, p.category, p.price, p.max FROM pricing p "
+            f"WHERE p.category {like} '%' || 'cupping 17' || '%' "
+            f"OR p.service_id IN (SELECT id FROM services WHERE name {like} '%' || 'cupping 17' || '%') "
+            "ORDER BY p.price IS NULL, p.price ASC LIMIT 20"
+        ),
+        "practitioners_for_service": (
+            'SELECT tm."fullName", tm.title, s.name AS service FROM services s '
+            "JOIN team_services ts ON ts.service_id = s.id "
+            "JOIN team_members tm ON tm.id = ts.practitioner_id "
+            "WHERE s.name = 'herbal 42' LIMIT 20"
+        ),
+        "service_pricing_join": (
+            "SELECT s.name, p.item, p.price FROM services s JOIN pricing p ON p.service_id = s.id "
+            "WHERE s.name = 'tuina 7' LIMIT 20"
+        ),
+        "specialties_for_service": (
+            "SELECT ss.specialty FROM service_specialties ss JOIN services s ON s.id = ss.service_id "
+            "WHERE s.name = 'massage 3' LIMIT 20"
+        ),
+    }
+
+def _populate(engine):
+    rnd = random.Random(7)
+    clinic_id = uuid.uuid4()
+    svc_ids = [uuid.uuid4() for _ in range(N_SERVICES)]
+    prac_ids = [uuid.uuid4() for _ in range(N_PRACTITIONERS)]
+    with engine.begin() as conn:
+        conn.execute(clinic_info.insert(), [{"id": clinic_id, "name": "Bench Clinic"}])
+        conn.execute(clinic_hours.insert(), [
+            {"clinic_id": clinic_id, "day": d, "open_time": "09:00:00", "close_time": "18:00:00"}
+            for d in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        ])
+        conn.execute(services.insert(), [
+            {"id": sid, "name": f"{WORDS[i % len(WORDS)]} {i // len(WORDS)}", "subtitle": "synthetic"}
+            for i, sid in enumerate(svc_ids)
+        ])
+        conn.execute(team_members.insert(), [
+            {"id": pid, "fullName": f"Practitioner {i}", "title": "R.TCMP"} for i, pid in enumerate(prac_ids)
+        ])
+        conn.execute(team_services.insert(), [
+            {"practitioner_id": rnd.choice(prac_ids), "service_id": sid} for sid in svc_ids for _ in range(5)
+        ])
+        conn.execute(service_specialties.insert(), [
+            {"service_id": sid, "specialty": f"specialty {rnd.randrange(50)}"} for sid in svc_ids for _ in range(3)
+        ])
+        conn.execute(pricing.insert(), [
+            {"id": uuid.uuid4(), "category": f"{WORDS[i % len(WORDS)]} {i // len(WORDS)}", "type": "treatment",
+             "item": f"{m} min", "price": rnd.randrange(40, 200), "service_id": sid}
+            for i, sid in enumerate(svc_ids) for m in (30, 45, 60, 90)
+        ])
+
+def _drop_secondary_indexes(engine):
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn, checkfirst=True)
+        if engine.dialect.name == "postgresql":
+            for name, _, _ in _TRGM_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        schema_migrations.drop(conn, checkfirst=True)
+
+def _time(engine, queries):
+    out = {}
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+        for name, sql in queries.items():
+            conn.execute(sql_text(sql)).fetchall()  # warm
+            samples = []
+            for _ in range(REPEAT):
+                t0 = time.perf_counter()
+                conn.execute(sql_text(sql)).fetchall()
+                samples.append((time.perf_counter() - t0) * 1000)
+            out[name] = statistics.median(samples)
+    return out
+
+def main():
+    url = os.getenv("BENCH_DB_URL") or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_idx_'), 'bench.db')}"
+    engine = create_engine(url, future=True)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    _drop_secondary_indexes(engine)
+    t0 = time.perf_counter()
+    _populate(engine)
+    print(f"{engine.dialect.name}: {N_SERVICES} services, {N_SERVICES * 4} prices, {N_SERVICES * 5} team_services rows "
+          f"loaded in {time.perf_counter() - t0:.1f}s")
+
+    queries = _queries(engine.dialect.name)
+    before = _time(engine, queries)
+    t0 = time.perf_counter()
+    applied = run_migrations(engine)
+    print(f"migrations {applied} applied in {(time.perf_counter() - t0) * 1000:.0f} ms")
+    after = _time(engine, queries)
+
+    print(f"{'query':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in queries:
+        b, a = before[name], after[name]
+        print(f"{name:<28}{b:>12.2f}{a:>12.2f}{b / a if a else float('inf'):>9.1f}x")
+
+if __name__ == "__main__":
+    main()
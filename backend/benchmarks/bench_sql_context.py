@@ -0,0 +1,54 @@
+# backend/benchmarks/bench_sql_context.py
+"""
+Prompt tokens spent on SQL results: the old stringified tool output vs compact rows.
+
+    cd backend
+    SQL_DB_URL=sqlite:////app/data/clinic.db python -m benchmarks.bench_sql_context
+
+Run against an ingested database. The legacy column is what QuerySQLDatabaseTool
+returned: `SQLDatabase.run` on the unguarded query, i.e. the Python repr of every
+row tuple with no row cap. The compact column goes through the guard (LIMIT
+SQL_MAX_ROWS) and compact_rows, as the pipeline does now; `rows` counts what the
+legacy tool would have returned and what the prompt gets now.
+"""
+from langchain_community.utilities import SQLDatabase
+
+from app.utils.db import compact_rows, execute_select, get_engine
+from app.utils.tokens import count_tokens
+
+QUERY_CLASSES = {
+    "contact": 'SELECT * FROM clinic_info ORDER BY "updatedAt" DESC',
+    "hours": (
+        "SELECT h.* FROM clinic_info ci JOIN clinic_hours h ON h.clinic_id = ci.id "
+        'ORDER BY ci."updatedAt" DESC, h.day ASC'
+    ),
+    "pricing": "SELECT * FROM pricing p WHERE LOWER(p.category) LIKE '%acupuncture%' ORDER BY p.price",
+    "pricing_all": "SELECT * FROM pricing ORDER BY price",
+    "practitioners": (
+        'SELECT tm.*, s.name AS service FROM services s '
+        "JOIN team_services ts ON ts.service_id = s.id "
+        "JOIN team_members tm ON tm.id = ts.practitioner_id"
+    ),
+    "faqs": "SELECT * FROM faqs",
+}
+
+def main():
+    legacy_db = SQLDatabase(get_engine(), lazy_table_reflection=True)
+    total_old = total_new = 0
+    print(f"{'class':<14}{'rows':>10}{'legacy':>10}{'compact':>10}{'saved':>8}")
+    for name, sql in QUERY_CLASSES.items():
+        legacy_rows = legacy_db.run(sql, fetch="all", include_columns=False)
+        with get_engine().connect() as conn:
+            n_legacy = len(conn.exec_driver_sql(sql).fetchall())
+        res = execute_select(sql)
+        old = count_tokens(legacy_rows)
+        new = count_tokens(compact_rows(res.columns, res.rows, res.truncated))
+        total_old += old
+        total_new += new
+        saved = f"{(1 - new / old) * 100:.0f}%" if old else "-"
+        print(f"{name:<14}{f'{n_legacy}/{len(res.rows)}':>10}{old:>10}{new:>10}{saved:>8}")
+    if total_old:
+        print(f"{'total':<14}{'':>10}{total_old:>10}{total_new:>10}{(1 - total_new / total_old) * 100:>7.0f}%")
+
+if __name__ == "__main__":
+    main()
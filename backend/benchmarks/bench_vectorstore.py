@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_vectorstore.py
+"""
+Query latency of the in-process NumPy index vs the Chroma HTTP server.
+
+    cd backend
+    python -m benchmarks.bench_vectorstore --docs 500 --queries 200
+    CHROMA_HOST=localhost python -m benchmarks.bench_vectorstore   # also time Chroma
+
+Both stores get the same random unit vectors; queries go through
+`similarity_search_by_vector` so no embedding calls are made.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.utils.numpy_store import NumpyVectorStore
+
+TYPES = ["faq", "service", "practitioner", "clinic", "pricing"]
+
+def _corpus(n: int, dim: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((n, dim)).astype(np.float32)
+    ids = [f"doc-{i}::chunk1" for i in range(n)]
+    texts = [f"chunk text {i}" for i in range(n)]
+    metas = [{"type": TYPES[i % len(TYPES)], "source_id": f"doc-{i}", "chunk_index": 1} for i in range(n)]
+    queries = rng.standard_normal((200, dim)).astype(np.float32)
+    return ids, texts, metas, vecs, queries
+
+def _time(fn, queries, k, flt):
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        fn(q.tolist(), k=k, filter=flt)
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=500)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=4)
+    args = ap.parse_args()
+
+    ids, texts, metas, vecs, queries = _corpus(args.docs, args.dim)
+    queries = queries[: args.queries]
+    emb = DeterministicFakeEmbedding(size=args.dim)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench")
+        store = NumpyVectorStore(embedding=emb)
+        store.add_embeddings(texts, vecs, metas, ids)
+        store.persist(path)
+        mmapped = NumpyVectorStore(embedding=emb, path=path)
+        for name, s in [("numpy (in-memory)", store), ("numpy (mmap)", mmapped)]:
+            print(name, "unfiltered", _time(s.similarity_search_by_vector, queries, args.k, None))
+            print(name, "type=faq  ", _time(s.similarity_search_by_vector, queries, args.k, {"type": "faq"}))
+
+    if os.getenv("CHROMA_HOST"):
+        import chromadb
+        from langchain_chroma import Chroma
+        client = chromadb.HttpClient(host=os.getenv("CHROMA_HOST"), port=int(os.getenv("CHROMA_PORT", "8000")))
+        coll = client.get_or_create_collection("bench_vectorstore", metadata={"hnsw:space": "cosine"})
+        for i in range(0, len(ids), 100):
+            coll.upsert(ids=ids[i:i + 100], embeddings=vecs[i:i + 100].tolist(),
+                        documents=texts[i:i + 100], metadatas=metas[i:i + 100])
+        chroma = Chroma(collection_name="bench_vectorstore", embedding_function=emb, client=client)
+        print("chroma (http)", "unfiltered", _time(chroma.similarity_search_by_vector, queries, args.k, None))
+        print("chroma (http)", "type=faq  ", _time(chroma.similarity_search_by_vector, queries, args.k, {"type": "faq"}))
+        client.delete_collection("bench_vectorstore")
+    else:
+        print("CHROMA_HOST not set; skipping Chroma comparison")
+
+if __name__ == "__main__":
+    main()
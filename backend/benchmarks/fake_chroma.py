@@ -0,0 +1,107 @@
+# backend/benchmarks/fake_chroma.py
+"""
+In-memory stand-in for a Chroma HTTP client, for load runs without a Chroma server.
+
+Implements the client and collection calls `langchain_chroma.Chroma` makes
+(get_or_create_collection, upsert/add, query, get, delete, count). Vectors and
+`where` filters reuse the in-process NumpyVectorStore, so behaviour matches the
+numpy backend; distances are cosine distances like a cosine-space collection.
+
+    from app.utils import vectorstore
+    vectorstore.chroma_client_factory = FakeChromaClient
+"""
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.utils.numpy_store import NumpyVectorStore
+
+class FakeCollection:
+    def __init__(self, name: str, metadata: Optional[dict] = None):
+        self.name = name
+        self.metadata = metadata or {}
+        self.configuration: Dict[str, Any] = {}
+        self._store = NumpyVectorStore(embedding=None)
+
+    def count(self) -> int:
+        return len(self._store)
+
+    def upsert(self, ids: List[str], embeddings=None, documents=None, metadatas=None, **kwargs):
+        if embeddings is None:
+            raise ValueError("FakeCollection needs embeddings (no embedding function is configured)")
+        documents = documents or ["" for _ in ids]
+        self._store.add_embeddings(list(documents), embeddings, [dict(md or {}) for md in (metadatas or [{} for _ in ids])], list(ids))
+
+    add = upsert
+
+    def _rows(self, ids: Optional[List[str]], where: Optional[dict]) -> List[int]:
+        store = self._store
+        rows = np.arange(len(store))
+        if where and len(store):
+            rows = rows[store._mask(where)]
+        if ids is not None:
+            wanted = set(ids)
+            rows = [i for i in rows if store._ids[i] in wanted]
+        return [int(i) for i in rows]
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        include = include if include is not None else ["documents", "metadatas"]
+        store = self._store
+        with store._lock:
+            rows = self._rows(ids, where)[offset or 0:]
+            if limit is not None:
+                rows = rows[:limit]
+            out: Dict[str, Any] = {"ids": [store._ids[i] for i in rows], "included": include}
+            out["documents"] = [store._texts[i] for i in rows] if "documents" in include else None
+            out["metadatas"] = [self._metadata(i) for i in rows] if "metadatas" in include else None
+            out["embeddings"] = (store._matrix[rows] if rows else np.zeros((0, 0), dtype=np.float32)) if "embeddings" in include else None
+        return out
+
+    def _metadata(self, i: int) -> dict:
+        return {key: col[i] for key, col in self._store._columns.items() if col[i] is not None}
+
+    def query(self, query_embeddings=None, n_results: int = 10, where: Optional[dict] = None,
+              query_texts=None, where_document=None, include: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        if query_embeddings is None:
+            raise ValueError("FakeCollection.query needs query_embeddings")
+        out: Dict[str, List[list]] = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        for vector in query_embeddings:
+            hits = self._store.similarity_search_with_score_by_vector(list(vector), k=n_results, filter=where)
+            out["ids"].append([d.id for d, _ in hits])
+            out["documents"].append([d.page_content for d, _ in hits])
+            out["metadatas"].append([d.metadata for d, _ in hits])
+            out["distances"].append([1.0 - score for _, score in hits])
+            out["embeddings"].append([])
+        return out
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[dict] = None, **kwargs):
+        self._store.delete(ids=ids, where=where)
+
+    def update(self, ids: List[str], embeddings=None, documents=None, metadatas=None, **kwargs):
+        self.upsert(ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+class FakeChromaClient:
+    """Collections live for the life of the process; no persistence."""
+
+    _collections: Dict[str, FakeCollection] = {}
+    _lock = threading.Lock()
+
+    def get_or_create_collection(self, name: str, metadata: Optional[dict] = None, **kwargs) -> FakeCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(name, metadata)
+            return self._collections[name]
+
+    create_collection = get_or_create_collection
+
+    def get_collection(self, name: str, **kwargs) -> FakeCollection:
+        return self._collections[name]
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def heartbeat(self) -> int:
+        return 1
@@ -0,0 +1,288 @@
+# backend/benchmarks/fake_openai.py
+"""
+Local OpenAI-compatible server for offline load runs: /v1/chat/completions and /v1/embeddings.
+
+    cd backend
+    python -m benchmarks.fake_openai --port 8089 --latency "generation=lognormal:1.2:0.4,embeddings=const:0.03"
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_EMBED_CHECK_CTX=false uvicorn app.api:app
+
+Outputs are deterministic for a given prompt. The intent and router prompts get valid JSON,
+the SQL prompt a SELECT over the clinic schema, and generation a short grounded-looking reply.
+Embeddings are hashed bags of words and CJK bigrams, so related texts land close together.
+Latency per kind (intent, router, sql, generation, other, embeddings) is drawn from
+`const:S`, `uniform:LO:HI` or `lognormal:MEDIAN:SIGMA`, in seconds.
+"""
+import argparse
+import base64
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+KINDS = ("intent", "router", "sql", "generation", "other", "embeddings")
+
+DEFAULT_LATENCY = {
+    "intent": "lognormal:0.35:0.3",
+    "router": "lognormal:0.35:0.3",
+    "sql": "lognormal:0.6:0.3",
+    "generation": "lognormal:1.5:0.35",
+    "other": "const:0.2",
+    "embeddings": "lognormal:0.08:0.3",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CJK_RE = re.compile(r"[\u3400-\u9fff]+")
+
+def parse_latency(spec: str) -> Dict[str, str]:
+    """`generation=lognormal:1.2:0.4,router=const:0.2` -> {kind: distribution}, over the defaults."""
+    out = dict(DEFAULT_LATENCY)
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        kind, _, dist = part.partition("=")
+        if kind not in KINDS:
+            raise ValueError(f"Unknown latency kind {kind!r}; expected one of {', '.join(KINDS)}")
+        out[kind] = dist
+    return out
+
+class LatencyModel:
+    def __init__(self, spec: Dict[str, str], seed: int = 0):
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, kind: str) -> float:
+        name, *params = self.spec.get(kind, "const:0").split(":")
+        p = [float(x) for x in params]
+        with self._lock:
+            if name == "const":
+                return p[0]
+            if name == "uniform":
+                return self._rng.uniform(p[0], p[1])
+            if name == "lognormal":
+                return p[0] * float(np.exp(self._rng.gauss(0.0, p[1])))
+        raise ValueError(f"Unknown latency distribution {name!r}")
+
+# ----- deterministic outputs -----
+def _after(text: str, marker: str, end: Optional[str] = None) -> str:
+    i = text.rfind(marker)
+    if i < 0:
+        return text
+    tail = text[i + len(marker):]
+    if end and end in tail:
+        tail = tail[:tail.index(end)]
+    return tail.strip()
+
+def _has(text: str, *words: str) -> bool:
+    low = text.lower()
+    return any(w in low for w in words)
+
+_PRICE = ("price", "cost", "fee", "how much", "費用", "价钱", "價錢", "收費", "多少錢", "多少钱")
+_HOURS = ("hour", "open", "close", "營業", "营业", "幾點", "几点")
+_CONTACT = ("address", "phone", "email", "where", "地址", "電話", "电话")
+_PEOPLE = ("who", "practitioner", "doctor", "book", "醫師", "医师", "預約", "预约")
+_INTERNAL = ("revenue", "staff schedule", "kpi", "inventory", "how many new patients", "營收", "营收")
+
+def classify(messages: List[Dict[str, Any]]) -> Tuple[str, str]:
+    """(kind, the user's question as it appears in the prompt)."""
+    text = "\n".join(str(m.get("content") or "") for m in messages)
+    if "Classify the user request" in text:
+        return "intent", _after(text, "User (PII-redacted):")
+    if "You are a router" in text:
+        return "router", _after(text, "Question:", "Respond as JSON")
+    if "PostgreSQL query writer" in text:
+        return "sql", _after(text, "User Question:", "Return only")
+    if "clinic concierge" in text:
+        return "generation", _after(text, "User (PII-redacted):", "Answer:")
+    return "other", text[-200:]
+
+def reply_for(kind: str, question: str, messages: List[Dict[str, Any]]) -> str:
+    if kind == "intent":
+        internal = _has(question, *_INTERNAL)
+        return json.dumps({"intent": "internal_ops" if internal else "patient_care", "confidence": 0.9})
+    if kind == "router":
+        if _has(question, *_PRICE, *_HOURS, *_CONTACT):
+            return json.dumps({"route": "sql", "confidence": 0.85, "types": ["pricing" if _has(question, *_PRICE) else "clinic"]})
+        if _has(question, *_PEOPLE):
+            return json.dumps({"route": "both", "confidence": 0.7, "types": ["practitioner", "service"]})
+        return json.dumps({"route": "docs", "confidence": 0.8, "types": ["faq", "service"]})
+    if kind == "sql":
+        if _has(question, *_PRICE):
+            return "SELECT p.item, p.type, p.category, p.price, p.max FROM pricing p ORDER BY p.price LIMIT 5"
+        if _has(question, *_HOURS):
+            return ("SELECT h.day, h.open_time, h.close_time FROM clinic_info ci "
+                    "JOIN clinic_hours h ON h.clinic_id = ci.id ORDER BY h.day LIMIT 7")
+        if _has(question, *_CONTACT):
+            return 'SELECT street, city, province, "postalCode", phone, email FROM clinic_info LIMIT 1'
+        return ('SELECT tm."fullName", tm.title, tm."janeAppId", s.name AS service FROM services s '
+                "JOIN team_services ts ON ts.service_id = s.id JOIN team_members tm ON tm.id = ts.practitioner_id LIMIT 5")
+    if kind == "generation":
+        zh = any("zh-Hant" in str(m.get("content") or "") for m in messages[:1])
+        tag = zlib.crc32(question.encode("utf-8")) % 1000
+        if zh:
+            return f"感謝您的提問（#{tag}）。根據診所資料，我們提供相關服務，詳情請參考 [線上預約](https://example.janeapp.com)。"
+        return (f"Thanks for asking (#{tag}). Based on the clinic information, here is what I found:\n"
+                "- We offer this service with our licensed practitioners.\n"
+                "- You can [Book online](https://example.janeapp.com).")
+    return "OK"
+
+def embed(text: str, dim: int) -> np.ndarray:
+    low = text.lower()
+    tokens = _WORD_RE.findall(low)
+    for run in _CJK_RE.findall(text):
+        tokens.extend(run[i:i + 2] for i in range(max(1, len(run) - 1)))
+    vec = np.zeros(dim, dtype=np.float32)
+    for tok in tokens:
+        h = zlib.crc32(tok.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    if not vec.any():
+        vec[zlib.crc32(text.encode("utf-8")) % dim] = 1.0
+    return vec / np.linalg.norm(vec)
+
+# ----- server -----
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: Optional[Dict[str, str]] = None, error_rate: float = 0.0,
+                 dim: int = 256, seed: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = LatencyModel(latency or dict(DEFAULT_LATENCY), seed)
+        self.error_rate = error_rate
+        self.dim = dim
+        self._rng = random.Random(seed + 1)
+        self._lock = threading.Lock()
+        self.calls = {k: 0 for k in KINDS}
+        self.errors = {k: 0 for k in KINDS}
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        threading.Thread(target=self.serve_forever, name="fake-openai", daemon=True).start()
+        return self
+
+    def count(self, kind: str) -> bool:
+        """Record a call; True if this one should fail with an injected error."""
+        with self._lock:
+            self.calls[kind] += 1
+            fail = self.error_rate > 0 and self._rng.random() < self.error_rate
+            if fail:
+                self.errors[kind] += 1
+        return fail
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": dict(self.calls), "errors": dict(self.errors)}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeOpenAIServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            return self._send(200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+        if self.path.rstrip("/").endswith("/stats"):
+            return self._send(200, self.server.stats())
+        self._send(404, {"error": {"message": f"no route {self.path}"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            return self._chat(body)
+        if self.path.endswith("/embeddings"):
+            return self._embeddings(body)
+        self._send(404, {"error": {"message": f"no route {self.path}"}})
+
+    def _fail_or_wait(self, kind: str) -> bool:
+        time.sleep(self.server.latency.sample(kind))
+        if self.server.count(kind):
+            self._send(503, {"error": {"message": "injected failure", "type": "server_error"}})
+            return True
+        return False
+
+    def _chat(self, body: Dict[str, Any]):
+        messages = body.get("messages") or []
+        kind, question = classify(messages)
+        if self._fail_or_wait(kind):
+            return
+        content = reply_for(kind, question, messages)
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4 + 1
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        finish = "stop"
+        tools = body.get("tools") or []
+        if tools:
+            # function_calling structured output: the JSON goes into the tool call instead
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{zlib.crc32(content.encode()):08x}", "type": "function",
+                "function": {"name": tools[0]["function"]["name"], "arguments": content},
+            }]}
+            finish = "tool_calls"
+        completion_tokens = len(content) // 4 + 1
+        self._send(200, {
+            "id": f"chatcmpl-fake-{zlib.crc32(question.encode()):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish, "logprobs": None}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        })
+
+    def _embeddings(self, body: Dict[str, Any]):
+        if self._fail_or_wait("embeddings"):
+            return
+        inputs = body.get("input")
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for i, item in enumerate(inputs or []):
+            vec = embed(item if isinstance(item, str) else " ".join(map(str, item)), self.server.dim)
+            if body.get("encoding_format") == "base64":
+                value: Any = base64.b64encode(vec.astype("<f4").tobytes()).decode("ascii")
+            else:
+                value = vec.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": value})
+        tokens = sum(len(str(x)) for x in inputs or []) // 4 + 1
+        self._send(200, {
+            "object": "list", "data": data, "model": body.get("model", "fake"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--latency", default="", help="kind=dist,... e.g. generation=lognormal:1.2:0.4")
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    server = FakeOpenAIServer(args.port, parse_latency(args.latency), args.error_rate, args.dim, args.seed)
+    print(f"Fake OpenAI server on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# backend/benchmarks/load_chat.py
+"""
+Offline load test of /chat: the real FastAPI app under uvicorn, against a local
+OpenAI-compatible server (benchmarks/fake_openai.py) and an in-memory Chroma
+(benchmarks/fake_chroma.py). No network access or API key is needed.
+
+    cd backend
+    python -m benchmarks.load_chat                                   # 24 sessions x 4 turns, 8 at a time
+    python -m benchmarks.load_chat --sessions 100 --concurrency 32 --turns 3 \
+        --latency "generation=lognormal:2.0:0.5" --error-rate 0.01 --json /tmp/load.json
+    python -m benchmarks.load_chat --corpus questions.txt --max-error-rate 0.02   # CI gate
+
+Each session sends its turns one after another (as a user would); `--concurrency`
+sessions run at once. Questions come from `--corpus` (one per line) or the built-in
+bilingual list. The report has throughput, end-to-end p50/p95/p99, the same
+percentiles per pipeline stage (from the Server-Timing header) and errors by status.
+Set `--vector-backend numpy` to use the in-process index instead of the Chroma stand-in.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .fake_openai import FakeOpenAIServer, parse_latency
+
+REPO_DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "..", "data", "json"))
+
+CORPUS = [
+    "What are your opening hours on Saturday?",
+    "How much is an initial acupuncture consultation?",
+    "Who can I book with for acupuncture?",
+    "What should I bring to my first appointment?",
+    "Do you offer direct billing to insurance?",
+    "Tell me about cupping therapy",
+    "Can acupuncture help with back pain?",
+    "What is your phone number?",
+    "Is herbal medicine safe during pregnancy?",
+    "Which practitioners speak Mandarin?",
+    "How many new patients did we get last month?",
+    "What is the cancellation policy?",
+    "請問針灸初診多少錢？",
+    "週六幾點開門？",
+    "我想預約推拿，有哪位醫師？",
+    "中藥調理需要多久？",
+]
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.50), 1),
+        "p95_ms": round(percentile(samples, 0.95), 1),
+        "p99_ms": round(percentile(samples, 0.99), 1),
+        "max_ms": round(max(samples), 1) if samples else 0.0,
+    }
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, dur = part.partition(";dur=")
+        if dur:
+            out[name] = float(dur)
+    return out
+
+def _configure_env(args, tmp: str, base_url: str):
+    # Everything the app reads at import time: keep state in a scratch dir, talk to the stand-ins
+    os.environ.update({
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_EMBED_CHECK_CTX": "false",
+        "SQL_DB_URL": f"sqlite:///{os.path.join(tmp, 'clinic.db')}",
+        "DATA_DIR": args.data_dir,
+        "VECTOR_BACKEND": args.vector_backend,
+        "NUMPY_STORE_PATH": os.path.join(tmp, "vectors", "clinic_data"),
+        "LEXICAL_INDEX_PATH": os.path.join(tmp, "lexical_index.json"),
+        "FAQ_INDEX_PATH": os.path.join(tmp, "faq_index"),
+        "KNOWLEDGE_BUNDLE_PATH": "",
+        "LOG_LEVEL": args.log_level,
+        "UVICORN_ACCESS_LOG_LEVEL": "WARNING",
+    })
+
+class _Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.stages: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, int] = {}
+
+    def add(self, status: str, ms: Optional[float], timing: Dict[str, float]):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == "200" and ms is not None:
+                self.latencies.append(ms)
+                for name, dur in timing.items():
+                    if name != "total":
+                        self.stages.setdefault(name, []).append(dur)
+
+def _run_session(client, corpus: List[str], session: int, turns: int, think: float, results: _Results):
+    for turn in range(turns):
+        question = corpus[(session * 7 + turn * 3) % len(corpus)]
+        t0 = time.perf_counter()
+        try:
+            resp = client.post("/chat", json={"message": question, "session_id": f"load-{session}"})
+            ms = (time.perf_counter() - t0) * 1000
+            results.add(str(resp.status_code), ms, parse_server_timing(resp.headers.get("server-timing", "")))
+        except Exception as e:
+            results.add(type(e).__name__, None, {})
+        if think:
+            time.sleep(think)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=24)
+    ap.add_argument("--turns", type=int, default=4)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--think", type=float, default=0.0, help="seconds between a session's turns")
+    ap.add_argument("--corpus", help="file with one question per line")
+    ap.add_argument("--latency", default="", help="fake LLM latency, e.g. generation=lognormal:1.2:0.4")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of fake OpenAI calls answered 503")
+    ap.add_argument("--vector-backend", choices=["chroma", "numpy"], default="chroma")
+    ap.add_argument("--data-dir", default=REPO_DATA_DIR)
+    ap.add_argument("--port", type=int, default=0, help="app port (0 = any free port)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--log-level", default="WARNING")
+    ap.add_argument("--json", help="also write the report here")
+    ap.add_argument("--max-error-rate", type=float, help="exit 1 if the /chat error rate is above this")
+    args = ap.parse_args()
+
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus, "r", encoding="utf-8") as f:
+            corpus = [line.strip() for line in f if line.strip()]
+
+    fake = FakeOpenAIServer(0, parse_latency(args.latency), args.error_rate, seed=args.seed).start()
+    tmp = tempfile.mkdtemp(prefix="clinicbot-load-")
+    _configure_env(args, tmp, fake.base_url)
+
+    # Structured-output parsing warns on every intent call; it says nothing about load
+    warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
+    import httpx
+    import uvicorn
+    from app.api import app
+    from app.utils import vectorstore
+    from .fake_chroma import FakeChromaClient
+    vectorstore.chroma_client_factory = FakeChromaClient
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_config=None, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    limits = httpx.Limits(max_connections=args.concurrency + 4, max_keepalive_connections=args.concurrency + 4)
+    with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=120.0, limits=limits) as client:
+        # Setup runs without injected errors so every run starts from the same index
+        error_rate, fake.error_rate = fake.error_rate, 0.0
+        client.post("/set-api-key", json={"api_key": "sk-offline-load-test-00000000"}).raise_for_status()
+        t0 = time.perf_counter()
+        ingested = client.post("/ingest", json={})  # DATA_DIR points at --data-dir
+        ingested.raise_for_status()
+        ingest_s = time.perf_counter() - t0
+        fake.error_rate = error_rate
+        llm_before = fake.stats()
+
+        results = _Results()
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for session in range(args.sessions):
+                pool.submit(_run_session, client, corpus, session, args.turns, args.think, results)
+        wall = time.perf_counter() - t0
+
+    server.should_exit = True
+    llm_after = fake.stats()
+    fake.shutdown()
+
+    total = sum(results.statuses.values())
+    failed = total - results.statuses.get("200", 0)
+    report = {
+        "config": {
+            "sessions": args.sessions, "turns": args.turns, "concurrency": args.concurrency,
+            "vector_backend": args.vector_backend, "latency": fake.latency.spec, "error_rate": args.error_rate,
+        },
+        "ingest": {"files": ingested.json().get("processed_files"), "seconds": round(ingest_s, 2)},
+        "requests": total,
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(total / wall, 2) if wall else 0.0,
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "statuses": results.statuses,
+        "latency": summarize(results.latencies),
+        "stages": {name: summarize(v) for name, v in sorted(results.stages.items())},
+        "llm_calls": {k: llm_after["calls"][k] - llm_before["calls"][k] for k in llm_after["calls"]},
+        "llm_errors": {k: llm_after["errors"][k] - llm_before["errors"][k] for k in llm_after["errors"]},
+    }
+
+    lat = report["latency"]
+    print(f"{total} requests in {report['wall_s']}s: {report['throughput_rps']} req/s, "
+          f"error rate {report['error_rate']:.2%} {results.statuses}")
+    print(f"end-to-end  p50 {lat['p50_ms']:>8} ms  p95 {lat['p95_ms']:>8} ms  p99 {lat['p99_ms']:>8} ms")
+    for name, s in report["stages"].items():
+        print(f"  {name:<18} n={s['count']:<5} p50 {s['p50_ms']:>8} ms  p95 {s['p95_ms']:>8} ms  p99 {s['p99_ms']:>8} ms")
+    print("fake LLM calls:", {k: v for k, v in report["llm_calls"].items() if v})
+    if any(report["llm_errors"].values()):
+        print("fake LLM injected errors (retried or degraded by the app):", {k: v for k, v in report["llm_errors"].items() if v})
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        print(f"FAIL: error rate {report['error_rate']:.2%} above {args.max_error_rate:.2%}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
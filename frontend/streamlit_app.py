@@ -6,6 +6,8 @@ import markdown as md
 import streamlit as st
 
 API_BASE = os.getenv("API_BASE", "http://localhost:8080")
+CLINIC_ID = os.getenv("CLINIC_ID", "")  # tenant_id sent to the API; empty = the API's default clinic
+CLINIC = {"tenant_id": CLINIC_ID} if CLINIC_ID else {}
 
 # --- Page config ---
 st.set_page_config(page_title="TCM Clinic Chatbot", page_icon="🤖", layout="wide", initial_sidebar_state="expanded")
@@ -128,7 +130,7 @@ with st.sidebar:
     st.caption("ID: " + st.session_state.session_id[:8])
     if st.button("🗑️ Clear Chat"):
         try:
-            post_json(f"{API_BASE}/reset-session", {"session_id": st.session_state.session_id}, timeout=30)
+            post_json(f"{API_BASE}/reset-session", {"session_id": st.session_state.session_id, **CLINIC}, timeout=30)
         except Exception as e:
             st.error(f"Reset error: {e}")
         st.session_state.messages = []
@@ -224,12 +226,15 @@ if prompt:
         try:
             r = post_json(
                 f"{API_BASE}/chat",
-                {"message": prompt, "session_id": st.session_state.session_id},
+                {"message": prompt, "session_id": st.session_state.session_id, **CLINIC},
                 timeout=120,
             )
             if r.status_code == 401:
                 st.session_state.api_connected = False
                 reply = "Your OpenAI API key is not set or invalid. Please enter it in the sidebar and click **Connect**."
+            elif r.status_code == 429:
+                wait = r.headers.get("Retry-After", "a few")
+                reply = f"We're receiving a lot of questions right now. Please try again in {wait} seconds."
             else:
                 data = r.json()
                 reply = data.get("reply", "").strip() or "Sorry, I couldn't generate a response."